@@ -1,139 +1,357 @@
 import re
-from typing import Dict, List, Tuple
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Pattern, Set, Tuple
 import os
 
+from fuzzy_match import BKTree
+
+# Phrases remembered by each interpreter; AI-mode traffic is dominated by a
+# few dozen repeated phrasings. 0 disables the cache
+CACHE_SIZE = int(os.environ.get('INTERPRETER_CACHE_SIZE', 1024))
+
+# Characters and prefixes that mark a phrase as a shell command line, which
+# is never handed to the intent model
+SHELL_SYNTAX_RE = re.compile(r"[|<>;&$`]|(?:^|\s)-")
+
+# Words of an interpreted phrase, used to pick the patterns worth trying
+WORD_RE = re.compile(r"[a-z]+")
+
+def _leading_words(pattern: str) -> Optional[Set[str]]:
+    """
+    The words a pattern's match must start with, such as {'list', 'show'}
+    for r"(?:list|show)(?: me)? files"; None when it starts with no literal
+    """
+    group = re.match(r"\(\?:([a-z '|]+)\)(\?)?", pattern)
+    if group:
+        words = {alternative.split()[0] for alternative in group.group(1).split('|')
+                 if alternative.strip()}
+        if group.group(2):
+            # An optional prefix: the match may also start after it
+            rest = _leading_words(pattern[group.end():].lstrip())
+            if rest is None:
+                return None
+            words |= rest
+        return words
+    word = re.match(r"([a-z]+)('\?([a-z]+))?", pattern)
+    if word is None:
+        return None
+    if word.group(2):
+        # what'?s matches both "what's" (words what, s) and "whats"
+        return {word.group(1), word.group(1) + word.group(3)}
+    return {word.group(1)}
+
 class AICommandInterpreter:
-    def __init__(self):
-        self.command_patterns = {
-            # File operations
-            r"create (?:a )?(?:new )?(?:file|document) (?:called |named |with name )?['\"]?([^'\"]+)['\"]?": "touch {0}",
-            r"make (?:a )?(?:new )?(?:file|document) (?:called |named |with name )?['\"]?([^'\"]+)['\"]?": "touch {0}",
-            r"create (?:a )?(?:new )?(?:folder|directory) (?:called |named |with name )?['\"]?([^'\"]+)['\"]?": "mkdir {0}",
-            r"make (?:a )?(?:new )?(?:folder|directory) (?:called |named |with name )?['\"]?([^'\"]+)['\"]?": "mkdir {0}",
-            
-            # File management
-            r"delete (?:the )?(?:file|document) (?:called |named )?['\"]?([^'\"]+)['\"]?": "rm {0}",
-            r"remove (?:the )?(?:file|document) (?:called |named )?['\"]?([^'\"]+)['\"]?": "rm {0}",
-            r"delete (?:the )?(?:folder|directory) (?:called |named )?['\"]?([^'\"]+)['\"]?": "rm -r {0}",
-            r"remove (?:the )?(?:folder|directory) (?:called |named )?['\"]?([^'\"]+)['\"]?": "rm -r {0}",
-            
-            # Copy operations
-            r"copy ['\"]?([^'\"]+)['\"]? to (?:the )?['\"]?([^'\"]+)['\"]?(?: folder| directory)?": "cp {0} {1}",
-            r"copy ['\"]?([^'\"]+)['\"]? into (?:the )?['\"]?([^'\"]+)['\"]?(?: folder| directory)?": "cp {0} {1}/",
-            r"duplicate ['\"]?([^'\"]+)['\"]? (?:as |to |into )?['\"]?([^'\"]+)['\"]?": "cp {0} {1}",
-            
-            # Move operations  
-            r"move ['\"]?([^'\"]+)['\"]? to (?:the )?['\"]?([^'\"]+)['\"]?(?: folder| directory)?": "mv {0} {1}",
-            r"move ['\"]?([^'\"]+)['\"]? into (?:the )?['\"]?([^'\"]+)['\"]?(?: folder| directory)?": "mv {0} {1}/",
-            r"rename ['\"]?([^'\"]+)['\"]? to ['\"]?([^'\"]+)['\"]?": "mv {0} {1}",
-            
-            # Navigation
-            r"go to (?:the )?(?:folder|directory) (?:called |named )?['\"]?([^'\"]+)['\"]?": "cd {0}",
-            r"change to (?:the )?(?:folder|directory) (?:called |named )?['\"]?([^'\"]+)['\"]?": "cd {0}",
-            r"navigate to ['\"]?([^'\"]+)['\"]?": "cd {0}",
-            r"(?:go|move) up": "cd ..",
-            r"(?:go|move) back": "cd ..",
-            r"go home": "cd ~",
-            
-            # Listing - FIXED PATTERNS
-            r"(?:list|show)(?: me)?(?: all)?(?: the)? files": "ls",
-            r"(?:list|show)(?: me)?(?: all)?(?: the)? contents": "ls",
-            r"(?:list|show)(?: me)?(?: all)?(?: the)? items": "ls",
-            r"what'?s (?:in )?(?:here|this folder|this directory)": "ls",
-            r"list (?:all )?(?:files|contents) with details": "ls -la",
-            r"show (?:all )?(?:files|contents) with details": "ls -la",
-            r"list (?:all )?(?:files )?in (?:the )?(?:folder |directory )?(?:called |named )?['\"]?([^'\"]+)['\"]?": "ls {0}",
-            r"show (?:me )?(?:all )?(?:files )?in (?:the )?(?:folder |directory )?(?:called |named )?['\"]?([^'\"]+)['\"]?": "ls {0}",
-            
-            # File viewing
-            r"(?:show|display|read) (?:me )?(?:the )?(?:contents of |file )?['\"]?([^'\"]+)['\"]?": "cat {0}",
-            r"open (?:the file )?['\"]?([^'\"]+)['\"]?": "cat {0}",
-            
-            # System info
-            r"(?:show|display) (?:me )?(?:the )?(?:current )?(?:directory|folder|location)": "pwd",
-            r"where am i": "pwd",
-            r"(?:show|list) (?:running )?processes": "ps",
-            r"(?:show|display) system (?:info|information|stats)": "top",
-            
-            # Clear screen
-            r"clear (?:the )?screen": "clear",
-            r"clean (?:the )?screen": "clear",
-            r"clean up": "clear",
-            
-            # Help
-            r"(?:show )?help": "help",
-            r"what (?:can i do|commands are available)": "help",
-        }
-        
-        self.multi_step_patterns = {
-            r"create (?:a )?(?:new )?(?:folder|directory) (?:called |named )?['\"]?([^'\"]+)['\"]? and (?:move|put) ['\"]?([^'\"]+)['\"]? (?:into it|there|inside)": [
-                "mkdir {0}",
-                "mv {1} {0}/"
-            ],
-            r"make (?:a )?(?:new )?(?:folder|directory) ['\"]?([^'\"]+)['\"]? and (?:copy|put) ['\"]?([^'\"]+)['\"]? (?:into it|there|inside)": [
-                "mkdir {0}",
-                "cp {1} {0}/"
-            ],
-            r"create ['\"]?([^'\"]+)['\"]? (?:folder|directory) and move ['\"]?([^'\"]+)['\"]? (?:into it|there)": [
-                "mkdir {0}",
-                "mv {1} {0}/"
-            ]
-        }
+    command_patterns = {
+        # File operations
+        r"create (?:a )?(?:new )?(?:file|document) (?:called |named |with name )?['\"]?([^'\"]+)['\"]?": "touch {0}",
+        r"make (?:a )?(?:new )?(?:file|document) (?:called |named |with name )?['\"]?([^'\"]+)['\"]?": "touch {0}",
+        r"create (?:a )?(?:new )?(?:folder|directory) (?:called |named |with name )?['\"]?([^'\"]+)['\"]?": "mkdir {0}",
+        r"make (?:a )?(?:new )?(?:folder|directory) (?:called |named |with name )?['\"]?([^'\"]+)['\"]?": "mkdir {0}",
+        
+        # File management
+        r"delete (?:the )?(?:file|document) (?:called |named )?['\"]?([^'\"]+)['\"]?": "rm {0}",
+        r"remove (?:the )?(?:file|document) (?:called |named )?['\"]?([^'\"]+)['\"]?": "rm {0}",
+        r"delete (?:the )?(?:folder|directory) (?:called |named )?['\"]?([^'\"]+)['\"]?": "rm -r {0}",
+        r"remove (?:the )?(?:folder|directory) (?:called |named )?['\"]?([^'\"]+)['\"]?": "rm -r {0}",
+        
+        # Copy operations
+        r"copy ['\"]?([^'\"]+)['\"]? to (?:the )?['\"]?([^'\"]+)['\"]?(?: folder| directory)?": "cp {0} {1}",
+        r"copy ['\"]?([^'\"]+)['\"]? into (?:the )?['\"]?([^'\"]+)['\"]?(?: folder| directory)?": "cp {0} {1}/",
+        r"duplicate ['\"]?([^'\"]+)['\"]? (?:as |to |into )?['\"]?([^'\"]+)['\"]?": "cp {0} {1}",
+        
+        # Move operations  
+        r"move ['\"]?([^'\"]+)['\"]? to (?:the )?['\"]?([^'\"]+)['\"]?(?: folder| directory)?": "mv {0} {1}",
+        r"move ['\"]?([^'\"]+)['\"]? into (?:the )?['\"]?([^'\"]+)['\"]?(?: folder| directory)?": "mv {0} {1}/",
+        r"rename ['\"]?([^'\"]+)['\"]? to ['\"]?([^'\"]+)['\"]?": "mv {0} {1}",
+        
+        # Navigation
+        r"go to (?:the )?(?:folder|directory) (?:called |named )?['\"]?([^'\"]+)['\"]?": "cd {0}",
+        r"change to (?:the )?(?:folder|directory) (?:called |named )?['\"]?([^'\"]+)['\"]?": "cd {0}",
+        r"navigate to ['\"]?([^'\"]+)['\"]?": "cd {0}",
+        r"(?:go|move) up": "cd ..",
+        r"(?:go|move) back": "cd ..",
+        r"go home": "cd ~",
+        
+        # Listing - FIXED PATTERNS
+        r"(?:list|show)(?: me)?(?: all)?(?: the)? files": "ls",
+        r"(?:list|show)(?: me)?(?: all)?(?: the)? contents": "ls",
+        r"(?:list|show)(?: me)?(?: all)?(?: the)? items": "ls",
+        r"what'?s (?:in )?(?:here|this folder|this directory)": "ls",
+        r"list (?:all )?(?:files|contents) with details": "ls -la",
+        r"show (?:all )?(?:files|contents) with details": "ls -la",
+        r"list (?:all )?(?:files )?in (?:the )?(?:folder |directory )?(?:called |named )?['\"]?([^'\"]+)['\"]?": "ls {0}",
+        r"show (?:me )?(?:all )?(?:files )?in (?:the )?(?:folder |directory )?(?:called |named )?['\"]?([^'\"]+)['\"]?": "ls {0}",
+        
+        # File viewing
+        r"(?:show|display|read) (?:me )?(?:the )?(?:contents of |file )?['\"]?([^'\"]+)['\"]?": "cat {0}",
+        r"open (?:the file )?['\"]?([^'\"]+)['\"]?": "cat {0}",
+        
+        # System info
+        r"(?:show|display) (?:me )?(?:the )?(?:current )?(?:directory|folder|location)": "pwd",
+        r"where am i": "pwd",
+        r"(?:show|list) (?:running )?processes": "ps",
+        r"(?:show|display) system (?:info|information|stats)": "top",
+        
+        # Clear screen
+        r"clear (?:the )?screen": "clear",
+        r"clean (?:the )?screen": "clear",
+        r"clean up": "clear",
+        
+        # Help
+        r"(?:show )?help": "help",
+        r"what (?:can i do|commands are available)": "help",
+    }
+    
+    multi_step_patterns = {
+        r"create (?:a )?(?:new )?(?:folder|directory) (?:called |named )?['\"]?([^'\"]+)['\"]? and (?:move|put) ['\"]?([^'\"]+)['\"]? (?:into it|there|inside)": [
+            "mkdir {0}",
+            "mv {1} {0}/"
+        ],
+        r"make (?:a )?(?:new )?(?:folder|directory) ['\"]?([^'\"]+)['\"]? and (?:copy|put) ['\"]?([^'\"]+)['\"]? (?:into it|there|inside)": [
+            "mkdir {0}",
+            "cp {1} {0}/"
+        ],
+        r"create ['\"]?([^'\"]+)['\"]? (?:folder|directory) and move ['\"]?([^'\"]+)['\"]? (?:into it|there)": [
+            "mkdir {0}",
+            "mv {1} {0}/"
+        ]
+    }
+
+    # Commands associated with single words, for suggestions
+    keyword_commands = {
+        'file': ['ls', 'cat', 'touch', 'rm'],
+        'folder': ['mkdir', 'ls', 'cd', 'rmdir'],
+        'directory': ['mkdir', 'ls', 'cd', 'rmdir'],
+        'create': ['mkdir', 'touch'],
+        'delete': ['rm', 'rmdir'],
+        'copy': ['cp'],
+        'move': ['mv'],
+        'list': ['ls', 'ps'],
+        'show': ['ls', 'cat', 'pwd', 'ps', 'top'],
+        'all': ['ls -la'],
+        'files': ['ls', 'cat'],
+        'contents': ['ls', 'cat']
+    }
+    
+    # Compiled patterns, multi-step first, as (regex, templates, multi_step);
+    # built once per process by _compile_patterns
+    _compiled: List[Tuple[Pattern, List[str], bool]] = []
+    
+    # Leading word -> positions in _compiled of the patterns starting with it
+    _by_word: Dict[str, List[int]] = {}
+    
+    # Positions of patterns with no leading literal, tried for every phrase
+    _unindexed: List[int] = []
+    
+    # Words the patterns and keywords know, and the commands they produce,
+    # for typo correction
+    _vocabulary = BKTree()
+    _command_names = BKTree()
+    
+    @classmethod
+    def _compile_patterns(cls):
+        """Compile every pattern once and index it by the words it can start with"""
+        entries = [(pattern, templates, True)
+                   for pattern, templates in cls.multi_step_patterns.items()]
+        entries += [(pattern, [template], False)
+                    for pattern, template in cls.command_patterns.items()]
+        cls._compiled, cls._by_word, cls._unindexed = [], {}, []
+        for position, (pattern, templates, multi_step) in enumerate(entries):
+            # Phrases are lowercased before matching, so no IGNORECASE is needed.
+            # Matches start and end on whole words: 'cargo up' is not 'go up'
+            cls._compiled.append((re.compile(rf"(?<!\w)(?:{pattern})(?!\w)"), templates,
+                                  multi_step))
+            words = _leading_words(pattern)
+            if words is None:
+                cls._unindexed.append(position)
+            for word in words or ():
+                cls._by_word.setdefault(word, []).append(position)
+        
+        words = [word for pattern, _, _ in entries for word in WORD_RE.findall(pattern)]
+        cls._vocabulary = BKTree(word for word in words + list(cls.keyword_commands)
+                                 if len(word) >= 3)
+        templates = [template for _, templates, _ in entries for template in templates]
+        templates += [command for commands in cls.keyword_commands.values() for command in commands]
+        cls._command_names = BKTree(template.split()[0] for template in templates)
+    
+    def __init__(self, cache_size: int = CACHE_SIZE, fallback: bool = True):
+        self.cache_size = cache_size
+        # Whether phrases no pattern matches go to the offline intent model
+        self.fallback = fallback
+        self._cache: "OrderedDict[str, List[str]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def _candidates(self, natural_command: str) -> List[int]:
+        """Positions of the patterns that can match, in priority order"""
+        positions = list(self._unindexed)
+        by_word = self._by_word
+        for word in WORD_RE.findall(natural_command):
+            found = by_word.get(word)
+            if found:
+                positions.extend(found)
+        return sorted(set(positions))
     
     def interpret(self, natural_command: str) -> List[str]:
         """
         Convert natural language command to terminal command(s)
         Returns list of commands to execute
         """
-        natural_command = natural_command.lower().strip()
-        
-        # Check multi-step patterns first
-        for pattern, commands in self.multi_step_patterns.items():
-            match = re.search(pattern, natural_command, re.IGNORECASE)
-            if match:
-                result = []
-                for cmd_template in commands:
-                    result.append(cmd_template.format(*match.groups()))
-                return result
-        
-        # Check single-step patterns
-        for pattern, command_template in self.command_patterns.items():
-            match = re.search(pattern, natural_command, re.IGNORECASE)
-            if match:
-                try:
-                    return [command_template.format(*match.groups())]
-                except IndexError:
-                    # Pattern matched but no groups captured
-                    return [command_template]
-        
-        # If no pattern matches, return the original command
-        return [natural_command]
-    
-    def suggest_commands(self, natural_command: str) -> List[str]:
-        """Suggest possible commands based on keywords"""
+        # Phrases differing only in case or spacing share a cache entry
+        natural_command = ' '.join(natural_command.lower().split())
+        
+        cached = self._cached(natural_command)
+        if cached is not None:
+            return cached
+        
+        commands = self._interpret(natural_command)
+        self._remember(natural_command, commands)
+        return list(commands)
+    
+    def interpret_many(self, natural_commands: List[str]) -> List[List[str]]:
+        """
+        Interpret a batch of phrases, as interpret() would one by one; the
+        phrases no pattern matches go to the intent model in a single call
+        """
+        phrases = [' '.join(phrase.lower().split()) for phrase in natural_commands]
+        results: List[Optional[List[str]]] = [self._cached(phrase) for phrase in phrases]
+        
+        fresh = [position for position, commands in enumerate(results) if commands is None]
+        unmatched = []
+        for position in fresh:
+            results[position] = self._match(phrases[position])
+            if results[position] is None:
+                unmatched.append(position)
+        classified = self._classify_many([phrases[position] for position in unmatched])
+        for position, commands in zip(unmatched, classified):
+            # If nothing matches, return the original command
+            results[position] = commands or [phrases[position]]
+        
+        for position in fresh:
+            self._remember(phrases[position], results[position])
+        return [list(commands) for commands in results]
+    
+    def _cached(self, natural_command: str) -> Optional[List[str]]:
+        """A copy of the cached commands for a normalized phrase, counting the lookup"""
+        with self._cache_lock:
+            cached = self._cache.get(natural_command)
+            if cached is not None:
+                self._cache.move_to_end(natural_command)
+                self.hits += 1
+                return list(cached)
+            self.misses += 1
+            return None
+    
+    def _remember(self, natural_command: str, commands: List[str]):
+        if self.cache_size > 0:
+            with self._cache_lock:
+                self._cache[natural_command] = commands
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+    
+    def cache_info(self) -> Dict[str, int]:
+        """Hit and miss counts and occupancy of the interpretation cache"""
+        with self._cache_lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'size': len(self._cache), 'max_size': self.cache_size}
+    
+    def _interpret(self, natural_command: str) -> List[str]:
+        """Interpret a normalized phrase: patterns first, then the intent model"""
+        commands = self._match(natural_command)
+        if commands is None:
+            commands = self._classify_many([natural_command])[0]
+        # If nothing matches, return the original command
+        return commands or [natural_command]
+    
+    def _match(self, natural_command: str) -> Optional[List[str]]:
+        """Match a normalized phrase against the patterns"""
+        # Only patterns whose leading word occurs in the phrase are tried,
+        # multi-step patterns first, then in the order they are listed
+        for position in self._candidates(natural_command):
+            regex, templates, multi_step = self._compiled[position]
+            match = regex.search(natural_command)
+            if not match:
+                continue
+            if multi_step:
+                return [template.format(*match.groups()) for template in templates]
+            try:
+                return [templates[0].format(*match.groups())]
+            except IndexError:
+                # Pattern matched but no groups captured
+                return [templates[0]]
+        return None
+    
+    def _classify_many(self, natural_commands: List[str],
+                       destructive: bool = False) -> List[Optional[List[str]]]:
+        """
+        Ask the intent model about phrases the patterns missed, in one batch,
+        skipping those that already read as shell commands such as git
+        status or ls -la. Guesses that delete or overwrite files are only
+        returned when destructive is True, for suggestions
+        """
+        results: List[Optional[List[str]]] = [None] * len(natural_commands)
+        eligible = [position for position, phrase in enumerate(natural_commands)
+                    if self.fallback and phrase and phrase.split()[0] not in self._command_names
+                    and not SHELL_SYNTAX_RE.search(phrase)]
+        if not eligible:
+            return results
+        try:
+            # numpy is only imported once a phrase gets this far
+            from intent_model import get_model
+        except ImportError:
+            return results
+        classified = get_model().interpret([natural_commands[position] for position in eligible],
+                                           destructive=destructive)
+        for position, commands in zip(eligible, classified):
+            results[position] = commands
+        return results
+    
+    def correct(self, natural_command: str) -> str:
+        """Replace words the patterns do not know with their closest known word"""
+        words = natural_command.lower().split()
+        for position, word in enumerate(words):
+            if word.isalpha() and len(word) >= 3 and word not in self._vocabulary:
+                closest = self._vocabulary.suggest(word, limit=1)
+                if closest:
+                    words[position] = closest[0]
+        return ' '.join(words)
+    
+    def suggest_commands(self, natural_command: str, commands: Optional[BKTree] = None,
+                         limit: int = 5) -> List[str]:
+        """
+        Suggest commands for a phrase nothing matched, best first: the
+        intent model's guess, including the deletes, copies and moves it
+        never runs by itself, the interpretation of the phrase with typos
+        corrected, commands whose
+        names are close to a word of it (searched in commands, such as a
+        terminal's command_index(), when given), then keyword associations
+        """
         suggestions = []
-        keywords = natural_command.lower().split()
-        
-        keyword_commands = {
-            'file': ['ls', 'cat', 'touch', 'rm'],
-            'folder': ['mkdir', 'ls', 'cd', 'rmdir'],
-            'directory': ['mkdir', 'ls', 'cd', 'rmdir'],
-            'create': ['mkdir', 'touch'],
-            'delete': ['rm', 'rmdir'],
-            'copy': ['cp'],
-            'move': ['mv'],
-            'list': ['ls', 'ps'],
-            'show': ['ls', 'cat', 'pwd', 'ps', 'top'],
-            'all': ['ls -la'],
-            'files': ['ls', 'cat'],
-            'contents': ['ls', 'cat']
-        }
-        
-        for keyword in keywords:
-            if keyword in keyword_commands:
-                suggestions.extend(keyword_commands[keyword])
-        
-        return list(set(suggestions))  # Remove duplicates
+        guess = self._classify_many([' '.join(natural_command.lower().split())],
+                                    destructive=True)[0]
+        if guess:
+            suggestions.append('; '.join(guess))
+        
+        corrected = self.correct(natural_command)
+        if corrected != ' '.join(natural_command.lower().split()):
+            interpreted = self.interpret(corrected)
+            if interpreted != [corrected]:
+                suggestions.append('; '.join(interpreted))
+        
+        names = commands if commands is not None else self._command_names
+        for word in natural_command.lower().split():
+            if word in names:
+                suggestions.append(word)
+            elif word.isalpha() and len(word) >= 2 and word not in self._vocabulary:
+                suggestions.extend(names.suggest(word, limit=2))
+        
+        for keyword in corrected.split():
+            suggestions.extend(self.keyword_commands.get(keyword, ()))
+        
+        # Remove duplicates, keeping the best-ranked occurrence
+        return list(dict.fromkeys(suggestions))[:limit]
     
     def get_help(self) -> str:
         """Get help text for natural language commands"""
@@ -165,4 +383,17 @@ Multi-step commands:
 - "create a new folder called test and move file.txt into it"
   → mkdir test; mv file.txt test/
         """
-        return help_text
\ No newline at end of file
+        return help_text
+
+AICommandInterpreter._compile_patterns()
+
+_interpreter = None
+_interpreter_lock = threading.Lock()
+
+def get_interpreter() -> AICommandInterpreter:
+    """Return the interpreter, and its cache, shared by every session in the process"""
+    global _interpreter
+    with _interpreter_lock:
+        if _interpreter is None:
+            _interpreter = AICommandInterpreter()
+        return _interpreter
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark AI-mode interpretation: per-phrase latency of the indexed matcher
+against a linear scan of every pattern, as interpret() used to do
+
+Usage: python bench_interpreter.py [rounds]
+"""
+
+import re
+import sys
+import time
+from typing import List
+
+from ai_interpreter import AICommandInterpreter
+
+PHRASES = [
+    "create a folder called documents",
+    "make a new file named notes.txt",
+    "delete the file readme.txt",
+    "copy report.pdf to backup folder",
+    "move photo.jpg into pictures",
+    "rename draft.txt to final.txt",
+    "go to the folder called src",
+    "go up",
+    "list all files",
+    "show me all files",
+    "what's in here",
+    "list files in test_docs folder",
+    "show the contents of file.txt",
+    "where am i",
+    "show running processes",
+    "clear the screen",
+    "create a new folder called test and move file.txt into it",
+    # Phrases no pattern matches are the old worst case: every regex is tried
+    "git status",
+    "compile the project with optimizations",
+    "npm install --save-dev typescript",
+]
+
+def linear_interpret(natural_command: str) -> List[str]:
+    """The original unindexed matcher, kept as the baseline"""
+    natural_command = natural_command.lower().strip()
+    for pattern, commands in AICommandInterpreter.multi_step_patterns.items():
+        match = re.search(pattern, natural_command, re.IGNORECASE)
+        if match:
+            return [template.format(*match.groups()) for template in commands]
+    for pattern, template in AICommandInterpreter.command_patterns.items():
+        match = re.search(pattern, natural_command, re.IGNORECASE)
+        if match:
+            try:
+                return [template.format(*match.groups())]
+            except IndexError:
+                return [template]
+    return [natural_command]
+
+def measure(interpret, phrase: str, rounds: int) -> float:
+    """Mean latency of one phrase in microseconds"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        interpret(phrase)
+    return (time.perf_counter() - start) / rounds * 1e6
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    # Uncached, so every round measures the matcher itself
+    interpreter = AICommandInterpreter(cache_size=0, fallback=False)
+
+    print(f"{'phrase':<58} {'before':>9} {'after':>9} {'speedup':>8}")
+    total_before = total_after = 0.0
+    for phrase in PHRASES:
+        expected, actual = linear_interpret(phrase), interpreter.interpret(phrase)
+        if expected != actual:
+            print(f"MISMATCH for {phrase!r}: {expected} != {actual}")
+            sys.exit(1)
+        before = measure(linear_interpret, phrase, rounds)
+        after = measure(interpreter.interpret, phrase, rounds)
+        total_before += before
+        total_after += after
+        print(f"{phrase[:58]:<58} {before:8.2f}us {after:8.2f}us {before / after:7.1f}x")
+
+    count = len(PHRASES)
+    print(f"{'mean':<58} {total_before / count:8.2f}us {total_after / count:8.2f}us "
+          f"{total_before / total_after:7.1f}x")
+
+if __name__ == "__main__":
+    main()
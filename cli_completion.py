@@ -0,0 +1,29 @@
+"""
+prompt_toolkit completion for the command line interface
+"""
+
+from prompt_toolkit.completion import Completer, Completion
+
+from terminal_core import PythonTerminal
+
+class TerminalCompleter(Completer):
+    """Complete command names for the first word, then arguments by the command's completion hint"""
+    
+    def __init__(self, terminal: PythonTerminal):
+        self.terminal = terminal
+    
+    def get_completions(self, document, complete_event):
+        text = document.text_before_cursor
+        word = document.get_word_before_cursor(WORD=True)
+        before = text[:len(text) - len(word)].split()
+        # The command's completion hint decides what its arguments complete to;
+        # external commands get paths
+        entry = self.terminal.commands.get(before[0].lower()) if before else None
+        hint = entry.completion if entry is not None else 'path'
+        if not before or (hint == 'command' and len(before) == 1):
+            for command in self.terminal.commands.names():
+                if command.startswith(word):
+                    yield Completion(command, start_position=-len(word))
+        elif hint == 'path':
+            for path in self.terminal.complete_path(word):
+                yield Completion(path, start_position=-len(word))
@@ -0,0 +1,178 @@
+"""
+Command registry for the Python terminal
+
+Every command is described once by a Command: its names, the handler that
+runs it, how it behaves in pipelines and --json mode, and the help and
+completion hints shown to users. Dispatch is a single dictionary lookup.
+
+Third-party command packs register through the 'python_terminal.commands'
+entry point group. The entry point name is the command name and its value
+points at either a handler callable taking (terminal, args) and returning
+(output, return_code, error), or a Command. Entry points are only listed
+(not imported) until the command is first run.
+"""
+
+import threading
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+ENTRY_POINT_GROUP = 'python_terminal.commands'
+
+# Width of the command column in generated help
+HELP_USAGE_WIDTH = 13
+
+class Command:
+    """
+    A terminal command.
+    handler is the name of a PythonTerminal method taking (args), or a
+    callable taking (terminal, args); None marks a pipeline-only stage such
+    as wc, which runs externally outside a pipeline. stage and data name the
+    generator used inside pipelines and the method returning --json data.
+    options names the argument parser of a built-in standing in for the
+    system tool of the same name, which runs instead when the parser raises
+    UnsupportedOption. completion is 'path', 'command' or None for the
+    arguments' completion, and hidden commands are left out of help.
+    """
+
+    def __init__(self, name: str, handler: Union[str, Callable, None] = None,
+                 aliases: Tuple[str, ...] = (), category: str = 'Other Commands',
+                 usage: Optional[str] = None, summary: str = '', stage: Optional[str] = None,
+                 streaming: bool = False, data: Optional[str] = None,
+                 options: Optional[str] = None, completion: Optional[str] = 'path',
+                 hidden: bool = False):
+        self.name = name
+        self.handler = handler
+        self.aliases = tuple(aliases)
+        self.category = category
+        self.usage = usage or ', '.join((name,) + self.aliases)
+        self.summary = summary
+        self.stage = stage
+        self.streaming = streaming
+        self.data = data
+        self.options = options
+        self.completion = completion
+        self.hidden = hidden
+
+    @property
+    def names(self) -> Tuple[str, ...]:
+        return (self.name,) + self.aliases
+
+    @property
+    def runnable(self) -> bool:
+        return self.handler is not None
+
+    def run(self, terminal, args: List[str]) -> Tuple[str, int, str]:
+        if isinstance(self.handler, str):
+            return getattr(terminal, self.handler)(args)
+        return self.handler(terminal, args)
+
+class _EntryPointHandler:
+    """Handler that imports its entry point the first time the command runs"""
+
+    def __init__(self, entry_point, command: Command):
+        self.entry_point = entry_point
+        self.command = command
+        self._lock = threading.Lock()
+
+    def __call__(self, terminal, args: List[str]) -> Tuple[str, int, str]:
+        with self._lock:
+            if self.command.handler is self:
+                loaded = self.entry_point.load()
+                if isinstance(loaded, Command):
+                    # The pack's own description replaces the placeholder
+                    for attribute in ('handler', 'category', 'usage', 'summary', 'data',
+                                      'completion', 'hidden'):
+                        setattr(self.command, attribute, getattr(loaded, attribute))
+                else:
+                    self.command.handler = loaded
+                    self.command.summary = (loaded.__doc__ or '').strip().split('\n')[0] \
+                        or self.command.summary
+        return self.command.run(terminal, args)
+
+class CommandRegistry:
+    """Commands by name and alias, plus the notes shown alongside them in help"""
+
+    def __init__(self):
+        self._commands: Dict[str, Command] = {}
+        self._ordered: List[Command] = []
+        self._categories: List[str] = []
+        self._notes: Dict[str, List[Tuple[str, str]]] = {}
+        self._plugins_discovered = False
+        self._lock = threading.Lock()
+
+    def register(self, command: Command) -> Command:
+        for name in command.names:
+            self._commands[name] = command
+        self._ordered.append(command)
+        self._add_category(command.category)
+        return command
+
+    def add_note(self, category: str, usage: str, summary: str):
+        """Add a help line that is not a command of its own, such as 'a | b'"""
+        self._add_category(category)
+        self._notes.setdefault(category, []).append((usage, summary))
+
+    def _add_category(self, category: str):
+        if category not in self._categories:
+            self._categories.append(category)
+
+    def get(self, name: str) -> Optional[Command]:
+        """Look up a command by name or alias, discovering plugins on the first miss"""
+        command = self._commands.get(name)
+        if command is None and not self._plugins_discovered:
+            self.discover_plugins()
+            command = self._commands.get(name)
+        return command
+
+    def __contains__(self, name: str) -> bool:
+        return self.get(name) is not None
+
+    def names(self) -> List[str]:
+        """Every runnable command name and alias, for completion"""
+        self.discover_plugins()
+        return sorted(name for name, command in self._commands.items() if command.runnable)
+
+    def commands(self) -> Iterator[Command]:
+        self.discover_plugins()
+        return iter(list(self._ordered))
+
+    def discover_plugins(self):
+        """List entry points in ENTRY_POINT_GROUP without importing them"""
+        with self._lock:
+            if self._plugins_discovered:
+                return
+            self._plugins_discovered = True
+            try:
+                from importlib.metadata import entry_points
+                found = entry_points()
+                if hasattr(found, 'select'):
+                    found = found.select(group=ENTRY_POINT_GROUP)
+                else:
+                    found = found.get(ENTRY_POINT_GROUP, [])
+            except Exception:
+                return
+            for entry_point in found:
+                if entry_point.name in self._commands:
+                    continue  # Built-ins cannot be shadowed
+                command = Command(entry_point.name, category='Plugins',
+                                  summary=f"Provided by {entry_point.value}")
+                command.handler = _EntryPointHandler(entry_point, command)
+                self.register(command)
+
+    def help_text(self, heading: Callable[[str], str] = lambda title: f"{title}:") -> str:
+        """Generate help grouped by category, in registration order"""
+        sections = []
+        for category in self._categories:
+            lines = []
+            for command in self._ordered:
+                if command.category == category and not command.hidden and command.summary:
+                    lines.extend(self._help_lines(command.usage, command.summary))
+            for usage, summary in self._notes.get(category, []):
+                lines.extend(self._help_lines(usage, summary))
+            if lines:
+                sections.append('\n'.join([heading(category)] + lines))
+        return '\n\n'.join(sections)
+
+    def _help_lines(self, usage: str, summary: str) -> List[str]:
+        first, *rest = summary.split('\n')
+        indent = ' ' * (HELP_USAGE_WIDTH + 5)
+        return [f"  {usage:<{HELP_USAGE_WIDTH}} - {first}"] + [indent + line for line in rest]
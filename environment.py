@@ -0,0 +1,98 @@
+"""
+Layered environment variables for terminal sessions
+"""
+
+import os
+import threading
+from collections.abc import MutableMapping
+from typing import Dict, Iterator, Optional, Set
+
+_base = None
+_base_lock = threading.Lock()
+
+def get_base_environment() -> Dict[str, str]:
+    """
+    Snapshot of the process environment, taken on first use and shared by
+    every session. It must never be modified; sessions record their changes
+    in an Environment instead
+    """
+    global _base
+    with _base_lock:
+        if _base is None:
+            _base = dict(os.environ)
+        return _base
+
+class Environment(MutableMapping):
+    """
+    A session's environment: the shared base plus the variables the session
+    set or unset. An idle session costs two empty containers, and the flat
+    mapping handed to subprocesses is rebuilt only after a change.
+    """
+
+    def __init__(self, base: Optional[Dict[str, str]] = None):
+        self._base = get_base_environment() if base is None else base
+        self._changed: Dict[str, str] = {}
+        self._removed: Set[str] = set()
+        self._flat: Optional[Dict[str, str]] = None
+        self._lock = threading.Lock()
+
+    def __getitem__(self, key: str) -> str:
+        if key in self._changed:
+            return self._changed[key]
+        if key in self._removed:
+            raise KeyError(key)
+        return self._base[key]
+
+    def __contains__(self, key) -> bool:
+        return key in self._changed or (key in self._base and key not in self._removed)
+
+    def __setitem__(self, key: str, value: str):
+        with self._lock:
+            self._changed[key] = value
+            self._removed.discard(key)
+            self._flat = None
+
+    def __delitem__(self, key: str):
+        with self._lock:
+            if key not in self:
+                raise KeyError(key)
+            self._changed.pop(key, None)
+            if key in self._base:
+                self._removed.add(key)
+            self._flat = None
+
+    def __iter__(self) -> Iterator[str]:
+        yield from list(self._changed)
+        for key in self._base:
+            if key not in self._changed and key not in self._removed:
+                yield key
+
+    def __len__(self) -> int:
+        # Only base variables are ever recorded as removed
+        added = sum(1 for key in self._changed if key not in self._base)
+        return len(self._base) - len(self._removed) + added
+
+    def copy(self) -> 'Environment':
+        """An independent Environment with the same variables, sharing the base"""
+        other = Environment(self._base)
+        with self._lock:
+            other._changed = dict(self._changed)
+            other._removed = set(self._removed)
+        return other
+
+    def materialize(self) -> Dict[str, str]:
+        """
+        The flattened environment for subprocess. While the session has
+        changed nothing this is the shared base itself, so callers must not
+        modify the result
+        """
+        with self._lock:
+            if not self._changed and not self._removed:
+                return self._base
+            if self._flat is None:
+                flat = dict(self._base)
+                for key in self._removed:
+                    flat.pop(key, None)
+                flat.update(self._changed)
+                self._flat = flat
+            return self._flat
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Evaluate AI-mode interpretation against the labelled phrases in
+interpreter_eval.tsv: accuracy, batch throughput and per-phrase latency,
+failing when accuracy drops below the gate
+
+Usage: python eval_interpreter.py [rounds]
+"""
+
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from ai_interpreter import AICommandInterpreter
+
+EVAL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'interpreter_eval.tsv')
+
+# Share of phrases that must be interpreted exactly right. The eval
+# measures 75/86 (87.2%); this allows one new miss, 74/86, and fails on
+# a second; raise it as patterns are fixed
+MIN_ACCURACY = float(os.environ.get('EVAL_MIN_ACCURACY', 0.85))
+
+# Optional p99 latency ceiling in microseconds; off by default, since it
+# depends on the machine
+MAX_P99_US = float(os.environ.get('EVAL_MAX_P99_US', 0))
+
+def read_cases(path: str = EVAL_PATH) -> List[Tuple[str, List[str], Optional[str]]]:
+    """
+    (phrase, expected commands, expected first suggestion) triples, skipping
+    comments and blank lines. A phrase whose commands are marked ? expects
+    to pass through unchanged, with them suggested instead
+    """
+    cases = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if line.strip() and not line.startswith('#'):
+                phrase, *commands = line.split('\t')
+                if commands[0].startswith('?'):
+                    suggestion = '; '.join(command.lstrip('?') for command in commands)
+                    cases.append((phrase, [phrase], suggestion))
+                else:
+                    cases.append((phrase, commands, None))
+    return cases
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of samples"""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+def evaluate(cases: List[Tuple[str, List[str], Optional[str]]], rounds: int = 50) -> Dict:
+    """
+    Accuracy and misses of one batch, phrases per second through
+    interpret_many() and the latency of each interpret() call, all uncached
+    """
+    interpreter = AICommandInterpreter(cache_size=0)
+    phrases = [phrase for phrase, _, _ in cases]
+    # The first batch also loads the intent model, so it is left out of the timings
+    results = interpreter.interpret_many(phrases)
+    misses = []
+    for (phrase, expected, suggestion), actual in zip(cases, results):
+        if actual != expected:
+            misses.append((phrase, expected, actual))
+        elif suggestion is not None:
+            suggested = interpreter.suggest_commands(phrase)[:1]
+            if suggested != [suggestion]:
+                misses.append((phrase, ['?' + suggestion], ['?' + '; '.join(suggested)]))
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        interpreter.interpret_many(phrases)
+    throughput = rounds * len(phrases) / (time.perf_counter() - start)
+
+    latencies = []
+    for _ in range(rounds):
+        for phrase in phrases:
+            start = time.perf_counter()
+            interpreter.interpret(phrase)
+            latencies.append((time.perf_counter() - start) * 1e6)
+
+    return {
+        'accuracy': 1 - len(misses) / len(cases),
+        'misses': misses,
+        'throughput': throughput,
+        'p50_us': percentile(latencies, 0.50),
+        'p99_us': percentile(latencies, 0.99),
+    }
+
+def gate(report: Dict) -> List[str]:
+    """The regression gates a report fails, if any"""
+    failures = []
+    if report['accuracy'] < MIN_ACCURACY:
+        failures.append(f"accuracy {report['accuracy']:.1%} is below {MIN_ACCURACY:.1%}")
+    if MAX_P99_US and report['p99_us'] > MAX_P99_US:
+        failures.append(f"p99 latency {report['p99_us']:.1f}us is above {MAX_P99_US:.1f}us")
+    return failures
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    cases = read_cases()
+    report = evaluate(cases, rounds)
+
+    for phrase, expected, actual in report['misses']:
+        print(f"MISS {phrase!r}: expected {'; '.join(expected)!r}, got {'; '.join(actual)!r}")
+    print(f"accuracy    {report['accuracy']:8.1%}  ({len(cases) - len(report['misses'])}/{len(cases)})")
+    print(f"throughput  {report['throughput']:8.0f}  phrases/sec")
+    print(f"latency p50 {report['p50_us']:8.1f}  us")
+    print(f"latency p99 {report['p99_us']:8.1f}  us")
+
+    failures = gate(report)
+    for failure in failures:
+        print(f"FAIL {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""
+Parallel file operations backing the terminal's cp and rm built-ins
+"""
+
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+# Copies and unlinks are I/O-latency bound, so use more threads than cores
+COPY_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+REMOVE_WORKERS = COPY_WORKERS
+
+# Chunk size for os.copy_file_range
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+
+class CopyStats:
+    """Running totals for a copy operation"""
+
+    def __init__(self):
+        self.files = 0
+        self.directories = 0
+        self.bytes = 0
+        self.errors: List[str] = []
+        self.started = time.monotonic()
+        self.finished = False
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def throughput(self) -> float:
+        """Bytes per second so far"""
+        return self.bytes / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        verb = "Copied" if self.finished else "Copying..."
+        return (f"{verb} {self.files} files, {self.directories} directories, "
+                f"{format_bytes(self.bytes)} in {self.elapsed:.1f}s "
+                f"({format_bytes(self.throughput)}/s)")
+
+def format_bytes(size: float) -> str:
+    """Format a byte count with a binary unit"""
+    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
+        if size < 1024 or unit == 'TB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+
+class RemoveStats:
+    """Running totals for a recursive delete"""
+
+    def __init__(self):
+        self.files = 0
+        self.directories = 0
+        self.errors: List[str] = []
+        self.started = time.monotonic()
+        self.finished = False
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def summary(self) -> str:
+        return f"{self.files} files, {self.directories} directories in {self.elapsed:.1f}s"
+
+def _run_tasks(pool: ThreadPoolExecutor, tasks: Iterable[Tuple[Callable, tuple]],
+               collect: Callable, workers: int, progress_interval: float) -> Iterator[None]:
+    """
+    Submit (function, args) tasks to a pool, keeping at most a few per worker
+    queued, and pass each result to collect. Yields whenever progress_interval
+    seconds have passed so callers can report progress.
+    """
+    max_pending = workers * 4
+    last_report = time.monotonic()
+    pending = set()
+
+    def drain(done):
+        for future in done:
+            collect(future.result())
+
+    for function, args in tasks:
+        pending.add(pool.submit(function, *args))
+        if len(pending) >= max_pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            drain(done)
+        if time.monotonic() - last_report >= progress_interval:
+            last_report = time.monotonic()
+            yield
+
+    while pending:
+        done, pending = wait(pending, timeout=progress_interval, return_when=FIRST_COMPLETED)
+        drain(done)
+        if pending and time.monotonic() - last_report >= progress_interval:
+            last_report = time.monotonic()
+            yield
+
+def copy_file(source: str, destination: str) -> int:
+    """
+    Copy one file's data and metadata, letting the kernel move the bytes
+    where possible (copy_file_range, then shutil's sendfile/fcopyfile path)
+    Returns the number of bytes copied
+    """
+    copied = 0
+    if hasattr(os, 'copy_file_range'):
+        try:
+            with open(source, 'rb') as fsrc, open(destination, 'wb') as fdst:
+                while True:
+                    sent = os.copy_file_range(fsrc.fileno(), fdst.fileno(), COPY_CHUNK_SIZE)
+                    if sent == 0:
+                        break
+                    copied += sent
+        except OSError:
+            # Unsupported for this filesystem pair (EXDEV, ENOSYS, EINVAL, ...)
+            copied = -1
+    if not hasattr(os, 'copy_file_range') or copied < 0:
+        shutil.copyfile(source, destination)
+        copied = os.path.getsize(destination)
+    shutil.copystat(source, destination)
+    return copied
+
+def _copy_task(source: str, destination: str) -> Tuple[int, Optional[str]]:
+    try:
+        if os.path.islink(source):
+            if os.path.lexists(destination):
+                os.remove(destination)
+            os.symlink(os.readlink(source), destination)
+            return 0, None
+        return copy_file(source, destination), None
+    except OSError as e:
+        return 0, f"cp: cannot copy '{source}': {e.strerror or e}"
+
+def _same_file(source: str, target: str) -> bool:
+    try:
+        return os.path.samefile(source, target)
+    except OSError:
+        return False  # The target does not exist yet
+
+def _plan_copies(sources: List[str], destination: str, stats: CopyStats,
+                 directories: List[Tuple[str, str]]) -> Iterator[Tuple[str, str]]:
+    """
+    Create destination directories while walking the sources with scandir,
+    yielding (source_file, destination_file) pairs to copy. Created
+    directories are recorded so their metadata can be copied afterwards.
+    """
+    into_directory = os.path.isdir(destination)
+    if len(sources) > 1 and not into_directory:
+        stats.errors.append(f"cp: target '{destination}' is not a directory")
+        return
+
+    for source in sources:
+        target = os.path.join(destination, os.path.basename(source.rstrip(os.sep))) \
+            if into_directory else destination
+
+        if not os.path.lexists(source):
+            stats.errors.append(f"cp: cannot stat '{source}': No such file or directory")
+            continue
+        if not os.path.isdir(source) or os.path.islink(source):
+            # Opening the destination would truncate the source first
+            if _same_file(source, target):
+                stats.errors.append(f"cp: '{source}' and '{os.path.normpath(target)}' "
+                                    f"are the same file")
+            else:
+                yield source, target
+            continue
+
+        real_source = os.path.realpath(source)
+        if os.path.realpath(target).startswith(real_source + os.sep):
+            stats.errors.append(f"cp: cannot copy a directory, '{source}', into itself")
+            continue
+
+        stack = [(source, target)]
+        while stack:
+            directory, target_directory = stack.pop()
+            try:
+                os.makedirs(target_directory, exist_ok=True)
+                directories.append((directory, target_directory))
+                stats.directories += 1
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        entry_target = os.path.join(target_directory, entry.name)
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append((entry.path, entry_target))
+                        else:
+                            yield entry.path, entry_target
+            except OSError as e:
+                stats.errors.append(f"cp: cannot copy '{directory}': {e.strerror or e}")
+
+def copy_paths(sources: List[str], destination: str, workers: int = COPY_WORKERS,
+               progress_interval: float = 1.0) -> Iterator[CopyStats]:
+    """
+    Copy files and directory trees concurrently on a thread pool.
+    Yields the running CopyStats every progress_interval seconds and once
+    more when finished (with stats.finished set).
+    """
+    stats = CopyStats()
+    directories = []
+
+    def collect(result):
+        copied, error = result
+        if error:
+            stats.errors.append(error)
+        else:
+            stats.files += 1
+            stats.bytes += copied
+
+    tasks = ((_copy_task, pair) for pair in _plan_copies(sources, destination, stats, directories))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='terminal-cp') as pool:
+        for _ in _run_tasks(pool, tasks, collect, workers, progress_interval):
+            yield stats
+
+    # Directory timestamps are set last, once nothing else will be written into them
+    for source, target in reversed(directories):
+        try:
+            shutil.copystat(source, target)
+        except OSError:
+            pass
+
+    stats.finished = True
+    yield stats
+
+def _remove_entry(path: str, is_directory: bool) -> Optional[str]:
+    try:
+        if is_directory:
+            os.rmdir(path)
+        else:
+            os.unlink(path)
+        return None
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        return f"rm: cannot remove '{path}': {e.strerror or e}"
+
+def remove_tree(path: str, workers: int = REMOVE_WORKERS,
+                progress_interval: float = 1.0) -> Iterator[RemoveStats]:
+    """
+    Delete a directory tree with unlinks fanned out across a thread pool.
+    Files are removed while the tree is walked; directories are then
+    removed bottom-up one depth level at a time, each level in parallel.
+    Yields the running RemoveStats every progress_interval seconds and once
+    more when finished.
+    """
+    stats = RemoveStats()
+    levels: List[List[str]] = []
+
+    def walk() -> Iterator[Tuple[Callable, tuple]]:
+        stack = [(path, 0)]
+        while stack:
+            directory, depth = stack.pop()
+            if depth == len(levels):
+                levels.append([])
+            levels[depth].append(directory)
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append((entry.path, depth + 1))
+                        else:
+                            yield _remove_entry, (entry.path, False)
+            except OSError as e:
+                stats.errors.append(f"rm: cannot read '{directory}': {e.strerror or e}")
+
+    def collect_file(error):
+        if error:
+            stats.errors.append(error)
+        else:
+            stats.files += 1
+
+    def collect_directory(error):
+        if error:
+            stats.errors.append(error)
+        else:
+            stats.directories += 1
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='terminal-rm') as pool:
+        for _ in _run_tasks(pool, walk(), collect_file, workers, progress_interval):
+            yield stats
+        for directories in reversed(levels):
+            tasks = ((_remove_entry, (directory, True)) for directory in directories)
+            for _ in _run_tasks(pool, tasks, collect_directory, workers, progress_interval):
+                yield stats
+
+    stats.finished = True
+    yield stats
+
+def remove_tree_async(path: str) -> str:
+    """
+    Rename a directory out of the way at once and delete it on a background
+    thread. Returns the temporary name the tree was moved to.
+    """
+    parent, name = os.path.split(os.path.normpath(path))
+    doomed = os.path.join(parent, f".{name}.deleting-{uuid.uuid4().hex[:8]}")
+    os.rename(path, doomed)
+
+    def run():
+        for _ in remove_tree(doomed):
+            pass
+
+    threading.Thread(target=run, name='terminal-rm-async', daemon=True).start()
+    return doomed
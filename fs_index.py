@@ -0,0 +1,385 @@
+"""
+Process-wide directory index caching scandir results for the terminal
+"""
+
+import fnmatch
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+# Approximate memory the index may hold before evicting least recently used directories
+INDEX_MEMORY_BUDGET = 32 * 1024 * 1024
+
+# Approximate memory for cached du directory sizes; a record is far smaller
+# than a listing, so this covers millions of directories
+USAGE_MEMORY_BUDGET = 128 * 1024 * 1024
+
+# Rough per-entry cost of an IndexEntry plus its slot in the listing
+ENTRY_OVERHEAD = 200
+
+# Directories stat'ed and scanned concurrently by du; the walk is latency bound
+USAGE_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# A directory modified this recently may change again within the same mtime
+# tick, so its listing is rescanned rather than trusted (coarse-mtime filesystems)
+RACY_WINDOW = 2.0
+
+# How long an entry's lstat result is reused; file writes do not touch the
+# parent directory's mtime, so entry metadata needs its own expiry
+STAT_TTL = 1.0
+
+# How long a directory's cached du record is reused. For the same reason,
+# a file growing in place is only seen once its directory's record expires
+USAGE_TTL = 10.0
+
+class IndexEntry:
+    """A cached directory entry with the parts of the os.DirEntry interface ls needs"""
+
+    __slots__ = ('name', 'path', '_kind', '_stat', '_stat_time')
+
+    def __init__(self, entry: os.DirEntry):
+        self.name = entry.name
+        self.path = entry.path
+        try:
+            if entry.is_symlink():
+                self._kind = 'l'
+            elif entry.is_dir(follow_symlinks=False):
+                self._kind = 'd'
+            else:
+                self._kind = 'f'
+        except OSError:
+            self._kind = 'f'
+        self._stat = None
+        self._stat_time = 0.0
+
+    def is_symlink(self) -> bool:
+        return self._kind == 'l'
+
+    def is_dir(self, follow_symlinks: bool = True) -> bool:
+        if self._kind == 'l':
+            return follow_symlinks and os.path.isdir(self.path)
+        return self._kind == 'd'
+
+    def is_file(self, follow_symlinks: bool = True) -> bool:
+        if self._kind == 'l':
+            return follow_symlinks and os.path.isfile(self.path)
+        return self._kind == 'f'
+
+    def stat(self, follow_symlinks: bool = True) -> os.stat_result:
+        if follow_symlinks and self._kind == 'l':
+            return os.stat(self.path)
+        now = time.monotonic()
+        if self._stat is None or now - self._stat_time > STAT_TTL:
+            self._stat = os.lstat(self.path)
+            self._stat_time = now
+        return self._stat
+
+class _Snapshot:
+    __slots__ = ('identity', 'entries', 'by_name', 'size', 'stable')
+
+    def __init__(self, identity: Tuple[int, int, int], entries: List[IndexEntry], stable: bool):
+        self.identity = identity
+        self.entries = entries
+        self.by_name = {entry.name: entry for entry in entries}
+        self.size = ENTRY_OVERHEAD + sum(ENTRY_OVERHEAD + len(entry.path) for entry in entries)
+        self.stable = stable
+
+class _UsageRecord:
+    """
+    Bytes used by a directory itself and the files directly inside it.
+    Files with several hard links are kept aside as (device, inode, bytes)
+    so each is counted once per du run, like du(1).
+    """
+    __slots__ = ('identity', 'own_bytes', 'linked', 'subdirectories', 'size', 'stable',
+                 'measured')
+
+    def __init__(self, identity: Tuple[int, int, int], own_bytes: int,
+                 linked: Tuple[Tuple[int, int, int], ...],
+                 subdirectories: Tuple[str, ...], stable: bool):
+        self.identity = identity
+        self.own_bytes = own_bytes
+        self.linked = linked
+        self.subdirectories = subdirectories
+        self.size = ENTRY_OVERHEAD + 64 * len(linked) + sum(64 + len(name) for name in subdirectories)
+        self.stable = stable
+        self.measured = time.monotonic()
+
+class DiskUsage:
+    """Result of a du walk: total bytes per directory and the tree shape"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.totals: Dict[str, int] = {}
+        self.depths: Dict[str, int] = {root: 0}
+        self.children: Dict[str, List[str]] = {}
+        self.scanned = 0
+        self.reused = 0
+        self.errors: List[str] = []
+
+    def walk(self, path: Optional[str] = None) -> List[str]:
+        """Directories below path in du's order: children before their parent"""
+        order, stack = [], [(path or self.root, False)]
+        while stack:
+            directory, expanded = stack.pop()
+            if expanded:
+                order.append(directory)
+                continue
+            stack.append((directory, True))
+            stack.extend((child, False) for child in reversed(self.children.get(directory, [])))
+        return order
+
+def _disk_bytes(info: os.stat_result) -> int:
+    """Allocated size where the platform reports blocks, apparent size otherwise"""
+    blocks = getattr(info, 'st_blocks', None)
+    return blocks * 512 if blocks is not None else info.st_size
+
+class _LRUCache:
+    """OrderedDict-backed LRU bounded by the summed .size of its values"""
+
+    def __init__(self, budget: int):
+        self.budget = budget
+        self.memory = 0
+        self._items = OrderedDict()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._items
+
+    def get(self, key: str):
+        value = self._items.get(key)
+        if value is not None:
+            self._items.move_to_end(key)
+        return value
+
+    def put(self, key: str, value):
+        self.pop(key)
+        if value.size > self.budget:
+            return
+        self._items[key] = value
+        self.memory += value.size
+        while self.memory > self.budget:
+            _, evicted = self._items.popitem(last=False)
+            self.memory -= evicted.size
+
+    def pop(self, key: str):
+        value = self._items.pop(key, None)
+        if value is not None:
+            self.memory -= value.size
+        return value
+
+    def keys(self) -> List[str]:
+        return list(self._items)
+
+    def clear(self):
+        self._items.clear()
+        self.memory = 0
+
+class DirectoryIndex:
+    """
+    LRU cache of directory listings keyed by absolute path.
+    A cached listing is revalidated with a single stat of the directory
+    (device, inode and mtime) before use, so repeated listings of an
+    unchanged directory cost one stat instead of a full scandir.
+    """
+
+    def __init__(self, memory_budget: int = INDEX_MEMORY_BUDGET,
+                 usage_budget: int = USAGE_MEMORY_BUDGET):
+        self.hits = 0
+        self.misses = 0
+        self._snapshots = _LRUCache(memory_budget)
+        self._usage = _LRUCache(usage_budget)
+        self._lock = threading.Lock()
+
+    def listdir(self, path: str) -> List[IndexEntry]:
+        """Return the entries of a directory, raising OSError like os.scandir"""
+        return self._snapshot(os.path.abspath(path)).entries
+
+    def _snapshot(self, path: str) -> _Snapshot:
+        info = os.stat(path)
+        identity = (info.st_dev, info.st_ino, info.st_mtime_ns)
+        with self._lock:
+            snapshot = self._snapshots.get(path)
+            if snapshot is not None and snapshot.stable and snapshot.identity == identity:
+                self.hits += 1
+                return snapshot
+            self.misses += 1
+
+        with os.scandir(path) as scanner:
+            entries = [IndexEntry(entry) for entry in scanner]
+        snapshot = _Snapshot(identity, entries, time.time() - info.st_mtime > RACY_WINDOW)
+        with self._lock:
+            self._snapshots.put(path, snapshot)
+        return snapshot
+
+    def lookup(self, path: str) -> Optional[IndexEntry]:
+        """
+        Find a path's entry through its parent's cached listing.
+        Returns None when the parent is not indexed or the entry is missing.
+        """
+        path = os.path.abspath(path)
+        parent, name = os.path.split(path)
+        with self._lock:
+            cached = parent in self._snapshots
+        if not cached or not name:
+            return None
+        try:
+            return self._snapshot(parent).by_name.get(name)
+        except OSError:
+            return None
+
+    def is_dir(self, path: str) -> bool:
+        """os.path.isdir answered from the index when the parent is cached"""
+        entry = self.lookup(path)
+        if entry is not None:
+            return entry.is_dir()
+        return os.path.isdir(path)
+
+    def glob(self, pattern: str) -> List[str]:
+        """
+        Expand an absolute wildcard pattern one component at a time using
+        cached listings. Hidden names only match patterns starting with '.'.
+        """
+        drive, rest = os.path.splitdrive(os.path.abspath(pattern))
+        parts = [part for part in rest.split(os.sep) if part]
+        candidates = [drive + os.sep]
+        for index, part in enumerate(parts):
+            last = index == len(parts) - 1
+            matched = []
+            for base in candidates:
+                if not any(char in part for char in '*?['):
+                    path = os.path.join(base, part)
+                    if os.path.lexists(path):
+                        matched.append(path)
+                    continue
+                try:
+                    entries = self.listdir(base)
+                except OSError:
+                    continue
+                for entry in entries:
+                    if entry.name.startswith('.') and not part.startswith('.'):
+                        continue
+                    if not fnmatch.fnmatch(entry.name, part):
+                        continue
+                    if last or entry.is_dir():
+                        matched.append(entry.path)
+            candidates = matched
+        return sorted(candidates)
+
+    def disk_usage(self, root: str, workers: int = USAGE_WORKERS,
+                   cancel: Optional[threading.Event] = None) -> DiskUsage:
+        """
+        Total the bytes under root, walking one depth level at a time with
+        directories stat'ed and scanned in parallel. A directory whose
+        device, inode and mtime match its cached record, measured less than
+        USAGE_TTL seconds ago, is not rescanned: its own file sizes and
+        subdirectory names are reused and only its subdirectories are
+        visited. Files that grow in place leave the directory's mtime alone,
+        so totals can lag behind them by up to USAGE_TTL seconds.
+        """
+        root = os.path.abspath(root)
+        usage = DiskUsage(root)
+        own: Dict[str, int] = {}
+        linked: Dict[str, Tuple[Tuple[int, int, int], ...]] = {}
+        levels = [[root]]
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='terminal-du') as pool:
+            while levels[-1]:
+                if cancel is not None and cancel.is_set():
+                    # Leave the unvisited level out of the totals
+                    own.update((path, 0) for path in levels[-1])
+                    break
+                next_level = []
+                depth = len(levels)
+                for path, record, reused, error in pool.map(self._measure, levels[-1]):
+                    if error:
+                        usage.errors.append(f"du: cannot read directory '{path}': {error}")
+                    if record is None:
+                        own[path] = 0
+                        continue
+                    usage.reused += reused
+                    usage.scanned += not reused
+                    own[path] = record.own_bytes
+                    linked[path] = record.linked
+                    children = [os.path.join(path, name) for name in record.subdirectories]
+                    usage.children[path] = children
+                    for child in children:
+                        usage.depths[child] = depth
+                    next_level.extend(children)
+                levels.append(next_level)
+
+        # Charge each hard-linked file to the first directory that reaches it
+        seen = set()
+        for path in reversed(usage.walk()):
+            for device, inode, size in linked.get(path, ()):
+                if (device, inode) not in seen:
+                    seen.add((device, inode))
+                    own[path] += size
+
+        for level in reversed(levels):
+            for path in level:
+                usage.totals[path] = own[path] + sum(
+                    usage.totals[child] for child in usage.children.get(path, []))
+        return usage
+
+    def _measure(self, path: str) -> Tuple[str, Optional[_UsageRecord], bool, Optional[str]]:
+        """Return (path, record, reused, error) for one directory"""
+        try:
+            info = os.lstat(path)
+        except OSError as e:
+            return path, None, False, e.strerror or str(e)
+        if not os.path.isdir(path) or os.path.islink(path):
+            return path, _UsageRecord(None, _disk_bytes(info), (), (), False), False, None
+
+        identity = (info.st_dev, info.st_ino, info.st_mtime_ns)
+        with self._lock:
+            record = self._usage.get(path)
+        if (record is not None and record.stable and record.identity == identity
+                and time.monotonic() - record.measured <= USAGE_TTL):
+            return path, record, True, None
+
+        own_bytes, linked, subdirectories, error = _disk_bytes(info), [], [], None
+        try:
+            with os.scandir(path) as scanner:
+                for entry in scanner:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirectories.append(entry.name)
+                            continue
+                        entry_info = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if entry_info.st_nlink > 1:
+                        linked.append((entry_info.st_dev, entry_info.st_ino, _disk_bytes(entry_info)))
+                    else:
+                        own_bytes += _disk_bytes(entry_info)
+        except OSError as e:
+            error = e.strerror or str(e)
+        record = _UsageRecord(identity, own_bytes, tuple(linked), tuple(sorted(subdirectories)),
+                              error is None and time.time() - info.st_mtime > RACY_WINDOW)
+        with self._lock:
+            self._usage.put(path, record)
+        return path, record, False, error
+
+    def invalidate(self, path: str):
+        """Drop a directory's cached listing and size"""
+        path = os.path.abspath(path)
+        with self._lock:
+            self._snapshots.pop(path)
+            self._usage.pop(path)
+
+    def clear(self):
+        with self._lock:
+            self._snapshots.clear()
+            self._usage.clear()
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_index() -> DirectoryIndex:
+    """Return the directory index shared by every terminal session in the process"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = DirectoryIndex()
+        return _index
@@ -0,0 +1,136 @@
+"""
+Typo-tolerant word lookup: a BK-tree over edit distance
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+class _Pattern:
+    """A word prepared for repeated edit distance computations against it"""
+
+    __slots__ = ('word', 'masks', 'full', 'last')
+
+    def __init__(self, word: str):
+        self.word = word
+        self.masks: Dict[str, int] = {}
+        for position, char in enumerate(word):
+            self.masks[char] = self.masks.get(char, 0) | (1 << position)
+        self.full = (1 << len(word)) - 1
+        self.last = 1 << (len(word) - 1) if word else 0
+
+    def distance(self, other: str) -> int:
+        """
+        Edit distance to other, by Myers' bit-parallel algorithm: a column
+        of the dynamic-programming table is held as bit vectors of +1/-1
+        steps, so each character of other costs a few integer operations
+        """
+        if not self.word or not other:
+            return len(self.word) or len(other)
+        masks, full, last = self.masks, self.full, self.last
+        up, down, distance = full, 0, len(self.word)
+        for char in other:
+            match = masks.get(char, 0)
+            vertical = match | down
+            horizontal = (((match & up) + up) ^ up) | match
+            right_up = down | ~(horizontal | up)
+            right_down = up & horizontal
+            if right_up & last:
+                distance += 1
+            elif right_down & last:
+                distance -= 1
+            right_up = (right_up << 1) | 1
+            right_down <<= 1
+            up = (right_down | ~(vertical | right_up)) & full
+            down = right_up & vertical & full
+        return distance
+
+def levenshtein(a: str, b: str) -> int:
+    """Edit distance between two words"""
+    return 0 if a == b else _Pattern(a).distance(b)
+
+def typo_distance(a: str, b: str) -> int:
+    """
+    Edit distance counting a swap of adjacent letters as one edit, as in
+    lsit -> list; used to rank matches, since it is not a metric the tree
+    can search by
+    """
+    rows = [list(range(len(b) + 1))]
+    for i in range(1, len(a) + 1):
+        row = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            row[j] = min(rows[i - 1][j] + 1, row[j - 1] + 1,
+                         rows[i - 1][j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                row[j] = min(row[j], rows[i - 2][j - 2] + 1)
+        rows.append(row)
+    return rows[-1][-1]
+
+def max_typos(word: str) -> int:
+    """Edits tolerated for a word of this length: 1 up to 3 letters, then 2"""
+    return 1 if len(word) <= 3 else 2
+
+class BKTree:
+    """
+    Burkhard-Keller tree of words. Each child edge is labelled with its
+    distance from the parent, so by the triangle inequality a search within
+    d of a word only descends edges labelled within d of the parent's
+    distance, visiting a small fraction of the words.
+    """
+
+    def __init__(self, words: Iterable[str] = ()):
+        self._root: Optional[Tuple[str, Dict[int, tuple]]] = None
+        self._words = set()
+        for word in words:
+            self.add(word)
+
+    def __len__(self) -> int:
+        return len(self._words)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self._words
+
+    def add(self, word: str):
+        if not word or word in self._words:
+            return
+        self._words.add(word)
+        if self._root is None:
+            self._root = (word, {})
+            return
+        node = self._root
+        while True:
+            distance = levenshtein(word, node[0])
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = (word, {})
+                return
+            node = child
+
+    def search(self, word: str, max_distance: int) -> List[Tuple[int, str]]:
+        """Words within max_distance edits, as (distance, word), closest first"""
+        found = []
+        pattern = _Pattern(word)
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            candidate, children = stack.pop()
+            distance = pattern.distance(candidate)
+            if distance <= max_distance:
+                found.append((distance, candidate))
+            for edge, child in children.items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    stack.append(child)
+        return sorted(found)
+
+    def suggest(self, word: str, limit: int = 3) -> List[str]:
+        """
+        The closest words to a possibly misspelt one, best first: by typo
+        distance, then length closest to the input, then alphabetically
+        """
+        allowed = max_typos(word)
+        # A swap is two Levenshtein edits; widen one-typo searches so that
+        # sl still finds ls, then filter by typo distance
+        radius = 2 if allowed == 1 else allowed
+        ranked = []
+        for _, candidate in self.search(word, radius):
+            typos = typo_distance(word, candidate)
+            if 0 < typos <= allowed:
+                ranked.append((typos, abs(len(candidate) - len(word)), candidate))
+        return [candidate for _, _, candidate in sorted(ranked)][:limit]
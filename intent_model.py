@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Offline intent classifier: the interpreter's fallback for phrases none of
+its patterns match
+
+Phrases become hashed word, word-pair and character-trigram counts,
+weighted by TF-IDF and scored against one centroid per intent with a
+single matrix product, so a batch of phrases is classified at once. The
+model is trained from intent_corpus.tsv and stored as a compact .npz;
+retrain it with: python intent_model.py
+"""
+
+import hashlib
+import os
+import re
+import shlex
+import threading
+import zlib
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'intent_corpus.tsv')
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'intent_model.npz')
+
+# Size of the hashed feature space
+DIMENSIONS = 4096
+
+# Cosine similarity below which a phrase is left uninterpreted. Words the
+# corpus never uses stay in the scored text, so unknown requests such as
+# "make me a sandwich" fall below it
+MIN_CONFIDENCE = 0.3
+
+# Intents that delete or overwrite files: a model guess at these is only
+# ever offered as a suggestion, never run
+DESTRUCTIVE_INTENTS = {'rm', 'rmdir', 'copy', 'move'}
+
+# Commands run for each intent; {0}, {1} are the slots, in phrase order
+INTENT_COMMANDS = {
+    'list': ['ls'],
+    'list_long': ['ls -la'],
+    'list_dir': ['ls {0}'],
+    'pwd': ['pwd'],
+    'cd': ['cd {0}'],
+    'cd_up': ['cd ..'],
+    'cd_home': ['cd ~'],
+    'mkdir': ['mkdir {0}'],
+    'touch': ['touch {0}'],
+    'rm': ['rm {0}'],
+    'rmdir': ['rm -r {0}'],
+    'cat': ['cat {0}'],
+    'copy': ['cp {0} {1}'],
+    'move': ['mv {0} {1}'],
+    'processes': ['ps'],
+    'system': ['top'],
+    'disk': ['du -h -d 1'],
+    'find': ['find . -name {0}'],
+    'clear': ['clear'],
+    'help': ['help'],
+    'history': ['history'],
+    'jobs': ['jobs'],
+}
+
+WORD_RE = re.compile(r"[a-z]+")
+PLACEHOLDER_RE = re.compile(r"\{[a-z]+\}")
+TOKEN_RE = re.compile(r"\"([^\"]+)\"|'([^']+)'|(\S+)")
+# Unquoted tokens that can only be a path: an extension, a separator or a digit
+PATH_LIKE_RE = re.compile(r"[./_~\d-]")
+
+# Words after which the next token is always a name
+NAME_MARKERS = {'called', 'named'}
+# Words whose unknown neighbour is a name: the file notes, the build folder
+NOUN_MARKERS = {'file', 'folder', 'directory'}
+# Words after which an unknown token is a destination: to projects
+PLACE_MARKERS = {'to', 'into', 'in'}
+
+def _slot_count(intent: str) -> int:
+    return len(set(re.findall(r"\{(\d+)\}", ' '.join(INTENT_COMMANDS[intent]))))
+
+def _features(text: str) -> List[int]:
+    """Hashed feature indices: words, adjacent word pairs and character trigrams"""
+    words = WORD_RE.findall(text.lower())
+    grams = words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+    for word in words:
+        padded = f" {word} "
+        grams += [padded[i:i + 3] for i in range(len(padded) - 2)]
+    # crc32 rather than hash(), which changes between processes
+    return [zlib.crc32(gram.encode()) % DIMENSIONS for gram in grams]
+
+def read_corpus(path: str = CORPUS_PATH) -> List[Tuple[str, str]]:
+    """(intent, phrase) pairs, skipping comments and blank lines"""
+    pairs = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                intent, phrase = line.split('\t', 1)
+                pairs.append((intent, phrase))
+    return pairs
+
+def _digest(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+class IntentModel:
+    """Intent centroids in a hashed TF-IDF space, plus the words the corpus uses"""
+
+    def __init__(self, intents: List[str], centroids: np.ndarray, idf: np.ndarray,
+                 vocabulary: List[str], digest: str = ''):
+        self.intents = intents
+        self.centroids = centroids
+        self.idf = idf
+        self.vocabulary = set(vocabulary)
+        self.digest = digest
+
+    @classmethod
+    def train(cls, pairs: List[Tuple[str, str]], digest: str = '') -> 'IntentModel':
+        intents = sorted(set(intent for intent, _ in pairs))
+        texts = [PLACEHOLDER_RE.sub(' ', phrase) for _, phrase in pairs]
+        counts = cls._counts(texts)
+        document_frequency = (counts > 0).sum(axis=0)
+        idf = (np.log((1 + len(texts)) / (1 + document_frequency)) + 1).astype(np.float32)
+        vectors = cls._normalize(np.log1p(counts) * idf)
+
+        labels = np.array([intents.index(intent) for intent, _ in pairs])
+        centroids = np.stack([vectors[labels == i].mean(axis=0) for i in range(len(intents))])
+        vocabulary = sorted(set(word for text in texts for word in WORD_RE.findall(text.lower())))
+        return cls(intents, cls._normalize(centroids), idf, vocabulary, digest)
+
+    @classmethod
+    def load(cls, path: str = MODEL_PATH) -> 'IntentModel':
+        with np.load(path) as data:
+            return cls(list(data['intents']), data['centroids'], data['idf'],
+                       list(data['vocabulary']), str(data['digest']))
+
+    def save(self, path: str = MODEL_PATH):
+        np.savez_compressed(path, intents=np.array(self.intents), centroids=self.centroids,
+                            idf=self.idf, vocabulary=np.array(sorted(self.vocabulary)),
+                            digest=np.array(self.digest))
+
+    @staticmethod
+    def _counts(texts: List[str]) -> np.ndarray:
+        """Feature counts, one row per text"""
+        rows, columns = [], []
+        for row, text in enumerate(texts):
+            features = _features(text)
+            rows += [row] * len(features)
+            columns += features
+        counts = np.zeros((len(texts), DIMENSIONS), dtype=np.float32)
+        np.add.at(counts, (rows, columns), 1)
+        return counts
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-9)
+
+    def classify(self, texts: List[str]) -> List[Tuple[str, float]]:
+        """The best intent and its cosine similarity for each text, in one pass"""
+        if not texts:
+            return []
+        vectors = self._normalize(np.log1p(self._counts(texts)) * self.idf)
+        scores = vectors @ self.centroids.T
+        best = scores.argmax(axis=1)
+        return [(self.intents[index], float(scores[row, index]))
+                for row, index in enumerate(best)]
+
+    def extract_slots(self, phrase: str) -> Tuple[List[str], str]:
+        """
+        Split a phrase into its file/folder names, in order, and the words
+        left to classify. Names are quoted, follow 'called' or 'named', or
+        are tokens the corpus never uses that look like a path (report.pdf),
+        sit next to file/folder/directory or follow to/into/in. Any other
+        unknown word, such as please or sandwich, is kept as a word
+        """
+        tokens = []
+        for quoted, single, bare in TOKEN_RE.findall(phrase):
+            token = quoted or single or bare.rstrip('?!,;:')
+            if token:
+                tokens.append((token, bool(quoted or single)))
+        
+        slots, words = [], []
+        for position, (token, quoted) in enumerate(tokens):
+            previous = tokens[position - 1][0].lower() if position else ''
+            following = tokens[position + 1][0].lower() if position + 1 < len(tokens) else ''
+            unknown = token.lower() not in self.vocabulary
+            if quoted or previous in NAME_MARKERS or (unknown and (
+                    PATH_LIKE_RE.search(token) or previous in NOUN_MARKERS | PLACE_MARKERS
+                    or following in NOUN_MARKERS)):
+                slots.append(token)
+            else:
+                words.append(token)
+        return slots, ' '.join(words)
+    
+    def interpret(self, phrases: List[str], destructive: bool = False) -> List[Optional[List[str]]]:
+        """
+        Commands for each phrase, or None where the model is not confident,
+        the phrase does not name exactly what its intent needs, or the
+        intent is destructive and destructive is False
+        """
+        split = [self.extract_slots(phrase) for phrase in phrases]
+        results = []
+        for (slots, _), (intent, score) in zip(split, self.classify([text for _, text in split])):
+            if (score < MIN_CONFIDENCE or len(slots) != _slot_count(intent)
+                    or (intent in DESTRUCTIVE_INTENTS and not destructive)):
+                results.append(None)
+            else:
+                names = [shlex.quote(name) for name in slots]
+                results.append([template.format(*names) for template in INTENT_COMMANDS[intent]])
+        return results
+
+_model = None
+_model_lock = threading.Lock()
+
+def get_model() -> IntentModel:
+    """
+    Load the bundled model once per process, retraining it in memory when
+    the corpus has changed since it was saved
+    """
+    global _model
+    with _model_lock:
+        if _model is None:
+            digest = _digest(CORPUS_PATH)
+            try:
+                model = IntentModel.load(MODEL_PATH)
+            except (OSError, KeyError, ValueError):
+                model = None
+            if model is None or model.digest != digest:
+                model = IntentModel.train(read_corpus(CORPUS_PATH), digest)
+            _model = model
+        return _model
+
+def main():
+    model = IntentModel.train(read_corpus(CORPUS_PATH), _digest(CORPUS_PATH))
+    model.save(MODEL_PATH)
+    print(f"Trained {len(model.intents)} intents on {len(read_corpus())} phrases "
+          f"-> {MODEL_PATH} ({os.path.getsize(MODEL_PATH)} bytes)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Background job control for the Python terminal
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Upper bound on concurrently running background jobs across all sessions
+MAX_JOB_WORKERS = 8
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Create the shared job worker pool on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_JOB_WORKERS,
+                                           thread_name_prefix='terminal-job')
+        return _executor
+
+class Job:
+    """A command running in the background with its buffered output"""
+
+    def __init__(self, job_id: int, command: str):
+        self.job_id = job_id
+        self.command = command
+        self.status = 'Pending'
+        self.return_code = None
+        self.process = None
+        self.future = None
+        self.chunks: List[Tuple[str, str]] = []
+        # Set by kill; built-ins running the job stop walking when it is set
+        self.cancelled = threading.Event()
+        self._changed = threading.Condition()
+
+    @property
+    def done(self) -> bool:
+        return self.return_code is not None
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process.pid if self.process else None
+
+    def attach_process(self, process):
+        """Remember the subprocess backing this job so it can be killed"""
+        self.process = process
+        if self.status == 'Killed':
+            process.kill()
+
+    def run(self, runner: Callable[['Job'], Iterator[Tuple[str, object]]]):
+        """Consume the job's output stream, buffering every chunk"""
+        with self._changed:
+            if self.cancelled.is_set():
+                return
+            self.status = 'Running'
+        return_code = 1
+        stream = runner(self)
+        try:
+            for channel, data in stream:
+                if channel == 'exit':
+                    return_code = data
+                else:
+                    with self._changed:
+                        self.chunks.append((channel, data))
+                        self._changed.notify_all()
+                if self.cancelled.is_set():
+                    break
+        except Exception as e:
+            with self._changed:
+                self.chunks.append(('stderr', str(e)))
+        finally:
+            # Closing the stream stops pipeline stages and their processes
+            stream.close()
+            self._finish(-15 if self.cancelled.is_set() else return_code)
+
+    def _finish(self, return_code: int):
+        with self._changed:
+            if self.status != 'Killed':
+                self.status = 'Done' if return_code == 0 else f'Exit {return_code}'
+            self.return_code = return_code
+            self._changed.notify_all()
+
+    def kill(self):
+        """
+        Stop the job, or prevent it from starting if it is still queued. A
+        running built-in stops at its next check of the cancelled event
+        """
+        with self._changed:
+            if self.done:
+                return
+            self.status = 'Killed'
+            self.cancelled.set()
+        if self.future is not None and self.future.cancel():
+            self._finish(-15)
+        elif self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job has finished"""
+        with self._changed:
+            return self._changed.wait_for(lambda: self.done, timeout)
+
+    def iter_output(self) -> Iterator[Tuple[str, str]]:
+        """Yield buffered chunks, then live ones, until the job finishes"""
+        position = 0
+        while True:
+            with self._changed:
+                self._changed.wait_for(lambda: self.done or position < len(self.chunks))
+                pending = self.chunks[position:]
+                finished = self.done
+            position += len(pending)
+            yield from pending
+            if finished and position == len(self.chunks):
+                return
+
+    def output(self, channel: str = 'stdout') -> str:
+        """Return everything the job has written to one channel so far"""
+        with self._changed:
+            return ''.join(data for name, data in self.chunks if name == channel)
+
+    def describe(self) -> str:
+        return f"[{self.job_id}]  {self.status:10s} {self.command}"
+
+class JobManager:
+    """Per-session table of background jobs running on the shared worker pool"""
+
+    def __init__(self):
+        self.jobs: Dict[int, Job] = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def submit(self, command: str, runner: Callable[[Job], Iterator[Tuple[str, object]]]) -> Job:
+        """Start a command in the background"""
+        with self._lock:
+            job = Job(self._next_id, command)
+            self._next_id += 1
+            self.jobs[job.job_id] = job
+        job.future = _get_executor().submit(job.run, runner)
+        return job
+
+    def get(self, spec: Optional[str] = None) -> Optional[Job]:
+        """Look up a job by spec (%n, n, %%, %+ or None for the most recent)"""
+        with self._lock:
+            if spec in (None, '%', '%%', '%+'):
+                return self.jobs[max(self.jobs)] if self.jobs else None
+            try:
+                return self.jobs.get(int(spec.lstrip('%')))
+            except ValueError:
+                return None
+
+    def remove(self, job: Job):
+        with self._lock:
+            self.jobs.pop(job.job_id, None)
+
+    def list(self) -> List[Job]:
+        with self._lock:
+            return [self.jobs[job_id] for job_id in sorted(self.jobs)]
+
+    def pop_finished(self) -> List[Job]:
+        """Remove and return jobs that have finished since the last call"""
+        with self._lock:
+            finished = [job for job in self.jobs.values() if job.done]
+            for job in finished:
+                del self.jobs[job.job_id]
+        return sorted(finished, key=lambda job: job.job_id)
+
+    def shutdown(self):
+        """Kill every job so worker threads do not outlive the session"""
+        for job in self.list():
+            job.kill()
@@ -5,16 +5,13 @@ Python Terminal - A fully functional command terminal built in Python
 
 import sys
 import os
+import shutil
 from typing import Optional
 from colorama import Fore, Back, Style, init
-from prompt_toolkit import prompt
-from prompt_toolkit.history import InMemoryHistory
-from prompt_toolkit.completion import WordCompleter
-from prompt_toolkit.shortcuts import print_formatted_text
-from prompt_toolkit.formatted_text import HTML
 
+# prompt_toolkit is imported by the CLI only, so --web never pays for it
 from terminal_core import PythonTerminal
-from ai_interpreter import AICommandInterpreter
+from ai_interpreter import get_interpreter
 
 # Initialize colorama
 init(autoreset=True)
@@ -22,17 +19,18 @@ init(autoreset=True)
 class TerminalInterface:
     def __init__(self):
         self.terminal = PythonTerminal()
-        self.ai_interpreter = AICommandInterpreter()
-        self.history = InMemoryHistory()
+        self.ai_interpreter = get_interpreter()
         self.ai_mode = False
-        
-        # Command completion
-        self.commands = [
-            'ls', 'cd', 'pwd', 'mkdir', 'rmdir', 'rm', 'cp', 'mv', 'cat', 'echo', 'touch',
-            'clear', 'exit', 'quit', 'ps', 'top', 'kill', 'history', 'alias',
-            'set', 'export', 'help', 'ai', 'normal'
-        ]
-        self.completer = WordCompleter(self.commands)
+        self.history = None
+        self.completer = None
+    
+    def _setup_prompt(self):
+        """Create the prompt_toolkit history and completer on first use"""
+        from prompt_toolkit.history import InMemoryHistory
+        from cli_completion import TerminalCompleter
+        self.history = InMemoryHistory()
+        # Completion is driven by the terminal's command registry
+        self.completer = TerminalCompleter(self.terminal)
     
     def print_welcome(self):
         """Print welcome message"""
@@ -57,46 +55,12 @@ class TerminalInterface:
     
     def print_help(self):
         """Print help message"""
+        sections = self.terminal.commands.help_text(
+            heading=lambda title: f"{Fore.YELLOW}{title}:{Style.RESET_ALL}")
         help_text = f"""
 {Fore.CYAN}Available Commands:{Style.RESET_ALL}
 
-{Fore.YELLOW}File Operations:{Style.RESET_ALL}
-  ls, dir       - List directory contents
-  cd <path>     - Change directory
-  pwd           - Print working directory
-  mkdir <name>  - Create directory
-  rmdir <name>  - Remove empty directory
-  rm <file>     - Remove file/directory (-r for recursive)
-  cp <src> <dst> - Copy file/directory
-  mv <src> <dst> - Move/rename file/directory
-  cat <file>    - Display file contents
-  touch <file>  - Create empty file or update timestamp
-  echo <text>   - Display text (use > filename to redirect to file)
-
-{Fore.YELLOW}System Monitoring:{Style.RESET_ALL}
-  ps            - List running processes
-  top           - Show system information and top processes
-  kill <pid>    - Terminate process by PID
-
-{Fore.YELLOW}Terminal Features:{Style.RESET_ALL}
-  history       - Show command history
-  clear, cls    - Clear screen
-  alias         - Create command aliases
-  set, export   - Set environment variables
-  help          - Show this help message
-  
-{Fore.YELLOW}AI Features:{Style.RESET_ALL}
-  ai            - Enter AI natural language mode
-  normal        - Exit AI mode (return to normal terminal)
-  
-{Fore.YELLOW}Examples:{Style.RESET_ALL}
-  echo "Hello World" > test.txt    - Create file with content
-  ls -la                           - List all files with details
-  mkdir -p dir1/dir2              - Create nested directories
-  rm -r folder                    - Remove folder recursively
-  cp *.txt backup/                - Copy all txt files to backup
-  ps                              - Show running processes
-  top                             - Show system stats
+{sections}
 
 {Fore.GREEN}In AI mode, you can use natural language:{Style.RESET_ALL}
   "create a new folder called test"
@@ -108,11 +72,17 @@ class TerminalInterface:
     
     def run_cli(self):
         """Run the command line interface"""
+        from prompt_toolkit import prompt
+        self._setup_prompt()
         self.print_welcome()
         
         try:
             while True:
                 try:
+                    # Report background jobs that finished since the last prompt
+                    for notification in self.terminal.collect_job_notifications():
+                        print(f"{Fore.CYAN}{notification}{Style.RESET_ALL}")
+                    
                     # Get prompt
                     prompt_text = self.get_prompt()
                     
@@ -133,14 +103,8 @@ class TerminalInterface:
                     elif user_input.lower() == 'help':
                         self.print_help()
                         continue
-                    elif user_input.lower() == 'ai':
-                        self.ai_mode = True
-                        print(f"{Fore.CYAN}AI Mode enabled. Use natural language commands.{Style.RESET_ALL}")
-                        print(f"{Fore.CYAN}Type 'normal' to return to standard terminal mode.{Style.RESET_ALL}")
-                        continue
-                    elif user_input.lower() == 'normal':
-                        self.ai_mode = False
-                        print(f"{Fore.CYAN}Normal terminal mode enabled.{Style.RESET_ALL}")
+                    elif user_input.lower() in ['ai', 'normal']:
+                        self.switch_mode(user_input.lower())
                         continue
                     
                     # Process command based on mode
@@ -159,6 +123,9 @@ class TerminalInterface:
         except Exception as e:
             print(f"{Fore.RED}Fatal error: {str(e)}{Style.RESET_ALL}")
             sys.exit(1)
+        finally:
+            # Background jobs must not keep the process alive after exit
+            self.terminal.jobs.shutdown()
     
     def get_prompt(self) -> str:
         """Get the command prompt"""
@@ -169,30 +136,75 @@ class TerminalInterface:
             return f"{Fore.GREEN}{base_prompt}{Style.RESET_ALL}"
     
     def process_normal_command(self, command: str):
-        """Process a normal terminal command"""
-        output, return_code, error = self.terminal.execute_command(command)
+        """Process a normal terminal command, printing output as it is produced"""
+        stream = self.terminal.execute_command_stream(command)
+        at_line_start = True
+        screen = None
         
-        if return_code == -1:  # Exit command
-            sys.exit(0)
-        elif return_code == 0:
-            if output:
-                # Check for special terminal commands
-                if output.startswith("terminal_command:"):
-                    cmd = output.split(":", 1)[1]
-                    if cmd == "ai":
-                        self.ai_mode = True
-                        print(f"{Fore.CYAN}AI Mode enabled. Use natural language commands.{Style.RESET_ALL}")
-                        print(f"{Fore.CYAN}Type 'normal' to return to standard terminal mode.{Style.RESET_ALL}")
-                    elif cmd == "normal":
-                        self.ai_mode = False
-                        print(f"{Fore.CYAN}Normal terminal mode enabled.{Style.RESET_ALL}")
+        try:
+            for channel, data in stream:
+                if channel == 'exit':
+                    if data == -1:  # Exit command
+                        sys.exit(0)
+                elif channel == 'frame':
+                    screen = self.render_frame(screen, data)
+                elif not data:
+                    continue  # Keep-alive from a follow stream
+                elif channel == 'stdout' and data.startswith("terminal_command:"):
+                    # Check for special terminal commands
+                    self.switch_mode(data.split(":", 1)[1])
                 else:
-                    print(output)
+                    if channel == 'stderr':
+                        sys.stdout.write(f"{Fore.RED}{data}{Style.RESET_ALL}")
+                    else:
+                        sys.stdout.write(data)
+                    sys.stdout.flush()
+                    at_line_start = data.endswith('\n')
+        except KeyboardInterrupt:
+            # Closing the stream stops any running external process
+            stream.close()
+            print(f"{Fore.YELLOW}^C{Style.RESET_ALL}")
+            return
+        
+        if not at_line_start:
+            print()
+    
+    def render_frame(self, screen: Optional[dict], frame: dict) -> dict:
+        """
+        Redraw a live top/watch view in place, rewriting only changed lines
+        Returns the screen state to pass with the next frame
+        """
+        width = shutil.get_terminal_size().columns - 1
+        lines = self.terminal._apply_frame(screen['lines'] if screen else [], frame)
+        changed = {index for index, _ in frame['changed']}
+        
+        if screen is None:
+            output = [line[:width] + '\n' for line in lines]
+            height = len(lines)
         else:
-            if error:
-                print(f"{Fore.RED}{error}{Style.RESET_ALL}")
-            if output:
-                print(output)
+            # The cursor sits below the drawn area; go back up and walk down it,
+            # redrawing changed rows and blanking rows the new frame no longer has
+            height = max(screen['height'], len(lines))
+            output = [f"\x1b[{screen['height']}A"] if screen['height'] else []
+            for index in range(height):
+                if index >= len(lines):
+                    output.append('\r\x1b[2K')
+                elif index in changed or index >= screen['height']:
+                    output.append('\r\x1b[2K' + lines[index][:width])
+                output.append('\n')
+        sys.stdout.write(''.join(output))
+        sys.stdout.flush()
+        return {'lines': lines, 'height': height}
+    
+    def switch_mode(self, mode: str):
+        """Switch between AI and normal terminal modes"""
+        if mode == "ai":
+            self.ai_mode = True
+            print(f"{Fore.CYAN}AI Mode enabled. Use natural language commands.{Style.RESET_ALL}")
+            print(f"{Fore.CYAN}Type 'normal' to return to standard terminal mode.{Style.RESET_ALL}")
+        elif mode == "normal":
+            self.ai_mode = False
+            print(f"{Fore.CYAN}Normal terminal mode enabled.{Style.RESET_ALL}")
     
     def process_ai_command(self, natural_command: str):
         """Process an AI natural language command"""
@@ -206,7 +218,8 @@ class TerminalInterface:
         
         if len(commands) == 1 and commands[0] == natural_command:
             # No interpretation found, suggest commands
-            suggestions = self.ai_interpreter.suggest_commands(natural_command)
+            suggestions = self.ai_interpreter.suggest_commands(
+                natural_command, self.terminal.command_index())
             if suggestions:
                 print(f"{Fore.YELLOW}Could not interpret command. Did you mean:{Style.RESET_ALL}")
                 for suggestion in suggestions[:3]:  # Show top 3 suggestions
@@ -0,0 +1,252 @@
+"""
+Parallel file search backing the terminal's grep and find built-ins
+"""
+
+import fnmatch
+import functools
+import mmap
+import os
+import re
+import threading
+from collections import deque
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# Files are scanned in-process when a search touches fewer than this many,
+# since starting worker processes would cost more than the scan itself
+PARALLEL_MIN_FILES = 64
+
+# Files handed to a worker process at a time
+BATCH_SIZE = 32
+
+# Bytes inspected when deciding whether a file is binary
+BINARY_SNIFF_SIZE = 8192
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool():
+    """Create the shared search worker pool on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # multiprocessing is slow to import; only large searches need it
+            from concurrent.futures import ProcessPoolExecutor
+            _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+        return _pool
+
+@functools.lru_cache(maxsize=32)
+def _compile(pattern: bytes, flags: int):
+    return re.compile(pattern, flags | re.MULTILINE)
+
+def _load(f):
+    """
+    Map an open file read-only, or read it whole when it cannot be mapped:
+    /proc files and FIFOs report a size of 0 but still have contents
+    """
+    if os.fstat(f.fileno()).st_size:
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            pass
+    return f.read()
+
+def scan_file(path: str, pattern: bytes, flags: int, invert: bool,
+              mode: str) -> Tuple[str, str, object]:
+    """
+    Search one file through a read-only memory map, or its contents when it
+    cannot be mapped.
+    mode is 'lines' (matching lines), 'count' or 'files' (first match only).
+    Returns: (path, kind, payload) where kind is 'lines' with a list of
+    (line_number, text), 'count' with an int, 'binary' with a bool or
+    'error' with a message.
+    """
+    regex = _compile(pattern, flags)
+    matches = []
+    try:
+        with open(path, 'rb') as f:
+            data = _load(f)
+            try:
+                binary = data.find(b'\0', 0, BINARY_SNIFF_SIZE) != -1
+                first_only = mode == 'files' or (binary and mode != 'count')
+                for line_number, start, end in _matching_lines(data, len(data), regex, invert):
+                    matches.append((line_number, data[start:end].decode('utf-8', 'replace')))
+                    if first_only:
+                        break
+            finally:
+                if isinstance(data, mmap.mmap):
+                    data.close()
+    except (OSError, ValueError) as e:
+        return path, 'error', getattr(e, 'strerror', None) or str(e)
+
+    if mode == 'count':
+        return path, 'count', len(matches)
+    if binary:
+        return path, 'binary', bool(matches)
+    return path, 'lines', matches
+
+def _matching_lines(data, size: int, regex, invert: bool) -> Iterator[Tuple[int, int, int]]:
+    """Yield (line_number, start, end) for each selected line of a buffer"""
+    if invert:
+        position, line_number = 0, 0
+        while position < size:
+            end = data.find(b'\n', position)
+            end = size if end < 0 else end
+            line_number += 1
+            if regex.search(data[position:end]) is None:
+                yield line_number, position, end
+            position = end + 1
+        return
+
+    # Let the regex engine skip over non-matching text, then widen each hit
+    # to its line; line numbers are counted lazily between hits
+    position, line_number, counted_to = 0, 1, 0
+    while position < size:
+        match = regex.search(data, position)
+        # An empty match after the final newline is not on any line
+        if match is None or (match.start() == size and data[size - 1:size] == b'\n'):
+            return
+        start = data.rfind(b'\n', 0, match.start()) + 1
+        end = data.find(b'\n', match.start())
+        end = size if end < 0 else end
+        line_number += data[counted_to:start].count(b'\n')
+        counted_to = start
+        yield line_number, start, end
+        position = end + 1
+
+def _scan_batch(paths: List[str], pattern: bytes, flags: int, invert: bool,
+                mode: str) -> List[Tuple[str, str, object]]:
+    return [scan_file(path, pattern, flags, invert, mode) for path in paths]
+
+def iter_files(paths: Iterable[str], recursive: bool, follow_symlinks: bool = False,
+               cancel: Optional[threading.Event] = None) -> Iterator[Tuple[str, Optional[str]]]:
+    """
+    Walk paths with os.scandir in a stable (sorted) order.
+    Yields (path, error) where error is set for unreadable operands.
+    Stops early once cancel, if given, is set.
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            if not recursive:
+                yield path, "Is a directory"
+                continue
+            stack = [path]
+            while stack:
+                if cancel is not None and cancel.is_set():
+                    return
+                directory = stack.pop()
+                try:
+                    with os.scandir(directory) as scanner:
+                        entries = sorted(scanner, key=lambda entry: entry.name)
+                except OSError as e:
+                    yield directory, e.strerror or str(e)
+                    continue
+                subdirectories = []
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=follow_symlinks):
+                        subdirectories.append(entry.path)
+                    elif entry.is_file(follow_symlinks=follow_symlinks):
+                        yield entry.path, None
+                stack.extend(reversed(subdirectories))
+        elif os.path.exists(path):
+            yield path, None
+        else:
+            yield path, "No such file or directory"
+
+def search_files(files: Iterable[str], pattern: bytes, flags: int = 0, invert: bool = False,
+                 mode: str = 'lines') -> Iterator[Tuple[str, str, object]]:
+    """
+    Search files for a byte regex, yielding scan_file results in input order.
+    Large searches are split into batches across a process pool; a bounded
+    window of batches is kept in flight so results stream back as the walk
+    proceeds.
+    """
+    files = iter(files)
+    head = []
+    for path in files:
+        head.append(path)
+        if len(head) >= PARALLEL_MIN_FILES:
+            break
+    else:
+        for path in head:
+            yield scan_file(path, pattern, flags, invert, mode)
+        return
+
+    pool = _get_pool()
+    window = (os.cpu_count() or 1) * 2
+    in_flight = deque()
+
+    def batches():
+        batch = head
+        for path in files:
+            batch.append(path)
+            if len(batch) >= BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    for batch in batches():
+        in_flight.append(pool.submit(_scan_batch, batch, pattern, flags, invert, mode))
+        while len(in_flight) >= window or (in_flight and in_flight[0].done()):
+            yield from in_flight.popleft().result()
+    while in_flight:
+        yield from in_flight.popleft().result()
+
+def find_paths(roots: Iterable[str], name: Optional[str] = None, iname: Optional[str] = None,
+               kind: Optional[str] = None, max_depth: Optional[int] = None,
+               min_depth: int = 0,
+               cancel: Optional[threading.Event] = None) -> Iterator[Tuple[str, Optional[str]]]:
+    """
+    Walk roots with os.scandir, yielding (path, error) for entries that match
+    the name pattern and type ('f', 'd' or 'l'); stops early once cancel,
+    if given, is set
+    """
+    def matches(path: str, entry_kind: str, depth: int) -> bool:
+        base = os.path.basename(path.rstrip(os.sep)) or path
+        return (depth >= min_depth
+                and (kind is None or kind == entry_kind)
+                and (name is None or fnmatch.fnmatchcase(base, name))
+                and (iname is None or fnmatch.fnmatchcase(base.lower(), iname.lower())))
+
+    def list_directory(directory: str) -> List[os.DirEntry]:
+        with os.scandir(directory) as scanner:
+            return sorted(scanner, key=lambda entry: entry.name)
+
+    for root in roots:
+        if not os.path.lexists(root):
+            yield root, "No such file or directory"
+            continue
+        root_kind = 'l' if os.path.islink(root) else 'd' if os.path.isdir(root) else 'f'
+        if matches(root, root_kind, 0):
+            yield root, None
+        if root_kind != 'd' or max_depth == 0:
+            continue
+
+        # Depth-first, visiting each directory's children right after it, like find(1)
+        try:
+            stack = [(iter(list_directory(root)), root, 1)]
+        except OSError as e:
+            yield root, e.strerror or str(e)
+            continue
+        while stack:
+            if cancel is not None and cancel.is_set():
+                return
+            entries, directory, depth = stack[-1]
+            entry = next(entries, None)
+            if entry is None:
+                stack.pop()
+                continue
+            path = os.path.join(directory, entry.name)
+            if entry.is_symlink():
+                entry_kind = 'l'
+            elif entry.is_dir():
+                entry_kind = 'd'
+            else:
+                entry_kind = 'f'
+            if matches(path, entry_kind, depth):
+                yield path, None
+            if entry_kind == 'd' and (max_depth is None or depth < max_depth):
+                try:
+                    stack.append((iter(list_directory(path)), path, depth + 1))
+                except OSError as e:
+                    yield path, e.strerror or str(e)
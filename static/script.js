@@ -10,6 +10,9 @@ class PythonTerminal {
         this.sessionId = this.generateSessionId();
         this.commandHistory = [];
         this.historyIndex = -1;
+        this.currentOutput = null;
+        this.currentFrame = null;
+        this.activeRequest = null;
         
         this.init();
     }
@@ -61,6 +64,13 @@ class PythonTerminal {
                 e.preventDefault();
                 // TODO: Implement tab completion
                 break;
+            case 'c':
+                // Ctrl+C stops a running stream such as tail -f, top -d or watch
+                if (e.ctrlKey && this.activeRequest && !this.commandInput.value) {
+                    e.preventDefault();
+                    this.activeRequest.abort();
+                }
+                break;
         }
     }
     
@@ -106,9 +116,16 @@ class PythonTerminal {
             return;
         }
         
+        if (this.activeRequest) {
+            this.activeRequest.abort();
+        }
+        const request = new AbortController();
+        this.activeRequest = request;
+        
         try {
-            const response = await fetch('/execute', {
+            const response = await fetch('/execute_stream', {
                 method: 'POST',
+                signal: request.signal,
                 headers: {
                     'Content-Type': 'application/json'
                 },
@@ -119,54 +136,130 @@ class PythonTerminal {
                 })
             });
             
-            const data = await response.json();
-            
-            if (data.success) {
-                this.handleCommandResponse(data);
-            } else {
+            if (!response.ok) {
+                const data = await response.json();
                 this.addToTerminal(data.error || 'Unknown error', 'error');
+                return;
             }
+            
+            await this.readEventStream(response, (event, data) => this.handleStreamEvent(event, data));
         } catch (error) {
-            this.addToTerminal(`Network error: ${error.message}`, 'error');
+            if (error.name === 'AbortError') {
+                this.addToTerminal('^C', 'info');
+            } else {
+                this.addToTerminal(`Network error: ${error.message}`, 'error');
+            }
+        } finally {
+            if (this.activeRequest === request) {
+                this.activeRequest = null;
+            }
+            this.currentFrame = null;
         }
     }
     
-    handleCommandResponse(data) {
-        if (data.ai_mode) {
-            // AI mode response
-            if (data.interpreted_commands && data.interpreted_commands.length > 0) {
-                this.addToTerminal(`AI interpreted: "${data.original_command}"`, 'ai-interpretation');
+    async readEventStream(response, onEvent) {
+        // EventSource only supports GET, so Server-Sent Events are parsed by hand
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            
+            buffer += decoder.decode(value, { stream: true });
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const frame = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
                 
-                for (let i = 0; i < data.results.length; i++) {
-                    const result = data.results[i];
-                    this.addToTerminal(`→ ${result.command}`, 'info');
-                    
-                    if (result.output) {
-                        this.addToTerminal(result.output, result.return_code === 0 ? 'success' : 'error');
-                    }
-                    
-                    if (result.error) {
-                        this.addToTerminal(result.error, 'error');
+                let event = 'message';
+                let data = '';
+                for (const line of frame.split('\n')) {
+                    if (line.startsWith('event: ')) {
+                        event = line.slice(7);
+                    } else if (line.startsWith('data: ')) {
+                        data += line.slice(6);
                     }
                 }
-            } else {
-                this.addToTerminal('Could not interpret natural language command', 'error');
-            }
-        } else {
-            // Normal mode response
-            if (data.output) {
-                this.addToTerminal(data.output, data.return_code === 0 ? 'success' : 'error');
-            }
-            
-            if (data.error) {
-                this.addToTerminal(data.error, 'error');
+                onEvent(event, data ? JSON.parse(data) : {});
             }
         }
-        
-        // Update prompt
-        if (data.prompt) {
-            this.prompt.textContent = data.prompt;
+    }
+    
+    handleStreamEvent(event, data) {
+        switch (event) {
+            case 'interpreted':
+                this.addToTerminal(`AI interpreted: "${data.original_command}"`, 'ai-interpretation');
+                break;
+            case 'command':
+                if (this.aiMode) {
+                    this.addToTerminal(`→ ${data.command}`, 'info');
+                }
+                this.currentOutput = null;
+                this.currentFrame = null;
+                break;
+            case 'frame':
+                this.renderFrame(data.data);
+                break;
+            case 'stdout':
+                if (data.data.startsWith('terminal_command:')) {
+                    const mode = data.data.split(':', 2)[1];
+                    if ((mode === 'ai') !== this.aiMode) {
+                        this.toggleAIMode();
+                    }
+                } else {
+                    this.appendOutput(data.data, 'success');
+                }
+                break;
+            case 'stderr':
+                this.appendOutput(data.data, 'error');
+                break;
+            case 'exit':
+                if (data.return_code !== 0 && this.currentOutput) {
+                    this.currentOutput.className = 'output error';
+                }
+                this.currentOutput = null;
+                this.currentFrame = null;
+                break;
+            case 'done':
+                for (const notification of data.notifications || []) {
+                    this.addToTerminal(notification, 'info');
+                }
+                
+                // Update prompt
+                if (data.prompt) {
+                    this.prompt.textContent = this.aiMode ? `[AI] ${data.prompt}` : data.prompt;
+                }
+                break;
+        }
+    }
+    
+    renderFrame(frame) {
+        // Live top/watch views send only changed lines; patch them in place
+        if (!this.currentFrame) {
+            this.currentFrame = this.addToTerminal('', 'success');
+        }
+        const rows = this.currentFrame.children;
+        while (rows.length > frame.lines) {
+            this.currentFrame.lastChild.remove();
+        }
+        while (rows.length < frame.lines) {
+            this.currentFrame.appendChild(document.createElement('div'));
         }
+        for (const [index, text] of frame.changed) {
+            rows[index].textContent = text || '\u00a0';
+        }
+        this.terminal.scrollTop = this.terminal.scrollHeight;
+    }
+    
+    appendOutput(text, className) {
+        // Consecutive chunks of the same kind grow a single block as they arrive
+        if (!this.currentOutput || !this.currentOutput.classList.contains(className)) {
+            this.currentOutput = this.addToTerminal('', className);
+        }
+        this.currentOutput.textContent += text;
+        this.terminal.scrollTop = this.terminal.scrollHeight;
     }
     
     addToTerminal(text, className = '') {
@@ -180,6 +273,7 @@ class PythonTerminal {
         
         // Scroll to bottom
         this.terminal.scrollTop = this.terminal.scrollHeight;
+        return output;
     }
     
     toggleAIMode() {
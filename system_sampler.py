@@ -0,0 +1,224 @@
+"""
+Shared background sampler of system and per-process statistics for ps and top
+"""
+
+import threading
+import time
+from array import array
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Seconds between samples while someone is reading snapshots
+SAMPLE_INTERVAL = 1.0
+
+# Snapshots older than this are refreshed synchronously instead of served
+SNAPSHOT_TTL = 5.0
+
+# The sampler thread exits after this long without a reader, so an idle
+# terminal costs nothing; the next read starts it again
+IDLE_TIMEOUT = 60.0
+
+# Delay between the priming sample and the first real one, so the very first
+# ps/top still reports CPU deltas instead of zeros
+PRIME_INTERVAL = 0.1
+
+# Samples kept for trend sparklines (two minutes at the default interval)
+HISTORY_SIZE = 120
+
+SPARK_CHARS = '▁▂▃▄▅▆▇█'
+
+PROCESS_ATTRS = ['pid', 'name', 'username', 'status', 'create_time', 'cpu_times', 'memory_info']
+
+class ProcessSample(NamedTuple):
+    pid: int
+    name: str
+    username: str
+    status: str
+    cpu_percent: float
+    memory_percent: float
+    rss: int
+    create_time: float
+
+class SystemSnapshot(NamedTuple):
+    timestamp: float
+    cpu_percent: float
+    memory: object
+    disk: object
+    processes: Dict[int, ProcessSample]
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.timestamp
+
+class RingBuffer:
+    """Fixed-capacity ring of floats stored in a compact array"""
+
+    def __init__(self, capacity: int):
+        self._data = array('f', [0.0]) * capacity
+        self._capacity = capacity
+        self._start = 0
+        self._length = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def append(self, value: float):
+        index = (self._start + self._length) % self._capacity
+        self._data[index] = value
+        if self._length < self._capacity:
+            self._length += 1
+        else:
+            self._start = (self._start + 1) % self._capacity
+
+    def values(self, last: Optional[int] = None) -> List[float]:
+        """The most recent values, oldest first"""
+        count = self._length if last is None else min(last, self._length)
+        first = self._start + self._length - count
+        return [self._data[(first + i) % self._capacity] for i in range(count)]
+
+def sparkline(values: List[float], maximum: float = 100.0) -> str:
+    """Render values in [0, maximum] as a row of block characters"""
+    top = len(SPARK_CHARS) - 1
+    return ''.join(SPARK_CHARS[max(0, min(top, round(value / maximum * top)))]
+                   for value in values)
+
+class SystemSampler:
+    """
+    Samples system-wide and per-process counters on a daemon thread and
+    publishes immutable snapshots. CPU percentages are computed from
+    cpu_times deltas between consecutive samples, keyed by (pid,
+    create_time) so a recycled PID never inherits another process's history.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL, ttl: float = SNAPSHOT_TTL,
+                 idle_timeout: float = IDLE_TIMEOUT):
+        self.interval = interval
+        self.ttl = ttl
+        self.idle_timeout = idle_timeout
+        self._snapshot: Optional[SystemSnapshot] = None
+        self.cpu_history = RingBuffer(HISTORY_SIZE)
+        self.memory_history = RingBuffer(HISTORY_SIZE)
+        self._previous_cpu: Optional[Tuple[float, float]] = None
+        self._previous_processes: Dict[Tuple[int, float], float] = {}
+        self._previous_time = 0.0
+        self._last_read = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._sample_lock = threading.Lock()
+
+    def snapshot(self, max_age: Optional[float] = None) -> SystemSnapshot:
+        """
+        Return the latest snapshot, sampling now only if none is fresh enough.
+        max_age tightens the default TTL for callers refreshing faster than
+        the sampling interval, such as top -d 0.5.
+        """
+        max_age = self.ttl if max_age is None else min(max_age, self.ttl)
+        with self._lock:
+            self._last_read = time.monotonic()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='terminal-sampler',
+                                                daemon=True)
+                self._thread.start()
+            snapshot = self._snapshot
+        if snapshot is not None and snapshot.age <= max_age:
+            return snapshot
+
+        with self._sample_lock:
+            # Another reader may have refreshed it while we waited
+            if self._snapshot is not None and self._snapshot.age <= max_age:
+                return self._snapshot
+            if not self._has_baseline():
+                self._sample()
+            wait = PRIME_INTERVAL - (time.monotonic() - self._previous_time)
+            if wait > 0:
+                time.sleep(wait)
+            return self._sample()
+
+    def _has_baseline(self) -> bool:
+        return self._previous_cpu is not None and time.monotonic() - self._previous_time <= self.ttl
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if time.monotonic() - self._last_read > self.idle_timeout:
+                    self._thread = None
+                    return
+            with self._sample_lock:
+                # A reader may have sampled recently; keep samples an interval apart
+                wait = self.interval - (time.monotonic() - self._previous_time)
+                if wait <= 0:
+                    try:
+                        self._sample()
+                    except Exception:
+                        pass
+                    wait = self.interval
+            time.sleep(wait)
+
+    def _sample(self) -> SystemSnapshot:
+        """
+        Take one sample, diffing CPU counters against the previous one.
+        Samples without a recent baseline only prime the counters and are
+        not published, since their CPU figures would be meaningless.
+        """
+        import psutil  # Deferred so importing the terminal stays fast
+        
+        primed = self._has_baseline()
+        now = time.monotonic()
+        elapsed = now - self._previous_time if primed else 0.0
+
+        cpu_times = psutil.cpu_times()
+        idle = cpu_times.idle + getattr(cpu_times, 'iowait', 0.0)
+        total = sum(cpu_times)
+        cpu_percent = 0.0
+        if primed:
+            total_delta = total - self._previous_cpu[0]
+            idle_delta = idle - self._previous_cpu[1]
+            if total_delta > 0:
+                cpu_percent = max(0.0, min(100.0, (total_delta - idle_delta) / total_delta * 100))
+
+        memory = psutil.virtual_memory()
+        try:
+            disk = psutil.disk_usage('/')
+        except OSError:
+            disk = None
+
+        processes, cpu_seconds = {}, {}
+        for proc in psutil.process_iter(PROCESS_ATTRS):
+            info = proc.info
+            key = (info['pid'], info['create_time'])
+            times = info['cpu_times']
+            used = times.user + times.system if times else 0.0
+            cpu_seconds[key] = used
+            previous = self._previous_processes.get(key) if primed else None
+            process_cpu = (used - previous) / elapsed * 100 if previous is not None and elapsed else 0.0
+            rss = info['memory_info'].rss if info['memory_info'] else 0
+            processes[info['pid']] = ProcessSample(
+                pid=info['pid'],
+                name=info['name'] or '',
+                username=info['username'] or '',
+                status=info['status'] or '',
+                cpu_percent=max(process_cpu, 0.0),
+                memory_percent=rss / memory.total * 100 if memory.total else 0.0,
+                rss=rss,
+                create_time=info['create_time'] or 0.0,
+            )
+
+        snapshot = SystemSnapshot(now, cpu_percent, memory, disk, processes)
+        self._previous_cpu = (total, idle)
+        self._previous_processes = cpu_seconds
+        self._previous_time = now
+        if primed:
+            self._snapshot = snapshot
+            self.cpu_history.append(cpu_percent)
+            self.memory_history.append(memory.percent)
+        return snapshot
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+def get_sampler() -> SystemSampler:
+    """Return the sampler shared by every terminal session in the process"""
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = SystemSampler()
+        return _sampler
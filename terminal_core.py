@@ -1,33 +1,141 @@
 import os
 import sys
+import codecs
+import queue
 import subprocess
 import platform
-from typing import Dict, List, Tuple
-from colorama import Fore, Back, Style, init
-import psutil
+import threading
+import time
+import re
+import stat
+import heapq
+import itertools
+import mmap
+import glob
+import json
+import copy
+import signal
+import shutil
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 import shlex
 
-# Initialize colorama for cross-platform colored output
-init(autoreset=True)
+from command_registry import Command, CommandRegistry
+from environment import Environment
+from file_operations import copy_paths, remove_tree, remove_tree_async
+from fs_index import IndexEntry, get_index
+from fuzzy_match import BKTree
+from job_control import JobManager
+from search import find_paths, iter_files, search_files
+from system_sampler import get_sampler, sparkline
+
+_system_info = None
+_system_info_lock = threading.Lock()
+
+def get_system_info() -> Dict:
+    """
+    Describe the host once per process, on first use; platform.processor()
+    can shell out to uname, so sessions must not each pay for it
+    """
+    global _system_info
+    with _system_info_lock:
+        if _system_info is None:
+            _system_info = {
+                'platform': platform.system(),
+                'platform_release': platform.release(),
+                'platform_version': platform.version(),
+                'architecture': platform.machine(),
+                'processor': platform.processor(),
+                'python_version': platform.python_version()
+            }
+        return _system_info
+
+# Unquoted characters only the shell understands: redirection, lists,
+# expansions and command substitution
+SHELL_SYNTAX_RE = re.compile(r"[<>;$`&]")
+
+class CommandError(Exception):
+    """
+    Raised by streaming built-ins; the message, if any, is reported on
+    stderr and status is the command's exit status
+    """
+    
+    def __init__(self, message: str = "", status: int = 1):
+        super().__init__(message)
+        self.status = status
+
+class UnsupportedOption(CommandError):
+    """
+    Raised when a built-in is given an option it does not implement; a
+    built-in standing in for a system tool then hands the command to it
+    """
+    pass
 
 class PythonTerminal:
+    # Every built-in, by name and alias; see _register_builtins below
+    commands = CommandRegistry()
+    
+    # ps columns: (header, width, alignment); a width of 0 leaves the column unpadded
+    PS_COLUMNS = {
+        'pid': ('PID', 8, '>'), 'ppid': ('PPID', 8, '>'), 'name': ('NAME', 20, '<'),
+        'user': ('USER', 12, '<'), 'status': ('STATUS', 10, '<'), 'cpu': ('CPU%', 6, '>'),
+        'mem': ('MEM%', 6, '>'), 'rss': ('RSS', 8, '>'), 'threads': ('THR', 4, '>'),
+        'started': ('STARTED', 8, '>'), 'cmd': ('COMMAND', 0, '<')
+    }
+    PS_DEFAULT_COLUMNS = ['pid', 'name', 'cpu', 'mem']
+    
+    # Columns the system sampler does not collect, fetched only for the rows shown
+    PS_EXTRA_ATTRS = {'ppid': 'ppid', 'threads': 'num_threads', 'cmd': 'cmdline'}
+    
+    # Refresh interval of top -d and watch -n when none is given
+    LIVE_INTERVAL = 2.0
+    
+    # Samples shown in top's CPU and memory sparklines
+    SPARKLINE_WIDTH = 40
+    
+    # Default page size for ls --page
+    LS_PAGE_SIZE = 100
+    
+    # Bytes inspected when deciding whether a file is binary
+    BINARY_SNIFF_SIZE = 8192
+    
+    # tail -f polls every FOLLOW_MIN_INTERVAL seconds while data is arriving,
+    # backing off to FOLLOW_MAX_INTERVAL when the file is idle
+    FOLLOW_MIN_INTERVAL = 0.05
+    FOLLOW_MAX_INTERVAL = 1.0
+    FOLLOW_HEARTBEAT = 15.0
+
+    # Size of each read from a streaming subprocess pipe
+    STREAM_CHUNK_SIZE = 64 * 1024
+    
+    # Foreground external commands are stopped after this many seconds;
+    # run a command with a trailing '&' to lift the limit
+    COMMAND_TIMEOUT = 30
+    
+    # Exit status of sh for a command it could not find
+    COMMAND_NOT_FOUND = 127
+    
+    # Built-ins that expand wildcards in their own operands, so a pipeline
+    # stage using one does not need the shell
+    GLOB_COMMANDS = {'cp', 'copy', 'grep'}
+
     def __init__(self):
         self.current_directory = os.getcwd()
         self.command_history = []
-        self.environment_vars = os.environ.copy()
+        self.environment_vars = Environment()
         self.aliases = {}
-        self.system_info = self._get_system_info()
-        
-    def _get_system_info(self) -> Dict:
-        """Get basic system information"""
-        return {
-            'platform': platform.system(),
-            'platform_release': platform.release(),
-            'platform_version': platform.version(),
-            'architecture': platform.machine(),
-            'processor': platform.processor(),
-            'python_version': platform.python_version()
-        }
+        self.jobs = JobManager()
+        self.fs_index = get_index()
+        self._command_index = None
+        self._indexed_history = 0
+        self._missing_commands = set()
+        # Set when this terminal runs a background job; killing the job sets it
+        self._cancel: Optional[threading.Event] = None
+    
+    @property
+    def system_info(self) -> Dict:
+        """Basic system information, shared by every session in the process"""
+        return get_system_info()
     
     def execute_command(self, command: str) -> Tuple[str, int, str]:
         """
@@ -40,6 +148,41 @@ class PythonTerminal:
         # Add to history
         self.command_history.append(command)
         
+        return self._run_command(command)
+    
+    def execute_command_data(self, command: str) -> Tuple[Dict, int, str]:
+        """
+        Execute a command, returning typed data rather than formatted text
+        Returns: (data, return_code, error) where data is a 'columnar',
+        'records' or 'object' result for commands with a data method and
+        {'format': 'text', 'text': output} for everything else
+        """
+        if not command.strip():
+            return {'format': 'text', 'text': ''}, 0, ""
+        
+        self.command_history.append(command)
+        
+        parts = self._structured_parts(command)
+        if parts is not None:
+            return self._run_structured(parts[0].lower(), parts[1:])
+        output, return_code, error = self._run_command(command)
+        return {'format': 'text', 'text': output}, return_code, error
+    
+    def _run_command(self, command: str) -> Tuple[str, int, str]:
+        """Execute a command without recording it in history"""
+        command, background = self._split_background(command)
+        if background:
+            return self._cmd_background(command)
+        
+        if self._is_follow_command(command):
+            return "", 1, "tail: follow mode needs a streaming client (the CLI or /execute_stream)"
+        
+        if self._needs_shell(command):
+            return self._execute_external_command(command)
+        stages = self._split_pipeline(command)
+        if len(stages) > 1:
+            return self._collect_stream(self._stream_pipeline(stages, self.COMMAND_TIMEOUT))
+        
         # Parse command
         try:
             parts = shlex.split(command)
@@ -52,63 +195,388 @@ class PythonTerminal:
         cmd = parts[0].lower()
         args = parts[1:] if len(parts) > 1 else []
         
-        # Handle built-in commands first
-        if cmd in ['cd', 'pwd', 'ls', 'dir', 'mkdir', 'rmdir', 'rm', 'del', 
-                   'cp', 'copy', 'mv', 'move', 'cat', 'type', 'echo', 'touch', 'set', 
-                   'export', 'alias', 'history', 'clear', 'cls', 'exit', 'quit', 'help']:
-            return self._handle_builtin_command(cmd, args)
+        entry = self.commands.get(cmd)
+        if entry is not None and '--json' in args and entry.data:
+            data, return_code, error = self._run_structured(cmd, args)
+            return (json.dumps(data) if data is not None else ""), return_code, error
         
-        # Handle special terminal commands
-        if cmd in ['ai', 'normal']:
-            return f"terminal_command:{cmd}", 0, ""
-        
-        # Handle system monitoring commands
-        if cmd in ['ps', 'top', 'htop', 'tasklist', 'kill', 'taskkill']:
-            return self._handle_system_command(cmd, args)
+        # Built-ins, mode switches and plugin commands
+        if entry is not None and entry.runnable and not self._uses_system_tool(entry, args):
+            return self._dispatch(entry, cmd, args)
         
         # Execute external command
         return self._execute_external_command(command)
     
-    def _handle_builtin_command(self, cmd: str, args: List[str]) -> Tuple[str, int, str]:
-        """Handle built-in terminal commands"""
-        try:
-            if cmd == 'cd':
-                return self._cmd_cd(args)
-            elif cmd == 'pwd':
-                return self.current_directory, 0, ""
-            elif cmd in ['ls', 'dir']:
-                return self._cmd_ls(args)
-            elif cmd == 'mkdir':
-                return self._cmd_mkdir(args)
-            elif cmd in ['rmdir', 'rm', 'del']:
-                return self._cmd_remove(args)
-            elif cmd in ['cp', 'copy']:
-                return self._cmd_copy(args)
-            elif cmd in ['mv', 'move']:
-                return self._cmd_move(args)
-            elif cmd in ['cat', 'type']:
-                return self._cmd_cat(args)
-            elif cmd == 'echo':
-                return self._cmd_echo(args)
-            elif cmd == 'touch':
-                return self._cmd_touch(args)
-            elif cmd in ['set', 'export']:
-                return self._cmd_set_env(args)
-            elif cmd == 'alias':
-                return self._cmd_alias(args)
-            elif cmd == 'history':
-                return self._cmd_history(args)
-            elif cmd in ['clear', 'cls']:
-                return "\033[2J\033[H", 0, ""  # Clear screen ANSI codes
-            elif cmd == 'help':
-                return self._cmd_help(args)
-            elif cmd in ['exit', 'quit']:
-                return "exit", -1, ""
+    def execute_command_stream(self, command: str, timeout: Optional[float] = None,
+                               on_spawn=None) -> Iterator[Tuple[str, object]]:
+        """
+        Execute a command and yield its output as it is produced
+        Yields: ('stdout', text) and ('stderr', text) chunks, then ('exit', return_code)
+        on_spawn, if given, is called with the Popen object of an external command
+        """
+        if command.strip():
+            self.command_history.append(command)
+        yield from self._stream_command(command, timeout, on_spawn)
+    
+    def _stream_command(self, command: str, timeout: Optional[float] = None,
+                        on_spawn=None) -> Iterator[Tuple[str, object]]:
+        """Stream a command without recording it in history"""
+        try:
+            parts = shlex.split(command)
+        except ValueError:
+            parts = []
+        background = self._split_background(command)[1]
+        
+        if not background and self._needs_shell(command):
+            yield from self._stream_external_command(command, timeout, on_spawn)
+            return
+        
+        if not background and self._is_live_command(command):
+            try:
+                view = self._live_view(parts[0].lower(), parts[1:])
+            except CommandError as e:
+                yield 'stderr', str(e)
+                yield 'exit', 1
+                return
+            yield from self._stream_frames(*view)
+            return
+        
+        if not background:
+            stages = self._split_pipeline(command)
+            entry = self.commands.get(parts[0].lower()) if parts else None
+            if len(stages) > 1 or (entry is not None and entry.streaming
+                                   and '--json' not in parts
+                                   and not self._uses_system_tool(entry, parts[1:])):
+                # Like external commands, pipelines are bound by the timeout;
+                # a lone streaming built-in such as tail -f is not
+                yield from self._stream_pipeline(stages, timeout if len(stages) > 1 else None)
+                return
+        
+        if parts and not background:
+            cmd = parts[0].lower()
+            entry = self.commands.get(cmd)
+            if entry is None or not entry.runnable or self._uses_system_tool(entry, parts[1:]):
+                yield from self._stream_external_command(command, timeout, on_spawn)
+                return
+            if cmd == 'fg':
+                yield from self._stream_fg(parts[1:])
+                return
+        
+        # Built-ins complete quickly, so they are emitted as a single chunk
+        output, return_code, error = self._run_command(command)
+        if output:
+            yield 'stdout', output
+        if error:
+            yield 'stderr', error
+        yield 'exit', return_code
+    
+    # Structured output
+    
+    def _structured_parts(self, command: str) -> Optional[List[str]]:
+        """Split a command that has a structured form; None for pipelines, jobs and others"""
+        if (self._split_background(command)[1] or self._needs_shell(command)
+                or len(self._split_pipeline(command)) > 1):
+            return None
+        try:
+            parts = shlex.split(command)
+        except ValueError:
+            return None
+        if parts:
+            entry = self.commands.get(parts[0].lower())
+            if entry is not None and entry.data:
+                return parts
+        return None
+    
+    def _run_structured(self, cmd: str, args: List[str]) -> Tuple[Optional[Dict], int, str]:
+        """Run a built-in's data method, with --json stripped from its arguments"""
+        handler = getattr(self, self.commands.get(cmd).data)
+        try:
+            return handler([arg for arg in args if arg != '--json']), 0, ""
+        except CommandError as e:
+            return None, 1, str(e)
+        except Exception as e:
+            return None, 1, f"{cmd}: {e}"
+    
+    def _stage_json(self, cmd: str, args: List[str]) -> Iterator[str]:
+        """Emit a built-in's structured result as one line of JSON in a pipeline"""
+        data, _, error = self._run_structured(cmd, args)
+        if data is None:
+            raise CommandError(error)
+        yield json.dumps(data) + '\n'
+    
+    def _columnar(self, columns: List[str], rows: Iterable[Iterable]) -> Dict:
+        """
+        Encode rows column by column: one list of values per column, so
+        large tables repeat no keys. {'format': 'columnar', 'length': n,
+        'columns': {name: [values...]}}
+        """
+        data = {column: [] for column in columns}
+        lists = [data[column] for column in columns]
+        length = 0
+        for row in rows:
+            for values, value in zip(lists, row):
+                values.append(value)
+            length += 1
+        return {'format': 'columnar', 'length': length, 'columns': data}
+    
+    def _data_ls(self, args: List[str]) -> Dict:
+        switches, offset, limit, targets = self._parse_ls(args)
+        
+        def row(directory: Optional[str], name: str, info: os.stat_result) -> tuple:
+            if stat.S_ISDIR(info.st_mode):
+                kind = 'directory'
+            elif stat.S_ISLNK(info.st_mode):
+                kind = 'symlink'
+            elif stat.S_ISREG(info.st_mode):
+                kind = 'file'
             else:
-                return "", 1, f"Unknown built-in command: {cmd}"
-                
+                kind = 'other'
+            return (directory, name, kind, info.st_size, stat.filemode(info.st_mode),
+                    info.st_mtime)
+        
+        def rows() -> Iterator[tuple]:
+            for path, target in targets:
+                if not self.fs_index.is_dir(target):
+                    yield row(None, path, os.lstat(target))
+                    continue
+                stack = [target]
+                while stack:
+                    directory = stack.pop()
+                    shown = path + directory[len(target):]
+                    try:
+                        entries = self._list_entries(directory, switches, offset, limit)
+                    except PermissionError:
+                        if directory == target:
+                            raise CommandError(f"ls: cannot open directory '{directory}': "
+                                               f"Permission denied")
+                        continue
+                    subdirectories = []
+                    for entry in entries:
+                        try:
+                            yield row(shown, entry.name, entry.stat(follow_symlinks=False))
+                        except OSError:
+                            continue
+                        if 'R' in switches and entry.is_dir(follow_symlinks=False):
+                            subdirectories.append(entry.path)
+                    stack.extend(reversed(subdirectories))
+        
+        return self._columnar(['directory', 'name', 'type', 'size', 'mode', 'mtime'], rows())
+    
+    def _data_ps(self, args: List[str]) -> Dict:
+        columns, processes, extras = self._select_ps(args)
+        return self._columnar(columns, (
+            [self._ps_value(column, proc, extras) for column in columns] for proc in processes
+        ))
+    
+    def _data_top(self, args: List[str]) -> Dict:
+        sampler = get_sampler()
+        snapshot = sampler.snapshot()
+        memory, disk = snapshot.memory, snapshot.disk
+        processes = heapq.nlargest(10, snapshot.processes.values(),
+                                   key=lambda proc: proc.cpu_percent)
+        return {'format': 'object', 'value': {
+            'cpu_percent': snapshot.cpu_percent,
+            'memory': {'percent': memory.percent, 'used': memory.used, 'total': memory.total},
+            'disk': {'percent': disk.percent, 'used': disk.used, 'total': disk.total}
+                    if disk is not None else None,
+            'history': {'cpu_percent': sampler.cpu_history.values(),
+                        'memory_percent': sampler.memory_history.values()},
+            'processes': self._columnar(
+                ['pid', 'name', 'cpu', 'mem'],
+                ((proc.pid, proc.name, proc.cpu_percent, proc.memory_percent)
+                 for proc in processes)
+            )
+        }}
+    
+    def _data_du(self, args: List[str]) -> Dict:
+        switches, values, paths = self._parse_du(args)
+        return self._columnar(['path', 'depth', 'bytes'],
+                              list(self._iter_du(switches, values, paths)))
+    
+    def _data_history(self, args: List[str]) -> Dict:
+        return {'format': 'records', 'records': [
+            {'index': index, 'command': command}
+            for index, command in enumerate(self.command_history, 1)
+        ]}
+    
+    def _data_set(self, args: List[str]) -> Dict:
+        if any('=' in arg for arg in args):
+            raise CommandError("set: --json lists variables and cannot assign them")
+        if not args:
+            return {'format': 'object', 'value': dict(sorted(self.environment_vars.items()))}
+        missing = [arg for arg in args if arg not in self.environment_vars]
+        if missing:
+            raise CommandError(f"Variable '{missing[0]}' not found")
+        return {'format': 'object', 'value': {arg: self.environment_vars[arg] for arg in args}}
+    
+    def _data_alias(self, args: List[str]) -> Dict:
+        return {'format': 'object', 'value': dict(self.aliases)}
+    
+    def _data_jobs(self, args: List[str]) -> Dict:
+        return {'format': 'records', 'records': [
+            {'id': job.job_id, 'pid': job.pid, 'status': job.status,
+             'return_code': job.return_code, 'command': job.command}
+            for job in self.jobs.list()
+        ]}
+    
+    def _data_pwd(self, args: List[str]) -> Dict:
+        return {'format': 'object', 'value': {'path': self.current_directory}}
+    
+    def _split_background(self, command: str) -> Tuple[str, bool]:
+        """Strip a trailing '&' (but not '&&'), reporting whether it was present"""
+        stripped = command.rstrip()
+        if stripped.endswith('&') and not stripped.endswith('&&'):
+            return stripped[:-1].rstrip(), True
+        return command, False
+    
+    def _unquoted(self, command: str) -> str:
+        """
+        A command with its quoted and escaped characters, quotes included,
+        masked by '_', except for expansions inside double quotes
+        """
+        masked = []
+        quote = None
+        escaped = False
+        for char in command:
+            if escaped:
+                masked.append('_')
+                escaped = False
+            elif quote:
+                if char == quote:
+                    quote = None
+                elif char == '\\' and quote == '"':
+                    escaped = True
+                # Double quotes still expand variables and backquotes
+                masked.append(char if quote == '"' and char in '$`' else '_')
+            elif char in '\'"':
+                quote = char
+                masked.append('_')
+            elif char == '\\':
+                escaped = True
+                masked.append('_')
+            else:
+                masked.append(char)
+        return ''.join(masked)
+    
+    def _needs_shell(self, command: str) -> bool:
+        """
+        Check whether a pipeline, or a built-in standing in for a system
+        tool, uses shell syntax the built-ins lack: '||', redirection, '&&',
+        ';', '$', backquotes or a wildcard in a stage that does not expand
+        its own
+        """
+        text = self._unquoted(command)
+        if '|' not in text:
+            words = text.split()
+            entry = self.commands.get(words[0].lower()) if words else None
+            if entry is None or entry.options is None:
+                return False  # Other built-ins, such as echo > file, handle their own syntax
+        if '||' in text or SHELL_SYNTAX_RE.search(text):
+            return True
+        for stage in text.split('|'):
+            words = stage.split()
+            if words and words[0].lower() not in self.GLOB_COMMANDS and any(
+                    char in stage for char in '*?['):
+                return True
+        return False
+    
+    def _split_pipeline(self, command: str) -> List[str]:
+        """
+        Split a command on unquoted '|' characters; a pipeline that needs
+        the shell is left whole
+        """
+        if self._needs_shell(command):
+            return [command]
+        stages = []
+        current = []
+        quote = None
+        i = 0
+        while i < len(command):
+            char = command[i]
+            if quote:
+                if char == quote:
+                    quote = None
+                elif char == '\\' and quote == '"' and i + 1 < len(command):
+                    current.append(char)
+                    i += 1
+                    char = command[i]
+            elif char in '\'"':
+                quote = char
+            elif char == '\\' and i + 1 < len(command):
+                current.append(char)
+                i += 1
+                char = command[i]
+            elif char == '|':
+                stages.append(''.join(current).strip())
+                current = []
+                i += 1
+                continue
+            current.append(char)
+            i += 1
+        stages.append(''.join(current).strip())
+        return stages
+    
+    def _collect_stream(self, stream: Iterator[Tuple[str, object]]) -> Tuple[str, int, str]:
+        """Drain an output stream into an (output, return_code, error) tuple"""
+        output, errors, return_code = [], [], 0
+        screen = None
+        for channel, data in stream:
+            if channel == 'exit':
+                return_code = data
+            elif channel == 'stderr':
+                errors.append(data)
+            elif channel == 'frame':
+                screen = self._apply_frame(screen or [], data)
+            else:
+                output.append(data)
+        if screen is not None:
+            output.append('\n'.join(screen))
+        return ''.join(output), return_code, ''.join(errors)
+    
+    def _resolve_path(self, path: str) -> str:
+        """
+        Resolve a path against the session's current directory. The process
+        cwd is never changed or consulted, so sessions on different threads
+        cannot see each other's directory
+        """
+        path = os.path.expanduser(path)
+        if os.path.isabs(path):
+            return path
+        return os.path.join(self.current_directory, path)
+    
+    def _uses_system_tool(self, entry: Optional[Command], args: List[str]) -> bool:
+        """
+        Check whether a built-in standing in for a system tool is given
+        options only the tool has, so the tool must run instead
+        """
+        if entry is None or entry.options is None:
+            return False
+        try:
+            getattr(self, entry.options)(args)
+        except UnsupportedOption:
+            return shutil.which(entry.name) is not None
+        except CommandError:
+            pass  # Reported by the built-in when it runs
+        return False
+    
+    def _dispatch(self, entry: Command, cmd: str, args: List[str]) -> Tuple[str, int, str]:
+        """Run a registered command, reporting its exceptions as errors"""
+        try:
+            return entry.run(self, args)
         except Exception as e:
             return "", 1, str(e)
+    
+    def _cmd_pwd(self, args: List[str]) -> Tuple[str, int, str]:
+        """Print working directory"""
+        return self.current_directory, 0, ""
+    
+    def _cmd_clear(self, args: List[str]) -> Tuple[str, int, str]:
+        """Clear the screen"""
+        return "\033[2J\033[H", 0, ""  # Clear screen ANSI codes
+    
+    def _cmd_exit(self, args: List[str]) -> Tuple[str, int, str]:
+        """Ask the front end to end the session"""
+        return "exit", -1, ""
 
     def _cmd_cd(self, args: List[str]) -> Tuple[str, int, str]:
         """Change directory command"""
@@ -120,60 +588,144 @@ class PythonTerminal:
         elif args[0] == ".":
             target = self.current_directory
         else:
-            if os.path.isabs(args[0]):
-                target = args[0]
-            else:
-                target = os.path.join(self.current_directory, args[0])
+            target = self._resolve_path(args[0])
         
-        if os.path.exists(target) and os.path.isdir(target):
-            self.current_directory = os.path.abspath(target)
-            os.chdir(self.current_directory)
+        if self.fs_index.is_dir(target):
+            # target is absolute, so normpath needs no process cwd
+            self.current_directory = os.path.normpath(target)
             return self.current_directory, 0, ""
         else:
             return "", 1, f"cd: no such file or directory: {args[0]}"
     
     def _cmd_ls(self, args: List[str]) -> Tuple[str, int, str]:
         """List directory contents"""
-        show_hidden = '-a' in args or '--all' in args
-        long_format = '-l' in args or '--long' in args
-        
-        # Filter out flags to get path
-        paths = [arg for arg in args if not arg.startswith('-')]
-        target_dir = paths[0] if paths else self.current_directory
+        try:
+            output = ''.join(self._stage_ls(args, None))
+        except CommandError as e:
+            return "", 1, str(e)
+        return output.rstrip('\n'), 0, ""
+    
+    def _stage_ls(self, args: List[str], stdin: Optional[Iterator[str]]) -> Iterator[str]:
+        """List directory contents, streaming one directory at a time"""
+        # Entries are tiny, so batch them rather than emitting one chunk each
+        yield from self._coalesce(self._iter_ls(args))
+    
+    def _parse_ls(self, args: List[str]) -> Tuple[Set[str], int, Optional[int], List[Tuple[str, str]]]:
+        """
+        Parse ls arguments
+        Returns: (switches, offset, limit, targets) where targets pairs each
+        path as given with its resolved form
+        """
+        switches, values, paths = self._parse_options(
+            'ls', args, flags='alhRStrU1', valued=('limit', 'page'),
+            long_options={'all': 'a', 'long': 'l', 'human-readable': 'h',
+                          'recursive': 'R', 'reverse': 'r', 'limit': 'limit', 'page': 'page'}
+        )
+        limit = self._parse_count('ls', values['limit']) if 'limit' in values else None
+        page = self._parse_count('ls', values.get('page', '1'))
+        if 'page' in values and limit is None:
+            limit = self.LS_PAGE_SIZE
+        offset = (max(page, 1) - 1) * limit if limit is not None else 0
         
-        if not os.path.isabs(target_dir):
-            target_dir = os.path.join(self.current_directory, target_dir)
+        targets = []
+        for path in paths or [self.current_directory]:
+            target = self._resolve_path(path)
+            if not os.path.lexists(target):
+                raise CommandError(f"ls: cannot access '{target}': No such file or directory")
+            targets.append((path, target))
+        return switches, offset, limit, targets
+    
+    def _iter_ls(self, args: List[str]) -> Iterator[str]:
+        switches, offset, limit, targets = self._parse_ls(args)
+        for index, (path, target) in enumerate(targets):
+            if not self.fs_index.is_dir(target):
+                if 'l' in switches:
+                    yield self._format_ls_long(path, os.lstat(target), switches) + '\n'
+                else:
+                    yield path + '\n'
+                continue
+            
+            # Breadth of the walk is bounded by the stack; each directory is
+            # listed and emitted before its children are visited
+            stack = [target]
+            first = True
+            while stack:
+                directory = stack.pop()
+                if len(targets) > 1 or 'R' in switches:
+                    heading = directory if directory != target else path
+                    yield ('' if first and index == 0 else '\n') + f"{heading}:\n"
+                first = False
+                
+                try:
+                    entries = self._list_entries(directory, switches, offset, limit)
+                except PermissionError:
+                    message = f"ls: cannot open directory '{directory}': Permission denied"
+                    if directory == target:
+                        raise CommandError(message)
+                    yield message + '\n'
+                    continue
+                
+                subdirectories = []
+                separator = ''
+                for entry in entries:
+                    if 'l' in switches:
+                        yield self._format_ls_long(entry.name, entry.stat(follow_symlinks=False),
+                                                   switches, entry.path) + '\n'
+                    elif '1' in switches:
+                        yield entry.name + '\n'
+                    else:
+                        yield separator + entry.name
+                        separator = '  '
+                    if 'R' in switches and entry.is_dir(follow_symlinks=False):
+                        subdirectories.append(entry.path)
+                if separator:
+                    yield '\n'
+                stack.extend(reversed(subdirectories))
+    
+    def _list_entries(self, directory: str, switches: Set[str], offset: int = 0,
+                      limit: Optional[int] = None) -> List[IndexEntry]:
+        """Read a directory through the shared index, then filter, sort and page its entries"""
+        # Copy the cached listing, since it is shared with other sessions and sorted below
+        entries = [entry for entry in self.fs_index.listdir(directory)
+                   if 'a' in switches or not entry.name.startswith('.')]
         
-        if not os.path.exists(target_dir):
-            return "", 1, f"ls: cannot access '{target_dir}': No such file or directory"
+        if 'U' in switches:
+            stop = None if limit is None else offset + limit
+            return entries[offset:stop]
         
-        if os.path.isfile(target_dir):
-            return target_dir, 0, ""
+        # Index entries cache their stat result, so each entry costs at most one lstat
+        if 'S' in switches:
+            key = lambda entry: (-entry.stat(follow_symlinks=False).st_size, entry.name)
+        elif 't' in switches:
+            key = lambda entry: (-entry.stat(follow_symlinks=False).st_mtime, entry.name)
+        else:
+            key = lambda entry: entry.name
         
-        try:
-            items = os.listdir(target_dir)
-            if not show_hidden:
-                items = [item for item in items if not item.startswith('.')]
-            
-            items.sort()
-            
-            if long_format:
-                output = []
-                for item in items:
-                    item_path = os.path.join(target_dir, item)
-                    stat_info = os.stat(item_path)
-                    is_dir = os.path.isdir(item_path)
-                    permissions = 'drwxrwxrwx' if is_dir else '-rw-rw-rw-'
-                    size = stat_info.st_size
-                    output.append(f"{permissions} {size:8d} {item}")
-                return '\n'.join(output), 0, ""
-            else:
-                return '  '.join(items), 0, ""
-                
-        except PermissionError:
-            return "", 1, f"ls: cannot open directory '{target_dir}': Permission denied"
-        except Exception as e:
-            return "", 1, str(e)
+        if limit is not None and 'r' not in switches:
+            return heapq.nsmallest(offset + limit, entries, key=key)[offset:]
+        entries.sort(key=key, reverse='r' in switches)
+        return entries[offset:] if limit is None else entries[offset:offset + limit]
+    
+    def _format_ls_long(self, name: str, stat_info: os.stat_result, switches: Set[str],
+                        path: Optional[str] = None) -> str:
+        """Format one line of ls -l output"""
+        size = stat_info.st_size
+        size_text = f"{self._format_size(size):>6s}" if 'h' in switches else f"{size:8d}"
+        modified = time.strftime('%b %d %H:%M', time.localtime(stat_info.st_mtime))
+        line = f"{stat.filemode(stat_info.st_mode)} {size_text} {modified} {name}"
+        if stat.S_ISLNK(stat_info.st_mode):
+            try:
+                line += f" -> {os.readlink(path or self._resolve_path(name))}"
+            except OSError:
+                pass
+        return line
+    
+    def _format_size(self, size: float) -> str:
+        """Format a byte count for humans (1.5K, 20M, ...)"""
+        for unit in ['B', 'K', 'M', 'G', 'T']:
+            if size < 1024 or unit == 'T':
+                return f"{size:.0f}{unit}" if unit == 'B' else f"{size:.1f}{unit}"
+            size /= 1024
     
     def _cmd_mkdir(self, args: List[str]) -> Tuple[str, int, str]:
         """Create directory"""
@@ -184,11 +736,8 @@ class PythonTerminal:
         dirs_to_create = [arg for arg in args if not arg.startswith('-')]
         
         for dir_name in dirs_to_create:
-            if not os.path.isabs(dir_name):
-                dir_path = os.path.join(self.current_directory, dir_name)
-            else:
-                dir_path = dir_name
-                
+            dir_path = self._resolve_path(dir_name)
+            
             try:
                 if create_parents:
                     os.makedirs(dir_path, exist_ok=True)
@@ -203,65 +752,131 @@ class PythonTerminal:
     
     def _cmd_remove(self, args: List[str]) -> Tuple[str, int, str]:
         """Remove files/directories"""
-        if not args:
-            return "", 1, "rm: missing operand"
-        
-        recursive = '-r' in args or '-R' in args or '--recursive' in args
-        force = '-f' in args or '--force' in args
-        items_to_remove = [arg for arg in args if not arg.startswith('-')]
+        try:
+            output = ''.join(self._stage_rm(args, None, report_progress=False))
+        except CommandError as e:
+            return "", 1, str(e)
+        return output.rstrip('\n'), 0, ""
+    
+    def _stage_rm(self, args: List[str], stdin: Optional[Iterator[str]],
+                  report_progress: bool = True) -> Iterator[str]:
+        """Remove files/directories, deleting trees on a worker pool"""
+        switches, _, items_to_remove = self._parse_options(
+            'rm', args, flags='rRfv',
+            long_options={'recursive': 'r', 'force': 'f', 'async': 'async'}
+        )
+        if not items_to_remove:
+            raise CommandError("rm: missing operand")
+        recursive = 'r' in switches or 'R' in switches
+        force = 'f' in switches
         
         removed_items = []
         for item in items_to_remove:
-            if not os.path.isabs(item):
-                item_path = os.path.join(self.current_directory, item)
-            else:
-                item_path = item
+            if self._cancelled():
+                raise CommandError("rm: interrupted")
+            item_path = self._resolve_path(item)
             
             try:
-                if os.path.isfile(item_path):
+                if os.path.islink(item_path) or os.path.isfile(item_path):
                     os.remove(item_path)
                     removed_items.append(item)
                 elif os.path.isdir(item_path):
-                    if recursive:
-                        import shutil
-                        shutil.rmtree(item_path)
-                        removed_items.append(item)
-                    else:
-                        return "", 1, f"rm: cannot remove '{item}': Is a directory"
-                else:
-                    if not force:
-                        return "", 1, f"rm: cannot remove '{item}': No such file or directory"
-            except Exception as e:
+                    if not recursive:
+                        raise CommandError(f"rm: cannot remove '{item}': Is a directory")
+                    if 'async' in switches:
+                        remove_tree_async(item_path)
+                        removed_items.append(f"{item} (deleting in the background)")
+                        continue
+                    
+                    for stats in remove_tree(item_path):
+                        if self._cancelled():
+                            raise CommandError(f"rm: interrupted while removing '{item}'")
+                        if report_progress and not stats.finished:
+                            yield f"Removing {item}... {stats.summary()}\n"
+                    if stats.errors and not force:
+                        raise CommandError('\n'.join(stats.errors))
+                    removed_items.append(f"{item} ({stats.summary()})")
+                elif not force:
+                    raise CommandError(f"rm: cannot remove '{item}': No such file or directory")
+            except OSError as e:
                 if not force:
-                    return "", 1, f"rm: cannot remove '{item}': {str(e)}"
+                    raise CommandError(f"rm: cannot remove '{item}': {e.strerror or e}")
         
-        return f"Removed: {', '.join(removed_items)}" if removed_items else "", 0, ""
+        if removed_items:
+            yield f"Removed: {', '.join(removed_items)}\n"
     
     def _cmd_copy(self, args: List[str]) -> Tuple[str, int, str]:
         """Copy files/directories"""
-        if len(args) < 2:
-            return "", 1, "cp: missing destination file operand"
+        try:
+            output = ''.join(self._stage_cp(args, None, report_progress=False))
+        except CommandError as e:
+            return "", 1, str(e)
+        return output.rstrip('\n'), 0, ""
+    
+    def _stage_cp(self, args: List[str], stdin: Optional[Iterator[str]],
+                  report_progress: bool = True) -> Iterator[str]:
+        """Copy files and directory trees in parallel, reporting throughput"""
+        _, _, operands = self._parse_options(
+            'cp', args, flags='rRapfv', long_options={'recursive': 'r', 'archive': 'a'}
+        )
+        if len(operands) < 2:
+            raise CommandError("cp: missing destination file operand")
         
-        source = args[0]
-        destination = args[1]
+        sources = self._expand_globs(operands[:-1])
+        destination = self._resolve_path(operands[-1])
         
-        if not os.path.isabs(source):
-            source = os.path.join(self.current_directory, source)
-        if not os.path.isabs(destination):
-            destination = os.path.join(self.current_directory, destination)
+        stats = None
+        for stats in copy_paths(sources, destination):
+            if self._cancelled():
+                raise CommandError("cp: interrupted")
+            if report_progress and not stats.finished:
+                yield stats.summary() + '\n'
         
+        if stats.errors:
+            if stats.files:
+                yield stats.summary() + '\n'
+            raise CommandError('\n'.join(stats.errors))
+        yield stats.summary() + '\n'
+    
+    def _expand_globs(self, patterns: List[str]) -> List[str]:
+        """Expand wildcards against the current directory; unmatched patterns stay literal"""
+        paths = []
+        for pattern in patterns:
+            path = self._resolve_path(pattern)
+            matches = self.fs_index.glob(path) if glob.has_magic(pattern) else []
+            paths.extend(matches or [path])
+        return paths
+    
+    def complete_path(self, text: str) -> List[str]:
+        """Complete a partial path against the current directory, marking directories with '/'"""
+        expanded = os.path.expanduser(text)
+        directory, prefix = os.path.split(expanded)
         try:
-            import shutil
-            if os.path.isfile(source):
-                shutil.copy2(source, destination)
-            elif os.path.isdir(source):
-                shutil.copytree(source, destination)
-            else:
-                return "", 1, f"cp: cannot stat '{args[0]}': No such file or directory"
-            
-            return f"Copied {args[0]} to {args[1]}", 0, ""
-        except Exception as e:
-            return "", 1, f"cp: {str(e)}"
+            entries = self.fs_index.listdir(self._resolve_path(directory or '.'))
+        except OSError:
+            return []
+        
+        shown = text[:len(text) - len(prefix)]
+        completions = []
+        for entry in entries:
+            if not entry.name.startswith(prefix):
+                continue
+            if entry.name.startswith('.') and not prefix.startswith('.'):
+                continue
+            suffix = os.sep if entry.is_dir() else ''
+            completions.append(shown + entry.name + suffix)
+        return sorted(completions)
+    
+    def _expand_named_globs(self, patterns: List[str]) -> List[Tuple[str, str]]:
+        """Like _expand_globs, pairing each path with a display name relative to the pattern"""
+        named = []
+        for pattern in patterns:
+            for path in self._expand_globs([pattern]):
+                if os.path.isabs(pattern) or not glob.has_magic(pattern):
+                    named.append((pattern if not glob.has_magic(pattern) else path, path))
+                else:
+                    named.append((os.path.relpath(path, self.current_directory), path))
+        return named
     
     def _cmd_move(self, args: List[str]) -> Tuple[str, int, str]:
         """Move/rename files/directories"""
@@ -271,10 +886,8 @@ class PythonTerminal:
         source = args[0]
         destination = args[1]
         
-        if not os.path.isabs(source):
-            source = os.path.join(self.current_directory, source)
-        if not os.path.isabs(destination):
-            destination = os.path.join(self.current_directory, destination)
+        source = self._resolve_path(source)
+        destination = self._resolve_path(destination)
         
         try:
             import shutil
@@ -285,28 +898,25 @@ class PythonTerminal:
     
     def _cmd_cat(self, args: List[str]) -> Tuple[str, int, str]:
         """Display file contents"""
-        if not args:
-            return "", 1, "cat: missing file operand"
-        
+        return self._collect_stage(self._stage_cat, args)
+    
+    def _cmd_head(self, args: List[str]) -> Tuple[str, int, str]:
+        """Display the first lines of a file"""
+        return self._collect_stage(self._stage_head, args)
+    
+    def _cmd_tail(self, args: List[str]) -> Tuple[str, int, str]:
+        """Display the last lines of a file"""
+        return self._collect_stage(self._stage_tail, args)
+    
+    def _collect_stage(self, stage, args: List[str]) -> Tuple[str, int, str]:
+        """Run a streaming built-in and return its whole output, even when it fails part way"""
         output = []
-        for file_name in args:
-            if not os.path.isabs(file_name):
-                file_path = os.path.join(self.current_directory, file_name)
-            else:
-                file_path = file_name
-            
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    output.append(content)
-            except FileNotFoundError:
-                return "", 1, f"cat: {file_name}: No such file or directory"
-            except PermissionError:
-                return "", 1, f"cat: {file_name}: Permission denied"
-            except Exception as e:
-                return "", 1, f"cat: {file_name}: {str(e)}"
-        
-        return '\n'.join(output), 0, ""
+        try:
+            for chunk in stage(args, None):
+                output.append(chunk)
+        except CommandError as e:
+            return ''.join(output), e.status, str(e)
+        return ''.join(output), 0, ""
     
     def _cmd_echo(self, args: List[str]) -> Tuple[str, int, str]:
         """Echo command with file redirection support"""
@@ -322,11 +932,7 @@ class PythonTerminal:
             content = parts[0].strip().strip('"\'')
             filename = parts[1].strip()
             
-            # Handle file path
-            if not os.path.isabs(filename):
-                filepath = os.path.join(self.current_directory, filename)
-            else:
-                filepath = filename
+            filepath = self._resolve_path(filename)
             
             try:
                 with open(filepath, 'w', encoding='utf-8') as f:
@@ -345,10 +951,7 @@ class PythonTerminal:
         
         created_files = []
         for filename in args:
-            if not os.path.isabs(filename):
-                filepath = os.path.join(self.current_directory, filename)
-            else:
-                filepath = filename
+            filepath = self._resolve_path(filename)
             
             try:
                 # Create the file (or update timestamp if exists)
@@ -361,44 +964,20 @@ class PythonTerminal:
         return f"Created/updated: {', '.join(created_files)}", 0, ""
     
     def _cmd_help(self, args: List[str]) -> Tuple[str, int, str]:
-        """Show help for built-in commands"""
+        """Show help for all commands, or the usage of the named ones"""
+        if args:
+            lines = []
+            for name in args:
+                entry = self.commands.get(name.lower())
+                if entry is None or not entry.runnable:
+                    return "", 1, f"help: no help for '{name}'"
+                lines.append(f"{entry.usage} - {' '.join(entry.summary.split())}")
+            return '\n'.join(lines), 0, ""
+        
         help_text = f"""
 Available Commands:
 
-File Operations:
-  ls, dir       - List directory contents
-  cd <path>     - Change directory  
-  pwd           - Print working directory
-  mkdir <n>  - Create directory
-  rmdir <n>  - Remove empty directory
-  rm <file>     - Remove file/directory (-r for recursive)
-  cp <src> <dst> - Copy file/directory
-  mv <src> <dst> - Move/rename file/directory
-  cat <file>    - Display file contents
-  touch <file>  - Create empty file or update timestamp
-  echo <text>   - Display text (use > filename to redirect to file)
-
-System Monitoring:
-  ps            - List running processes
-  top           - Show system information and top processes
-  kill <pid>    - Terminate process by PID
-
-Terminal Features:
-  history       - Show command history
-  clear, cls    - Clear screen
-  alias         - Create command aliases
-  set, export   - Set environment variables
-  help          - Show this help message
-  exit, quit    - Exit the terminal
-
-Examples:
-  echo "Hello World" > test.txt    - Create file with content
-  ls -la                           - List all files with details
-  mkdir -p dir1/dir2              - Create nested directories
-  rm -r folder                    - Remove folder recursively
-  cp *.txt backup/                - Copy all txt files to backup
-  ps                              - Show running processes
-  top                             - Show system stats
+{self.commands.help_text()}
 
 AI Mode:
   Type 'ai' to enable natural language commands
@@ -419,7 +998,6 @@ AI Mode:
             if '=' in arg:
                 key, value = arg.split('=', 1)
                 self.environment_vars[key] = value
-                os.environ[key] = value
             else:
                 # Show specific variable
                 if arg in self.environment_vars:
@@ -429,6 +1007,12 @@ AI Mode:
         
         return "Environment variable(s) set", 0, ""
     
+    def _cmd_unset(self, args: List[str]) -> Tuple[str, int, str]:
+        """Remove environment variables from this session"""
+        for name in args:
+            self.environment_vars.pop(name, None)
+        return "", 0, ""
+    
     def _cmd_alias(self, args: List[str]) -> Tuple[str, int, str]:
         """Create command alias"""
         if not args:
@@ -464,86 +1048,385 @@ AI Mode:
         
         return '\n'.join(numbered_history), 0, ""
     
-    def _handle_system_command(self, cmd: str, args: List[str]) -> Tuple[str, int, str]:
-        """Handle system monitoring commands"""
-        try:
-            if cmd in ['ps', 'tasklist']:
-                return self._cmd_ps(args)
-            elif cmd in ['top', 'htop']:
-                return self._cmd_top(args)
-            elif cmd in ['kill', 'taskkill']:
-                return self._cmd_kill(args)
+    def _cmd_background(self, command: str) -> Tuple[str, int, str]:
+        """Run a command as a background job"""
+        if not command.strip():
+            return "", 1, "syntax error near unexpected token '&'"
+        if self._is_follow_command(command):
+            return "", 1, "tail: follow mode cannot run as a background job"
+        if self._is_live_command(command):
+            return "", 1, "live top/watch views cannot run as background jobs"
+        
+        # The job runs in the directory and environment of the moment it is
+        # started, whatever the session does while it waits for a worker
+        snapshot = self._snapshot()
+        job = self.jobs.submit(command, lambda job: snapshot._stream_job(command, job))
+        return f"[{job.job_id}] {command}", 0, ""
+    
+    def _snapshot(self) -> 'PythonTerminal':
+        """A copy of the session with its own directory, environment and aliases"""
+        snapshot = copy.copy(self)
+        snapshot.environment_vars = self.environment_vars.copy()
+        snapshot.aliases = dict(self.aliases)
+        return snapshot
+    
+    def _stream_job(self, command: str, job) -> Iterator[Tuple[str, object]]:
+        """Stream a background job's command, stopping built-ins when the job is killed"""
+        self._cancel = job.cancelled
+        yield from self._stream_command(command, on_spawn=job.attach_process)
+    
+    def _cancelled(self) -> bool:
+        """Whether the background job this terminal runs has been killed"""
+        return self._cancel is not None and self._cancel.is_set()
+    
+    def _cmd_jobs(self, args: List[str]) -> Tuple[str, int, str]:
+        """List background jobs"""
+        show_pids = '-l' in args
+        
+        lines = []
+        for job in self.jobs.list():
+            if show_pids:
+                lines.append(f"[{job.job_id}]  {job.pid or '-':>7} {job.status:10s} {job.command}")
             else:
-                return "", 1, f"Unknown system command: {cmd}"
-        except Exception as e:
-            return "", 1, str(e)
+                lines.append(job.describe())
+        return '\n'.join(lines), 0, ""
+    
+    def _cmd_fg(self, args: List[str]) -> Tuple[str, int, str]:
+        """Wait for a background job and return its output"""
+        job = self.jobs.get(args[0] if args else None)
+        if job is None:
+            return "", 1, f"fg: {args[0] if args else 'current'}: no such job"
+        
+        job.wait()
+        self.jobs.remove(job)
+        return job.output('stdout'), job.return_code, job.output('stderr')
+    
+    def _stream_fg(self, args: List[str]) -> Iterator[Tuple[str, object]]:
+        """Bring a background job to the foreground, streaming its output"""
+        job = self.jobs.get(args[0] if args else None)
+        if job is None:
+            yield 'stderr', f"fg: {args[0] if args else 'current'}: no such job"
+            yield 'exit', 1
+            return
+        
+        yield 'stdout', f"{job.command}\n"
+        yield from job.iter_output()
+        self.jobs.remove(job)
+        yield 'exit', job.return_code
+    
+    def _cmd_wait(self, args: List[str]) -> Tuple[str, int, str]:
+        """Wait for background jobs to finish"""
+        if args:
+            jobs = [self.jobs.get(spec) for spec in args]
+            if None in jobs:
+                missing = args[jobs.index(None)]
+                return "", 1, f"wait: {missing}: no such job"
+        else:
+            jobs = self.jobs.list()
+        
+        for job in jobs:
+            job.wait()
+            self.jobs.remove(job)
+        
+        return_code = jobs[-1].return_code if jobs else 0
+        return '\n'.join(job.describe() for job in jobs), return_code, ""
+    
+    def collect_job_notifications(self) -> List[str]:
+        """Report background jobs that finished since the last call"""
+        return [job.describe() for job in self.jobs.pop_finished()]
     
     def _cmd_ps(self, args: List[str]) -> Tuple[str, int, str]:
-        """List running processes"""
+        """List running processes, filtered, sorted and limited as requested"""
         try:
-            processes = []
-            for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent']):
-                try:
-                    proc_info = proc.info
-                    processes.append(f"{proc_info['pid']:8d} {proc_info['name']:20s} "
-                                   f"CPU: {proc_info['cpu_percent']:5.1f}% "
-                                   f"MEM: {proc_info['memory_percent']:5.1f}%")
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    continue
-            
-            if not processes:
-                return "No processes found", 0, ""
-            
-            header = f"{'PID':8s} {'NAME':20s} {'CPU':12s} {'MEMORY':10s}"
-            return header + '\n' + '\n'.join(processes), 0, ""
-            
+            lines = self._render_ps(args)
+            # Like procps, a selection that matches nothing prints the header and fails
+            return '\n'.join(lines), 0 if len(lines) > 1 else 1, ""
+        except CommandError as e:
+            return "", 1, str(e)
         except Exception as e:
             return "", 1, f"ps: {str(e)}"
     
+    def _render_ps(self, args: List[str]) -> List[str]:
+        """Render the selected processes as a table"""
+        columns, processes, extras = self._select_ps(args)
+        lines = [self._format_ps_row(columns, [self.PS_COLUMNS[column][0] for column in columns])]
+        for proc in processes:
+            lines.append(self._format_ps_row(columns, [
+                self._format_ps_value(column, proc, extras) for column in columns
+            ]))
+        return lines
+    
+    def _select_ps(self, args: List[str]):
+        """
+        Select processes from the sampler's snapshot.
+        Filters and top-N selection run on the snapshot; attributes the
+        sampler does not keep are fetched afterwards, only for the rows shown
+        (or for every candidate when sorting on one of them).
+        Returns: (columns, processes, extras)
+        """
+        _, values, operands = self._parse_options(
+            'ps', args, flags='eAf', valued=('p', 'u', 'o', 'sort', 'name', 'limit'),
+            long_options={'pid': 'p', 'user': 'u', 'format': 'o', 'sort': 'sort',
+                          'name': 'name', 'limit': 'limit'}
+        )
+        for operand in operands:
+            # BSD-style "ps aux" is accepted; every process is listed by default
+            if operand not in ('aux', 'ax', 'a', 'x'):
+                raise CommandError(f"ps: unexpected argument '{operand}'")
+        
+        columns = values['o'].replace(',', ' ').split() if 'o' in values else self.PS_DEFAULT_COLUMNS
+        sort_key = values.get('sort', 'pid')
+        descending = sort_key.startswith('-')
+        sort_key = sort_key.lstrip('+-')
+        for column in columns + [sort_key]:
+            if column not in self.PS_COLUMNS:
+                raise CommandError(f"ps: unknown column '{column}' "
+                                   f"(choose from {', '.join(self.PS_COLUMNS)})")
+        limit = self._parse_count('ps', values['limit']) if 'limit' in values else None
+        
+        snapshot = get_sampler().snapshot()
+        processes = list(snapshot.processes.values())
+        if 'p' in values:
+            try:
+                pids = {int(pid) for pid in values['p'].replace(',', ' ').split()}
+            except ValueError:
+                raise CommandError(f"ps: invalid process ID list '{values['p']}'")
+            processes = [proc for proc in processes if proc.pid in pids]
+        if 'u' in values:
+            users = set(values['u'].replace(',', ' ').split())
+            processes = [proc for proc in processes if proc.username in users]
+        if 'name' in values:
+            try:
+                pattern = re.compile(values['name'])
+            except re.error as e:
+                raise CommandError(f"ps: invalid name pattern: {e}")
+            processes = [proc for proc in processes if pattern.search(proc.name)]
+        
+        extras: Dict[int, Dict] = {}
+        if sort_key in self.PS_EXTRA_ATTRS:
+            self._fetch_ps_extras(processes, [sort_key], extras)
+        key = lambda proc: (self._ps_value(sort_key, proc, extras), proc.pid)
+        if limit is not None:
+            select = heapq.nlargest if descending else heapq.nsmallest
+            processes = select(limit, processes, key=key)
+        else:
+            processes.sort(key=key, reverse=descending)
+        self._fetch_ps_extras(processes, columns, extras)
+        
+        # Drop processes that exited since the snapshot
+        processes = [proc for proc in processes
+                     if proc.pid not in extras or extras[proc.pid] is not None]
+        return columns, processes, extras
+    
+    def _fetch_ps_extras(self, processes, columns: List[str], extras: Dict[int, Dict]):
+        """Fetch the non-sampled attributes named by columns for each process"""
+        attrs = [self.PS_EXTRA_ATTRS[column] for column in columns if column in self.PS_EXTRA_ATTRS]
+        if not attrs:
+            return
+        import psutil
+        for proc in processes:
+            have = extras.get(proc.pid, {})
+            if have is None or all(attr in have for attr in attrs):
+                continue
+            try:
+                have.update(psutil.Process(proc.pid).as_dict(attrs=attrs))
+                extras[proc.pid] = have
+            except psutil.NoSuchProcess:
+                extras[proc.pid] = None
+    
+    def _ps_value(self, column: str, proc, extras: Dict[int, Dict]):
+        """Raw (sortable) value of one ps column"""
+        if column in self.PS_EXTRA_ATTRS:
+            value = (extras.get(proc.pid) or {}).get(self.PS_EXTRA_ATTRS[column])
+            if column == 'cmd':
+                return re.sub(r'[\x00-\x1f]', '?', ' '.join(value)) if value else ''
+            return value if value is not None else -1
+        return {
+            'pid': proc.pid, 'name': proc.name, 'user': proc.username, 'status': proc.status,
+            'cpu': proc.cpu_percent, 'mem': proc.memory_percent, 'rss': proc.rss,
+            'started': proc.create_time
+        }[column]
+    
+    def _format_ps_value(self, column: str, proc, extras: Dict[int, Dict]) -> str:
+        value = self._ps_value(column, proc, extras)
+        if column in ('cpu', 'mem'):
+            return f"{value:.1f}"
+        if column == 'rss':
+            return self._format_size(value)
+        if column == 'started':
+            return time.strftime('%H:%M:%S', time.localtime(value)) if value else '-'
+        if column == 'cmd':
+            return value or f"[{proc.name}]"
+        if value == -1 and column in self.PS_EXTRA_ATTRS:
+            return '-'
+        return str(value)
+    
+    def _format_ps_row(self, columns: List[str], cells: List[str]) -> str:
+        row = []
+        for column, cell in zip(columns, cells):
+            _, width, align = self.PS_COLUMNS[column]
+            if width and len(cell) > width and align == '<':
+                cell = cell[:width - 1] + '~'
+            row.append(f"{cell:{align}{width}}" if width else cell)
+        return ' '.join(row).rstrip()
+    
     def _cmd_top(self, args: List[str]) -> Tuple[str, int, str]:
-        """Show system information and top processes"""
+        """Show system information and top processes; -d/-n make it a live view"""
+        if args:
+            return self._cmd_live('top', args)
         try:
-            # System info
-            cpu_percent = psutil.cpu_percent(interval=1)
-            memory = psutil.virtual_memory()
-            disk = psutil.disk_usage('/')
-            
-            system_info = [
-                f"CPU Usage: {cpu_percent:.1f}%",
-                f"Memory Usage: {memory.percent:.1f}% ({memory.used // 1024 // 1024}MB / {memory.total // 1024 // 1024}MB)",
-                f"Disk Usage: {disk.percent:.1f}% ({disk.used // 1024 // 1024 // 1024}GB / {disk.total // 1024 // 1024 // 1024}GB)",
-                "",
-                f"{'PID':8s} {'NAME':20s} {'CPU%':8s} {'MEM%':8s}",
-                "-" * 50
-            ]
-            
-            # Top processes by CPU usage
-            processes = []
-            for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent']):
-                try:
-                    proc_info = proc.info
-                    processes.append((proc_info['pid'], proc_info['name'], 
-                                    proc_info['cpu_percent'], proc_info['memory_percent']))
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    continue
-            
-            # Sort by CPU usage and take top 10
-            processes.sort(key=lambda x: x[2], reverse=True)
-            top_processes = processes[:10]
-            
-            for pid, name, cpu, mem in top_processes:
-                system_info.append(f"{pid:8d} {name[:19]:20s} {cpu:7.1f} {mem:7.1f}")
-            
-            return '\n'.join(system_info), 0, ""
-            
+            return '\n'.join(self._render_top()), 0, ""
         except Exception as e:
             return "", 1, f"top: {str(e)}"
     
+    def _render_top(self, trends: bool = False, max_age: Optional[float] = None) -> List[str]:
+        """Render one top screen, with CPU and memory sparklines when trends is set"""
+        # Read the background sampler instead of blocking on cpu_percent(interval=1)
+        sampler = get_sampler()
+        snapshot = sampler.snapshot(max_age)
+        memory = snapshot.memory
+        disk = snapshot.disk
+        
+        cpu_line = f"CPU Usage: {snapshot.cpu_percent:.1f}%"
+        memory_line = (f"Memory Usage: {memory.percent:.1f}% "
+                       f"({memory.used // 1024 // 1024}MB / {memory.total // 1024 // 1024}MB)")
+        if trends:
+            width = max(len(cpu_line), len(memory_line)) + 2
+            cpu_line = cpu_line.ljust(width) + sparkline(
+                sampler.cpu_history.values(self.SPARKLINE_WIDTH))
+            memory_line = memory_line.ljust(width) + sparkline(
+                sampler.memory_history.values(self.SPARKLINE_WIDTH))
+        
+        system_info = [cpu_line, memory_line]
+        if disk is not None:
+            system_info.append(f"Disk Usage: {disk.percent:.1f}% ({disk.used // 1024 // 1024 // 1024}GB / {disk.total // 1024 // 1024 // 1024}GB)")
+        system_info += [
+            "",
+            f"{'PID':8s} {'NAME':20s} {'CPU%':8s} {'MEM%':8s}",
+            "-" * 50
+        ]
+        
+        # Top processes by CPU usage
+        top_processes = heapq.nlargest(10, snapshot.processes.values(),
+                                       key=lambda proc: proc.cpu_percent)
+        for proc in top_processes:
+            system_info.append(f"{proc.pid:8d} {proc.name[:19]:20s} "
+                               f"{proc.cpu_percent:7.1f} {proc.memory_percent:7.1f}")
+        return system_info
+    
+    def _cmd_watch(self, args: List[str]) -> Tuple[str, int, str]:
+        """Re-run a command a fixed number of times"""
+        return self._cmd_live('watch', args)
+    
+    def _cmd_live(self, cmd: str, args: List[str]) -> Tuple[str, int, str]:
+        """Run a fixed number of top/watch frames, returning the last one"""
+        try:
+            render, interval, iterations = self._live_view(cmd, args)
+        except CommandError as e:
+            return "", 1, str(e)
+        if iterations is None:
+            return "", 1, (f"{cmd}: live mode needs a streaming client (the CLI or "
+                           f"/execute_stream); use -n/--count for a fixed number of frames")
+        return self._collect_stream(self._stream_frames(render, interval, iterations))
+    
+    def _live_view(self, cmd: str, args: List[str]):
+        """
+        Parse a top -d/-n or watch command
+        Returns: (render, interval, iterations) where render() returns the screen lines
+        """
+        if cmd == 'watch':
+            interval, iterations = self.LIVE_INTERVAL, None
+            args = list(args)
+            while args and args[0].startswith('-'):
+                option = args.pop(0)
+                name, _, value = option.partition('=')
+                if name in ('-n', '--interval', '--count'):
+                    value = value or (args.pop(0) if args else '')
+                elif option.startswith('-n'):
+                    name, value = '-n', option[2:]
+                else:
+                    raise CommandError(f"watch: invalid option '{option}'")
+                if name == '--count':
+                    iterations = self._parse_count('watch', value)
+                else:
+                    interval = self._parse_interval('watch', value)
+            if not args:
+                raise CommandError("watch: missing command")
+            command = ' '.join(args)
+            
+            def render() -> List[str]:
+                output, _, error = self._run_command(command)
+                lines = [f"Every {interval:.1f}s: {command}", ""]
+                return lines + (output + error).rstrip('\n').split('\n')
+            return render, interval, iterations
+        
+        _, values, _ = self._parse_options(
+            cmd, args, valued=('d', 'n'), long_options={'delay': 'd', 'iterations': 'n'}
+        )
+        interval = self._parse_interval(cmd, values['d']) if 'd' in values else self.LIVE_INTERVAL
+        iterations = self._parse_count(cmd, values['n']) if 'n' in values else None
+        return lambda: self._render_top(trends=True, max_age=interval), interval, iterations
+    
+    def _parse_interval(self, name: str, value: str) -> float:
+        try:
+            interval = float(value)
+        except ValueError:
+            raise CommandError(f"{name}: invalid interval: '{value}'")
+        if interval < 0.1:
+            raise CommandError(f"{name}: interval must be at least 0.1 seconds")
+        return interval
+    
+    def _stream_frames(self, render, interval: float,
+                       iterations: Optional[int] = None) -> Iterator[Tuple[str, object]]:
+        """
+        Re-render a screen every interval seconds, yielding ('frame', payload)
+        where payload holds the new line count and only the lines that changed
+        since the previous frame: {'lines': n, 'changed': [[index, text], ...]}
+        """
+        previous = []
+        frames = 0
+        while iterations is None or frames < iterations:
+            started = time.monotonic()
+            lines = render()
+            changed = [[index, line] for index, line in enumerate(lines)
+                       if index >= len(previous) or previous[index] != line]
+            if changed or len(lines) != len(previous) or not frames:
+                yield 'frame', {'lines': len(lines), 'changed': changed}
+            previous = lines
+            frames += 1
+            if iterations is not None and frames >= iterations:
+                break
+            
+            # Sleep out the interval, with keep-alives so closed clients are noticed
+            while True:
+                remaining = started + interval - time.monotonic()
+                if remaining <= 0:
+                    break
+                time.sleep(min(remaining, self.FOLLOW_HEARTBEAT))
+                if started + interval - time.monotonic() > 0:
+                    yield 'stdout', ''
+        yield 'exit', 0
+    
+    def _apply_frame(self, lines: List[str], frame: Dict) -> List[str]:
+        """Apply a frame's changed lines to the previous screen"""
+        lines = lines[:frame['lines']] + [''] * (frame['lines'] - len(lines))
+        for index, text in frame['changed']:
+            lines[index] = text
+        return lines
+    
     def _cmd_kill(self, args: List[str]) -> Tuple[str, int, str]:
         """Kill process by PID"""
         if not args:
             return "", 1, "kill: missing process ID"
         
+        if args[0].startswith('%'):
+            job = self.jobs.get(args[0])
+            if job is None:
+                return "", 1, f"kill: {args[0]}: no such job"
+            job.kill()
+            return f"[{job.job_id}]  Killed     {job.command}", 0, ""
+        
+        import psutil
         try:
             pid = int(args[0])
             proc = psutil.Process(pid)
@@ -567,16 +1450,1036 @@ AI Mode:
                 capture_output=True,
                 text=True,
                 cwd=self.current_directory,
-                env=self.environment_vars,
-                timeout=30
+                env=self.environment_vars.materialize(),
+                timeout=self.COMMAND_TIMEOUT
             )
             
-            return result.stdout, result.returncode, result.stderr
+            error = result.stderr
+            hint = self._did_you_mean(command) if result.returncode == self.COMMAND_NOT_FOUND else ""
+            if hint:
+                error = f"{error.rstrip()}\n{hint}"
+            return result.stdout, result.returncode, error
             
         except subprocess.TimeoutExpired:
-            return "", 1, "Command timed out after 30 seconds"
+            return "", 1, f"Command timed out after {self.COMMAND_TIMEOUT} seconds"
+        except Exception as e:
+            return "", 1, str(e)
+    
+    def _stream_external_command(self, command: str, timeout: Optional[float] = None,
+                                 on_spawn=None) -> Iterator[Tuple[str, object]]:
+        """Execute external system command, yielding output chunks as they arrive"""
+        try:
+            process = subprocess.Popen(
+                command,
+                shell=True,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                cwd=self.current_directory,
+                env=self.environment_vars.materialize()
+            )
         except Exception as e:
+            yield 'stderr', str(e)
+            yield 'exit', 1
+            return
+        
+        if on_spawn is not None:
+            on_spawn(process)
+        
+        # One reader thread per pipe so a chatty stderr can never block stdout
+        chunks = queue.Queue()
+        for pipe, channel in ((process.stdout, 'stdout'), (process.stderr, 'stderr')):
+            threading.Thread(target=self._pump_pipe, args=(pipe, channel, chunks),
+                             daemon=True).start()
+        
+        deadline = time.monotonic() + timeout if timeout else None
+        open_pipes = 2
+        try:
+            while open_pipes:
+                wait = None if deadline is None else deadline - time.monotonic()
+                if wait is not None and wait <= 0:
+                    raise subprocess.TimeoutExpired(command, timeout)
+                try:
+                    channel, data = chunks.get(timeout=wait)
+                except queue.Empty:
+                    raise subprocess.TimeoutExpired(command, timeout)
+                if data is None:
+                    open_pipes -= 1
+                    continue
+                yield channel, data
+            return_code = process.wait()
+        except subprocess.TimeoutExpired:
+            yield 'stderr', f"Command timed out after {timeout:g} seconds"
+            return_code = 1
+        finally:
+            # Also reached when the consumer stops iterating early
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+        
+        if return_code == self.COMMAND_NOT_FOUND:
+            hint = self._did_you_mean(command)
+            if hint:
+                yield 'stderr', hint + '\n'
+        yield 'exit', return_code
+    
+    def command_index(self) -> BKTree:
+        """
+        Command names, aliases and commands this session has run, for typo
+        suggestions; history is indexed incrementally as it grows
+        """
+        if self._command_index is None:
+            self._command_index = BKTree(self.commands.names())
+        for alias in self.aliases:
+            self._command_index.add(alias)
+        for command in self.command_history[self._indexed_history:]:
+            words = command.split()
+            if words and words[0] not in self._missing_commands:
+                self._command_index.add(words[0])
+        self._indexed_history = len(self.command_history)
+        return self._command_index
+    
+    def _did_you_mean(self, command: str) -> str:
+        """A suggestion line for a command sh could not find, or an empty string"""
+        words = command.split()
+        if not words:
+            return ""
+        self._missing_commands.add(words[0])
+        suggestions = self.command_index().suggest(words[0])
+        if not suggestions:
+            return ""
+        return f"Did you mean: {', '.join(suggestions)}?"
+    
+    def _pump_pipe(self, pipe, channel: str, chunks: queue.Queue):
+        """Forward decoded chunks from a subprocess pipe into a queue"""
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        try:
+            for block in iter(lambda: pipe.read1(self.STREAM_CHUNK_SIZE), b''):
+                text = decoder.decode(block)
+                if text:
+                    chunks.put((channel, text))
+            text = decoder.decode(b'', final=True)
+            if text:
+                chunks.put((channel, text))
+        except (OSError, ValueError):
+            pass
+        finally:
+            pipe.close()
+            chunks.put((channel, None))
+    
+    # Pipelines
+    #
+    # Stages pass text chunks lazily from one to the next. Built-ins with a
+    # stage method are generators that consume the previous stage's chunks,
+    # other built-ins contribute their output as a single chunk, and external
+    # commands are connected to each other with real OS pipes.
+    
+    def _stream_pipeline(self, stages: List[str],
+                         timeout: Optional[float] = None) -> Iterator[Tuple[str, object]]:
+        """
+        Run a pipeline, yielding the last stage's output as it is produced.
+        Once timeout seconds have passed its processes are killed and its
+        built-in stages stopped
+        """
+        errors = queue.Queue()
+        processes = []
+        threads = []
+        generators = []
+        failures = []
+        upstream = None
+        return_code = 0
+        
+        expired = threading.Event()
+        outer_cancel = self._cancel
+        timer = None
+        if timeout:
+            def expire():
+                expired.set()
+                for process in list(processes):
+                    self._kill_stage(process)
+            timer = threading.Timer(timeout, expire)
+            timer.daemon = True
+            timer.start()
+            if outer_cancel is None:
+                # Built-in stages walking directories stop at the deadline too
+                self._cancel = expired
+        
+        try:
+            for position, stage in enumerate(stages):
+                if expired.is_set():
+                    raise subprocess.TimeoutExpired(stage, timeout)
+                parts = shlex.split(stage)
+                if not parts:
+                    raise CommandError("syntax error near unexpected token '|'")
+                cmd = parts[0].lower()
+                args = parts[1:]
+                
+                if cmd in ('ls', 'dir') and position < len(stages) - 1:
+                    args = ['-1'] + args  # One entry per line when piped
+                
+                entry = self.commands.get(cmd)
+                if self._uses_system_tool(entry, args):
+                    entry = None
+                if entry is not None and '--json' in args and entry.data:
+                    upstream = self._stage_json(cmd, args)
+                elif entry is not None and entry.stage:
+                    handler = getattr(self, entry.stage)
+                    upstream = handler(args, self._stage_input(upstream, failures))
+                elif entry is not None and entry.runnable:
+                    upstream = self._stage_builtin(entry, cmd, args)
+                else:
+                    process = self._spawn_stage(stage, upstream, errors, threads, failures)
+                    processes.append(process)
+                    upstream = process
+                    continue
+                generators.append(upstream)
+            
+            for chunk in self._stage_input(upstream):
+                if expired.is_set():
+                    break
+                yield 'stdout', chunk
+            
+            # Killed processes end their output early, so check the deadline first
+            if expired.is_set():
+                raise subprocess.TimeoutExpired(' | '.join(stages), timeout)
+            if isinstance(upstream, subprocess.Popen):
+                return_code = upstream.wait()
+        except (subprocess.TimeoutExpired, CommandError) as e:
+            # Stages stopped by the deadline fail with their own errors; report the timeout
+            if expired.is_set():
+                errors.put(('stderr', f"Command timed out after {timeout:g} seconds\n"))
+                return_code = 1
+            else:
+                if str(e):
+                    errors.put(('stderr', f"{e}\n"))
+                return_code = getattr(e, 'status', 1)
+        except ValueError as e:
+            errors.put(('stderr', f"Command parsing error: {e}\n"))
+            return_code = 1
+        finally:
+            if timer is not None:
+                timer.cancel()
+                self._cancel = outer_cancel
+            # Stop producers that are still running, e.g. after 'head' stopped reading
+            for generator in reversed(generators):
+                try:
+                    generator.close()
+                except ValueError:
+                    pass  # Still running on a feeder thread, which stops with its pipe
+            for process in processes:
+                self._kill_stage(process)
+                if process.stdout:
+                    process.stdout.close()
+                process.wait()
+            for thread in threads:
+                thread.join()
+        
+        # Like set -o pipefail, a stage that failed fails the pipeline
+        if failures and not return_code:
+            return_code = failures[-1].status
+        for failure in failures:
+            if str(failure):
+                yield 'stderr', f"{failure}\n"
+        while not errors.empty():
+            channel, data = errors.get()
+            if data:
+                yield 'stderr', data
+        yield 'exit', return_code
+    
+    def _stage_input(self, upstream, failures: Optional[List[CommandError]] = None
+                     ) -> Optional[Iterator[str]]:
+        """
+        Expose the previous stage as an iterator of text chunks. With a
+        failures list, a built-in stage that fails is added to it and ends
+        its output instead of stopping the stages after it
+        """
+        if isinstance(upstream, subprocess.Popen):
+            return self._iter_pipe_text(upstream.stdout)
+        if upstream is None:
+            return None
+        return self._interruptible(upstream, failures)
+    
+    def _interruptible(self, chunks: Iterator[str],
+                       failures: Optional[List[CommandError]] = None) -> Iterator[str]:
+        """Pass chunks between built-in stages until the job is killed or the pipeline times out"""
+        chunks = iter(chunks)
+        while True:
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                return
+            except CommandError as e:
+                if failures is None or self._cancelled():
+                    raise
+                failures.append(e)
+                return
+            if self._cancelled():
+                raise CommandError("interrupted")
+            yield chunk
+    
+    def _iter_pipe_text(self, pipe) -> Iterator[str]:
+        """Decode a binary pipe into text chunks"""
+        return self._decode_blocks(iter(lambda: pipe.read1(self.STREAM_CHUNK_SIZE), b''))
+    
+    def _spawn_stage(self, stage: str, upstream, errors: queue.Queue,
+                     threads: List[threading.Thread],
+                     failures: Optional[List[CommandError]] = None) -> subprocess.Popen:
+        """
+        Start an external pipeline stage wired to the previous stage; a
+        built-in stage feeding it that fails is added to failures
+        """
+        if isinstance(upstream, subprocess.Popen):
+            stdin = upstream.stdout
+        elif upstream is None:
+            stdin = subprocess.DEVNULL
+        else:
+            stdin = subprocess.PIPE
+        
+        try:
+            process = subprocess.Popen(
+                stage,
+                shell=True,
+                stdin=stdin,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                cwd=self.current_directory,
+                env=self.environment_vars.materialize(),
+                # A process group of its own, so the whole stage can be killed
+                start_new_session=hasattr(os, 'killpg')
+            )
+        except OSError as e:
+            raise CommandError(f"{stage}: {e}")
+        
+        if isinstance(upstream, subprocess.Popen):
+            # The child owns the read end now; closing ours lets SIGPIPE reach the writer
+            upstream.stdout.close()
+        elif upstream is not None:
+            feeder = threading.Thread(target=self._feed_pipe,
+                                      args=(self._interruptible(upstream, failures),
+                                            process.stdin, errors), daemon=True)
+            feeder.start()
+            threads.append(feeder)
+        
+        reader = threading.Thread(target=self._pump_pipe,
+                                  args=(process.stderr, 'stderr', errors), daemon=True)
+        reader.start()
+        threads.append(reader)
+        return process
+    
+    def _kill_stage(self, process: subprocess.Popen):
+        """Kill a running external stage together with any children its shell started"""
+        if process.poll() is not None:
+            return
+        try:
+            if hasattr(os, 'killpg'):
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+        except OSError:
+            pass  # Exited in the meantime
+    
+    def _feed_pipe(self, chunks: Iterator[str], pipe, errors: queue.Queue):
+        """Write a built-in stage's output into an external command's stdin"""
+        try:
+            for chunk in chunks:
+                pipe.write(chunk.encode('utf-8'))
+        except CommandError as e:
+            if str(e):
+                errors.put(('stderr', f"{e}\n"))
+        except (OSError, ValueError):
+            pass  # The reader exited early
+        finally:
+            try:
+                pipe.close()
+            except OSError:
+                pass
+    
+    def _stage_builtin(self, entry: Command, cmd: str, args: List[str]) -> Iterator[str]:
+        """Run a non-streaming built-in as a pipeline stage"""
+        output, return_code, error = self._dispatch(entry, cmd, args)
+        if return_code != 0:
+            raise CommandError(error or f"{cmd}: failed with status {return_code}")
+        if output:
+            yield output if output.endswith('\n') else output + '\n'
+    
+    def _coalesce(self, pieces: Iterable[str], size: int = 8192) -> Iterator[str]:
+        """Join small text pieces into chunks of roughly the given size"""
+        buffer, buffered = [], 0
+        for piece in pieces:
+            buffer.append(piece)
+            buffered += len(piece)
+            if buffered >= size:
+                yield ''.join(buffer)
+                buffer, buffered = [], 0
+        if buffer:
+            yield ''.join(buffer)
+    
+    def _iter_lines(self, chunks: Iterable[str]) -> Iterator[str]:
+        """Re-split a stream of text chunks into lines, keeping line endings"""
+        pending = ''
+        for chunk in chunks:
+            if '\n' not in chunk:
+                pending += chunk
+                continue
+            lines = (pending + chunk).split('\n')
+            pending = lines.pop()
+            for line in lines:
+                yield line + '\n'
+        if pending:
+            yield pending
+    
+    def _open_input(self, name: str, file_name: str):
+        """Open a file for binary reading, reporting errors the way the command would"""
+        try:
+            return open(self._resolve_path(file_name), 'rb')
+        except FileNotFoundError:
+            raise CommandError(f"{name}: {file_name}: No such file or directory")
+        except IsADirectoryError:
+            raise CommandError(f"{name}: {file_name}: Is a directory")
+        except PermissionError:
+            raise CommandError(f"{name}: {file_name}: Permission denied")
+        except OSError as e:
+            raise CommandError(f"{name}: {file_name}: {e.strerror or e}")
+    
+    def _iter_file_bytes(self, f, start: int = 0, length: Optional[int] = None) -> Iterator[bytes]:
+        """Read an open binary file in fixed-size blocks, optionally within a byte range"""
+        if start:
+            f.seek(start)
+        remaining = length
+        while remaining is None or remaining > 0:
+            size = self.STREAM_CHUNK_SIZE if remaining is None else min(remaining, self.STREAM_CHUNK_SIZE)
+            block = f.read(size)
+            if not block:
+                return
+            if remaining is not None:
+                remaining -= len(block)
+            yield block
+    
+    def _decode_blocks(self, blocks: Iterable[bytes]) -> Iterator[str]:
+        """Decode UTF-8 blocks into text chunks, tolerating split characters"""
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        for block in blocks:
+            text = decoder.decode(block)
+            if text:
+                yield text
+        text = decoder.decode(b'', final=True)
+        if text:
+            yield text
+    
+    def _iter_file_text(self, name: str, file_name: str, start: int = 0,
+                        length: Optional[int] = None) -> Iterator[str]:
+        """Read a file as text chunks, reporting errors the way the command would"""
+        with self._open_input(name, file_name) as f:
+            yield from self._decode_blocks(self._iter_file_bytes(f, start, length))
+    
+    def _is_binary(self, f) -> bool:
+        """Treat files with a NUL byte near the start as binary"""
+        position = f.tell()
+        sample = f.read(self.BINARY_SNIFF_SIZE)
+        f.seek(position)
+        return b'\0' in sample
+    
+    def _iter_inputs(self, name: str, files: List[str], stdin: Optional[Iterator[str]],
+                     length: Optional[int] = None) -> Iterator[Tuple[str, Iterator[str]]]:
+        """Yield (label, chunks) for each input file, or for stdin when none are given"""
+        if not files:
+            yield '(standard input)', stdin if stdin is not None else iter(())
+            return
+        for file_name in files:
+            yield file_name, self._iter_file_text(name, file_name, length=length)
+    
+    def _parse_options(self, name: str, args: List[str], flags: str = '',
+                       valued: Iterable[str] = '', long_options: Optional[Dict[str, str]] = None
+                       ) -> Tuple[Set[str], Dict[str, str], List[str]]:
+        """
+        Split arguments into short boolean flags, options taking a value
+        and operands. Supports combined flags (-in), attached values (-n5)
+        and long options (--all, --limit=5, --limit 5) mapped to option keys
+        through long_options.
+        """
+        switches, values, operands = set(), {}, []
+        long_options = long_options or {}
+        args = iter(args)
+        for arg in args:
+            if arg == '--':
+                operands.extend(args)
+                break
+            if not arg.startswith('-') or arg == '-':
+                operands.append(arg)
+                continue
+            if arg.startswith('--'):
+                option, has_value, value = arg[2:].partition('=')
+                key = long_options.get(option)
+                if key is None:
+                    raise UnsupportedOption(f"{name}: unrecognized option '--{option}'")
+                if key in valued:
+                    value = value if has_value else next(args, None)
+                    if value is None:
+                        raise CommandError(f"{name}: option '--{option}' requires an argument")
+                    values[key] = value
+                else:
+                    switches.add(key)
+                continue
+            for i, letter in enumerate(arg[1:], 1):
+                if letter in valued:
+                    value = arg[i + 1:] or next(args, None)
+                    if value is None:
+                        raise CommandError(f"{name}: option requires an argument -- '{letter}'")
+                    values[letter] = value
+                    break
+                if letter not in flags:
+                    raise UnsupportedOption(f"{name}: invalid option -- '{letter}'")
+                switches.add(letter)
+        return switches, values, operands
+    
+    def _parse_count(self, name: str, value: str) -> int:
+        try:
+            count = int(value)
+        except ValueError:
+            raise CommandError(f"{name}: invalid number of lines: '{value}'")
+        if count < 0:
+            raise CommandError(f"{name}: invalid number of lines: '{value}'")
+        return count
+    
+    def _stage_cat(self, args: List[str], stdin: Optional[Iterator[str]]) -> Iterator[str]:
+        """Concatenate files in fixed-size chunks, or pass standard input through"""
+        _, values, files = self._parse_options('cat', args, valued=('bytes',),
+                                               long_options={'bytes': 'bytes'})
+        byte_range = values.get('bytes')
+        if not files:
+            if stdin is None:
+                raise CommandError("cat: missing file operand")
+            if byte_range is not None:
+                raise CommandError("cat: --bytes requires a file operand")
+            yield from stdin
+            return
+        
+        # Like cat(1), a file that cannot be shown is reported after the
+        # rest have been, and fails the command
+        errors = []
+        for file_name in files:
+            try:
+                f = self._open_input('cat', file_name)
+            except CommandError as e:
+                errors.append(str(e))
+                continue
+            with f:
+                binary = self._is_binary(f)
+                if byte_range is None:
+                    if binary:
+                        size = os.fstat(f.fileno()).st_size
+                        errors.append(f"cat: {file_name}: binary file ({size} bytes); "
+                                      f"use --bytes=START-END to inspect a range")
+                    else:
+                        yield from self._decode_blocks(self._iter_file_bytes(f))
+                    continue
+                
+                start, length = self._parse_byte_range(byte_range, os.fstat(f.fileno()).st_size)
+                blocks = self._iter_file_bytes(f, start, length)
+                if binary:
+                    yield from self._hexdump(blocks, start)
+                else:
+                    yield from self._decode_blocks(blocks)
+        if errors:
+            raise CommandError('\n'.join(errors))
+    
+    def _parse_byte_range(self, spec: str, size: int) -> Tuple[int, int]:
+        """
+        Parse an inclusive byte range: 'a-b', 'a-' (to the end) or '-n' (last n bytes)
+        Returns: (start, length)
+        """
+        match = re.fullmatch(r'(\d*)-(\d*)', spec)
+        if not match or spec == '-':
+            raise CommandError(f"cat: invalid byte range '{spec}'")
+        first, last = match.groups()
+        if not first:
+            start = max(size - int(last), 0)
+            return start, size - start
+        start = int(first)
+        end = min(int(last) + 1, size) if last else size
+        if last and int(last) < start:
+            raise CommandError(f"cat: invalid byte range '{spec}'")
+        return start, max(end - start, 0)
+    
+    def _hexdump(self, blocks: Iterable[bytes], offset: int = 0) -> Iterator[str]:
+        """Format binary data as a canonical hex+ASCII dump"""
+        pending = b''
+        for block in itertools.chain(blocks, [None]):
+            if block is not None:
+                pending += block
+                whole = len(pending) - len(pending) % 16
+            else:
+                whole = len(pending)
+            lines = []
+            for i in range(0, whole, 16):
+                row = pending[i:i + 16]
+                hex_part = ' '.join(f"{byte:02x}" for byte in row)
+                text_part = ''.join(chr(byte) if 32 <= byte < 127 else '.' for byte in row)
+                lines.append(f"{offset:08x}  {hex_part:<47s}  |{text_part}|\n")
+                offset += len(row)
+            pending = pending[whole:]
+            if lines:
+                yield ''.join(lines)
+    
+    def _stage_echo(self, args: List[str], stdin: Optional[Iterator[str]]) -> Iterator[str]:
+        """Write arguments to the next stage"""
+        yield ' '.join(args) + '\n'
+    
+    def _cmd_grep(self, args: List[str]) -> Tuple[str, int, str]:
+        """Search files for lines matching a pattern; status 1 when nothing matched, 2 on errors"""
+        output = []
+        try:
+            for chunk in self._stage_grep(args, None):
+                output.append(chunk)
+        except CommandError as e:
+            return ''.join(output).rstrip('\n'), e.status, str(e)
+        return ''.join(output).rstrip('\n'), 0, ""
+    
+    def _parse_grep(self, args: List[str]) -> Tuple[Set[str], Dict[str, str], List[str]]:
+        return self._parse_options(
+            'grep', args, flags='ivnclrRHEFw',
+            long_options={'recursive': 'r', 'count': 'c', 'files-with-matches': 'l',
+                          'ignore-case': 'i', 'invert-match': 'v', 'line-number': 'n'}
+        )
+    
+    def _stage_grep(self, args: List[str], stdin: Optional[Iterator[str]]) -> Iterator[str]:
+        """
+        Print lines matching a regular expression. Like grep(1), it fails
+        with status 1 when no line matched and 2 on errors
+        """
+        try:
+            switches, _, operands = self._parse_grep(args)
+        except CommandError as e:
+            raise CommandError(str(e), 2)
+        if not operands:
+            raise CommandError("grep: missing pattern", 2)
+        pattern, files = operands[0], operands[1:]
+        recursive = 'r' in switches or 'R' in switches
+        
+        if 'F' in switches:
+            pattern = re.escape(pattern)
+        if 'w' in switches:
+            pattern = rf"\b(?:{pattern})\b"
+        flags = re.IGNORECASE if 'i' in switches else 0
+        try:
+            regex = re.compile(pattern, flags)
+        except re.error as e:
+            raise CommandError(f"grep: invalid pattern: {e}", 2)
+        
+        if files or recursive or stdin is None:
+            yield from self._grep_files(pattern, flags, files, switches)
+            return
+        
+        invert = 'v' in switches
+        count = 0
+        for number, line in enumerate(self._iter_lines(stdin), 1):
+            if (regex.search(line) is not None) != invert:
+                count += 1
+                if 'l' in switches:
+                    yield '(standard input)\n'
+                    return
+                if 'c' not in switches:
+                    line_number = f"{number}:" if 'n' in switches else ""
+                    yield f"{line_number}{line}"
+        if 'c' in switches:
+            yield f"{count}\n"
+        if not count:
+            raise CommandError(status=1)
+    
+    def _grep_files(self, pattern: str, flags: int, files: List[str],
+                    switches: Set[str]) -> Iterator[str]:
+        """Search files with compiled byte regexes over mmap, fanned out across processes"""
+        recursive = 'r' in switches or 'R' in switches
+        if not files and not recursive:
+            raise CommandError("grep: missing file operand", 2)
+        mode = 'files' if 'l' in switches else 'count' if 'c' in switches else 'lines'
+        
+        # Map absolute search paths back to the names the user typed
+        roots = self._expand_named_globs(files) or [('', self.current_directory)]
+        show_label = recursive or len(roots) > 1 or 'H' in switches
+        def display(path: str) -> str:
+            for name, root in roots:
+                if path == root or path.startswith(root.rstrip(os.sep) + os.sep):
+                    shown = name + path[len(root):]
+                    return shown.lstrip(os.sep) if not name else shown
+            return path
+        
+        errors = []
+        def walk() -> Iterator[str]:
+            for _, root in roots:
+                for path, error in iter_files([root], recursive, 'R' in switches,
+                                                     cancel=self._cancel):
+                    if error:
+                        errors.append(f"grep: {display(path)}: {error}")
+                    else:
+                        yield path
+        
+        matched = False
+        def tally(results):
+            nonlocal matched
+            for path, kind, payload in results:
+                # Payloads are matching lines, a count or a flag, all falsy for no match
+                matched = matched or (kind != 'error' and bool(payload))
+                yield path, kind, payload
+        
+        results = search_files(walk(), pattern.encode('utf-8'), flags, 'v' in switches, mode)
+        yield from self._coalesce(self._format_grep(tally(results), mode, show_label,
+                                                    'n' in switches, display, errors), 4096)
+        if errors:
+            raise CommandError('\n'.join(errors), 2)
+        if not matched:
+            raise CommandError(status=1)
+    
+    def _format_grep(self, results, mode: str, show_label: bool, line_numbers: bool,
+                     display, errors: List[str]) -> Iterator[str]:
+        for path, kind, payload in results:
+            label = f"{display(path)}:" if show_label else ""
+            if kind == 'error':
+                errors.append(f"grep: {display(path)}: {payload}")
+            elif kind == 'count':
+                yield f"{label}{payload}\n"
+            elif mode == 'files':
+                if payload:
+                    yield f"{display(path)}\n"
+            elif kind == 'binary':
+                if payload:
+                    yield f"Binary file {display(path)} matches\n"
+            else:
+                for number, text in payload:
+                    line_number = f"{number}:" if line_numbers else ""
+                    yield f"{label}{line_number}{text}\n"
+    
+    def _cmd_du(self, args: List[str]) -> Tuple[str, int, str]:
+        """Report disk usage of directory trees"""
+        try:
+            output = ''.join(self._stage_du(args, None))
+        except CommandError as e:
             return "", 1, str(e)
+        return output.rstrip('\n'), 0, ""
+    
+    def _stage_du(self, args: List[str], stdin: Optional[Iterator[str]]) -> Iterator[str]:
+        """Print directory totals, children before parents, from the shared size cache"""
+        switches, values, paths = self._parse_du(args)
+        
+        def format_usage(size: int) -> str:
+            return self._format_size(size) if 'h' in switches else str(-(-size // 1024))
+        
+        yield from self._coalesce(f"{format_usage(size)}\t{path}\n"
+                                  for path, _, size in self._iter_du(switches, values, paths))
+    
+    def _parse_du(self, args: List[str]) -> Tuple[Set[str], Dict[str, str], List[str]]:
+        return self._parse_options(
+            'du', args, flags='sh', valued=('d', 'n'),
+            long_options={'summarize': 's', 'human-readable': 'h', 'max-depth': 'd', 'top': 'n'}
+        )
+    
+    def _iter_du(self, switches: Set[str], values: Dict[str, str],
+                 paths: List[str]) -> Iterator[Tuple[str, int, int]]:
+        """Yield (path, depth, bytes) rows for du, raising CommandError after the rows on errors"""
+        max_depth = self._parse_count('du', values['d']) if 'd' in values else None
+        if 's' in switches:
+            max_depth = 0
+        top = self._parse_count('du', values['n']) if 'n' in values else None
+        
+        errors = []
+        for path in paths or ['.']:
+            target = os.path.normpath(self._resolve_path(path))
+            if not os.path.lexists(target):
+                errors.append(f"du: cannot access '{path}': No such file or directory")
+                continue
+            usage = self.fs_index.disk_usage(target, cancel=self._cancel)
+            errors.extend(usage.errors)
+            
+            directories = [directory for directory in usage.walk()
+                           if max_depth is None or usage.depths[directory] <= max_depth]
+            if top is not None:
+                directories = heapq.nlargest(top, directories, key=usage.totals.__getitem__)
+            for directory in directories:
+                yield (f"{path}{directory[len(target):]}", usage.depths[directory],
+                       usage.totals[directory])
+        if errors:
+            raise CommandError('\n'.join(errors))
+    
+    def _cmd_find(self, args: List[str]) -> Tuple[str, int, str]:
+        """Search a directory tree for files by name and type"""
+        try:
+            output = ''.join(self._stage_find(args, None))
+        except CommandError as e:
+            return "", 1, str(e)
+        return output.rstrip('\n'), 0, ""
+    
+    def _parse_find(self, args: List[str]) -> Tuple[List[str], Dict[str, object]]:
+        """
+        Split find's arguments into its roots and find_paths() options
+        Returns: (roots, options)
+        """
+        roots = []
+        while len(roots) < len(args) and not args[len(roots)].startswith('-'):
+            roots.append(args[len(roots)])
+        predicates = args[len(roots):]
+        
+        options = {}
+        valued = {'-name': 'name', '-iname': 'iname', '-type': 'kind',
+                  '-maxdepth': 'max_depth', '-mindepth': 'min_depth'}
+        for i in range(0, len(predicates), 2):
+            option = predicates[i]
+            if option not in valued:
+                raise UnsupportedOption(f"find: unknown predicate '{option}'")
+            if i + 1 >= len(predicates):
+                raise CommandError(f"find: missing argument to '{option}'")
+            options[valued[option]] = predicates[i + 1]
+        if options.get('kind', 'f') not in ('f', 'd', 'l'):
+            raise UnsupportedOption(f"find: unknown argument to -type: {options['kind']}")
+        for key in ('max_depth', 'min_depth'):
+            if key in options:
+                options[key] = self._parse_count('find', options[key])
+        return roots, options
+    
+    def _stage_find(self, args: List[str], stdin: Optional[Iterator[str]]) -> Iterator[str]:
+        """Walk directory trees, printing paths that match every predicate"""
+        roots, options = self._parse_find(args)
+        
+        errors = []
+        def walk() -> Iterator[str]:
+            for root in roots or ['.']:
+                resolved = self._resolve_path(root)
+                for path, error in find_paths([resolved], cancel=self._cancel, **options):
+                    shown = root + path[len(resolved):]
+                    if error:
+                        errors.append(f"find: '{shown}': {error}")
+                    else:
+                        yield shown + '\n'
+        
+        yield from self._coalesce(walk(), 4096)
+        if errors:
+            raise CommandError('\n'.join(errors))
+    
+    def _parse_head_tail(self, name: str, args: List[str],
+                         stdin: Optional[Iterator[str]]) -> Tuple[str, int, List[str], bool]:
+        """
+        Parse head/tail options
+        Returns: ('lines' or 'bytes', count, files, follow)
+        """
+        args = [f"-n{arg[1:]}" if arg[1:].isdigit() and arg.startswith('-') else arg
+                for arg in args]
+        switches, values, files = self._parse_options(
+            name, args, flags='f' if name == 'tail' else '', valued='nc',
+            long_options={'lines': 'n', 'bytes': 'c', 'follow': 'f'}
+        )
+        # tail -n +N (from line N) and head -n -N (all but the last N) are the system tools'
+        for value in values.values():
+            if value.startswith('+' if name == 'tail' else '-'):
+                raise UnsupportedOption(f"{name}: unsupported count '{value}'")
+        if not files and stdin is None:
+            raise CommandError(f"{name}: missing file operand")
+        follow = 'f' in switches
+        if follow and len(files) != 1:
+            raise CommandError(f"{name}: follow mode needs exactly one file")
+        if 'c' in values:
+            return 'bytes', self._parse_count(name, values['c']), files, follow
+        return 'lines', self._parse_count(name, values.get('n', '10')), files, follow
+    
+    def _parse_head(self, args: List[str]) -> Tuple[str, int, List[str], bool]:
+        return self._parse_head_tail('head', args, None)
+    
+    def _parse_tail(self, args: List[str]) -> Tuple[str, int, List[str], bool]:
+        return self._parse_head_tail('tail', args, None)
+    
+    def _stage_head(self, args: List[str], stdin: Optional[Iterator[str]]) -> Iterator[str]:
+        """Output the first lines (or bytes) of the input"""
+        unit, count, files, _ = self._parse_head_tail('head', args, stdin)
+        length = count if unit == 'bytes' else None
+        
+        for label, chunks in self._iter_inputs('head', files, stdin, length):
+            if len(files) > 1:
+                yield f"==> {label} <==\n"
+            if count == 0:
+                continue
+            if unit == 'bytes':
+                # File inputs are already limited to the byte count
+                yield from chunks if files else self._take_chars(chunks, count)
+                continue
+            for number, line in enumerate(self._iter_lines(chunks), 1):
+                yield line
+                if number >= count:
+                    break
+    
+    def _take_chars(self, chunks: Iterable[str], count: int) -> Iterator[str]:
+        """Yield the first count characters of a chunk stream"""
+        for chunk in chunks:
+            if len(chunk) >= count:
+                yield chunk[:count]
+                return
+            count -= len(chunk)
+            yield chunk
+    
+    def _stage_tail(self, args: List[str], stdin: Optional[Iterator[str]]) -> Iterator[str]:
+        """Output the last lines (or bytes) of the input"""
+        unit, count, files, follow = self._parse_head_tail('tail', args, stdin)
+        
+        if follow:
+            yield from self._follow_file(files[0], unit, count)
+            return
+        
+        if not files:
+            if unit == 'bytes':
+                yield ''.join(stdin)[-count:] if count else ''
+            else:
+                yield from deque(self._iter_lines(stdin), maxlen=count)
+            return
+        
+        for file_name in files:
+            if len(files) > 1:
+                yield f"==> {file_name} <==\n"
+            with self._open_input('tail', file_name) as f:
+                size = os.fstat(f.fileno()).st_size
+                if unit == 'bytes':
+                    start = max(size - count, 0)
+                else:
+                    start = self._find_tail_offset(f, size, count)
+                if start is not None:
+                    yield from self._decode_blocks(self._iter_file_bytes(f, start))
+                    continue
+            # Not seekable or not mappable (pipes, /proc files): read front to back
+            yield from deque(self._iter_lines(self._iter_file_text('tail', file_name)),
+                             maxlen=count)
+    
+    def _follow_file(self, file_name: str, unit: str, count: int) -> Iterator[str]:
+        """
+        Output the end of a file, then keep yielding data appended to it.
+        Rotation (a new inode at the same path) and truncation are detected by
+        comparing the path's stat with the open file. Polling backs off while
+        the file is idle, and an empty chunk is yielded now and then so
+        streaming clients can notice a disconnected reader.
+        """
+        path = self._resolve_path(file_name)
+        f = self._open_input('tail', file_name)
+        try:
+            size = os.fstat(f.fileno()).st_size
+            if unit == 'bytes':
+                offset = max(size - count, 0)
+            else:
+                offset = self._find_tail_offset(f, size, count)
+                if offset is None:
+                    offset = 0 if size == 0 else size
+            f.seek(offset)
+            
+            identity = self._file_identity(os.fstat(f.fileno()))
+            decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+            interval = self.FOLLOW_MIN_INTERVAL
+            idle_since = time.monotonic()
+            
+            while True:
+                block = f.read(self.STREAM_CHUNK_SIZE)
+                if block:
+                    offset += len(block)
+                    text = decoder.decode(block)
+                    if text:
+                        yield text
+                    interval = self.FOLLOW_MIN_INTERVAL
+                    idle_since = time.monotonic()
+                    continue
+                
+                try:
+                    current = os.stat(path)
+                except FileNotFoundError:
+                    current = None  # Rotated away; wait for the new file
+                
+                if current is not None and self._file_identity(current) != identity:
+                    f.close()
+                    f = self._open_input('tail', file_name)
+                    identity = self._file_identity(os.fstat(f.fileno()))
+                    offset = 0
+                    decoder.reset()
+                    continue
+                if current is not None and current.st_size < offset:
+                    f.seek(0)  # Truncated in place
+                    offset = 0
+                    decoder.reset()
+                    continue
+                
+                if self._cancelled():
+                    return
+                if time.monotonic() - idle_since >= self.FOLLOW_HEARTBEAT:
+                    idle_since = time.monotonic()
+                    yield ''
+                time.sleep(interval)
+                interval = min(interval * 2, self.FOLLOW_MAX_INTERVAL)
+        finally:
+            f.close()
+    
+    def _file_identity(self, stat_info: os.stat_result) -> Tuple[int, int]:
+        return stat_info.st_dev, stat_info.st_ino
+    
+    def _is_follow_command(self, command: str) -> bool:
+        """Check whether any stage of a command is tail in follow mode"""
+        for stage in self._split_pipeline(command):
+            try:
+                parts = shlex.split(stage)
+            except ValueError:
+                return False
+            if parts and parts[0].lower() == 'tail' and any(
+                    arg.startswith('--follow') or arg == '--retry'
+                    or (arg.startswith('-') and not arg.startswith('--')
+                        and ('f' in arg or 'F' in arg))
+                    for arg in parts[1:]):
+                return True
+        return False
+    
+    def _is_live_command(self, command: str) -> bool:
+        """Check whether a command is a refreshing top -d/-n or watch view"""
+        if len(self._split_pipeline(command)) > 1:
+            return False
+        try:
+            parts = shlex.split(command)
+        except ValueError:
+            return False
+        if not parts:
+            return False
+        cmd = parts[0].lower()
+        return cmd == 'watch' or (cmd in ('top', 'htop') and len(parts) > 1)
+    
+    def _find_tail_offset(self, f, size: int, count: int) -> Optional[int]:
+        """
+        Find where the last count lines of a file start by scanning backwards
+        through a memory map, so only the tail of a huge file is touched
+        Returns None when the file cannot be mapped
+        """
+        if count == 0:
+            return size
+        if size == 0:
+            return None
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                end = size - 1 if mapped[size - 1] == 0x0a else size
+                for _ in range(count):
+                    end = mapped.rfind(b'\n', 0, end)
+                    if end < 0:
+                        return 0
+                return end + 1
+        except (OSError, ValueError):
+            return None
+    
+    def _stage_wc(self, args: List[str], stdin: Optional[Iterator[str]]) -> Iterator[str]:
+        """Count lines, words and characters"""
+        switches, _, files = self._parse_options('wc', args, flags='lwc')
+        columns = [flag for flag in 'lwc' if flag in switches] or ['l', 'w', 'c']
+        
+        for label, chunks in self._iter_inputs('wc', files, stdin):
+            totals = {'l': 0, 'w': 0, 'c': 0}
+            in_word = False
+            for chunk in chunks:
+                totals['l'] += chunk.count('\n')
+                totals['c'] += len(chunk)
+                # Count words across chunk boundaries
+                words = chunk.split()
+                if words:
+                    totals['w'] += len(words)
+                    if in_word and not chunk[0].isspace():
+                        totals['w'] -= 1
+                in_word = bool(chunk) and not chunk[-1].isspace()
+            counts = ' '.join(f"{totals[column]:7d}" for column in columns)
+            yield f"{counts} {label}\n" if files else f"{counts}\n"
     
     def get_prompt(self) -> str:
         """Get command prompt string"""
@@ -584,4 +2487,134 @@ AI Mode:
         hostname = platform.node()
         current_dir = os.path.basename(self.current_directory) or self.current_directory
         
-        return f"{user}@{hostname}:{current_dir}$ "
\ No newline at end of file
+        return f"{user}@{hostname}:{current_dir}$ "
+
+
+def _register_builtins(registry: CommandRegistry):
+    """Describe every built-in command; help and completion are generated from this"""
+    files = 'File Operations'
+    for command in [
+        Command('ls', '_cmd_ls', aliases=('dir',), category=files, stage='_stage_ls',
+                streaming=True, data='_data_ls',
+                summary="List directory contents (-a, -l, -h, -R, -S size, -t time,\n"
+                        "-r reverse, -U unsorted, --limit N, --page N)"),
+        Command('cd', '_cmd_cd', category=files, usage='cd <path>', summary="Change directory"),
+        Command('pwd', '_cmd_pwd', category=files, data='_data_pwd', completion=None,
+                summary="Print working directory"),
+        Command('mkdir', '_cmd_mkdir', category=files, usage='mkdir <dir>',
+                summary="Create directory"),
+        Command('rmdir', '_cmd_remove', category=files, stage='_stage_rm', streaming=True,
+                usage='rmdir <dir>', summary="Remove empty directory"),
+        Command('rm', '_cmd_remove', aliases=('del',), category=files, stage='_stage_rm',
+                streaming=True, usage='rm <file>',
+                summary="Remove file/directory (-r parallel recursive delete,\n"
+                        "--async to delete a tree in the background)"),
+        Command('cp', '_cmd_copy', aliases=('copy',), category=files, stage='_stage_cp',
+                streaming=True, usage='cp <src>... <dst>',
+                summary="Copy files/directories in parallel (wildcards allowed)"),
+        Command('mv', '_cmd_move', aliases=('move',), category=files, usage='mv <src> <dst>',
+                summary="Move/rename file/directory"),
+        Command('cat', '_cmd_cat', aliases=('type',), category=files, stage='_stage_cat',
+                streaming=True, usage='cat <file>',
+                summary="Display file contents (--bytes=START-END for a byte range)"),
+        Command('head', '_cmd_head', category=files, stage='_stage_head', streaming=True,
+                options='_parse_head', usage='head <file>', summary="Show the first lines of a file (-n N, -c N)"),
+        Command('tail', '_cmd_tail', category=files, stage='_stage_tail', streaming=True,
+                options='_parse_tail', usage='tail <file>',
+                summary="Show the last lines of a file (-n N, -c N, -f to follow)"),
+        Command('touch', '_cmd_touch', category=files, usage='touch <file>',
+                summary="Create empty file or update timestamp"),
+        Command('grep', '_cmd_grep', category=files, stage='_stage_grep', streaming=True,
+                options='_parse_grep', usage='grep <pat> <file>...',
+                summary="Search files (-r recursive, -i, -v, -n, -c, -l, -w, -F)"),
+        Command('find', '_cmd_find', category=files, stage='_stage_find', streaming=True,
+                options='_parse_find',
+                usage='find [path] -name <glob> -type f|d -maxdepth N',
+                summary="Find files by name and type"),
+        Command('du', '_cmd_du', category=files, stage='_stage_du', data='_data_du',
+                options='_parse_du', usage='du [-s] [-h] [-d N] [-n N] [path]',
+                summary="Disk usage per directory (-n: N largest)"),
+        Command('echo', '_cmd_echo', category=files, stage='_stage_echo', usage='echo <text>',
+                summary="Display text (use > filename to redirect to file)"),
+        # Only a pipeline stage; outside a pipeline wc is the system's
+        Command('wc', stage='_stage_wc', category='Pipelines'),
+    ]:
+        registry.register(command)
+    registry.add_note('Pipelines', 'a | b | c',
+                      "Chain commands; cat, echo, grep, head, tail and wc run\n"
+                      "in-process and stream lines lazily to the next stage")
+    
+    monitoring = 'System Monitoring'
+    registry.register(Command(
+        'ps', '_cmd_ps', aliases=('tasklist',), category=monitoring, data='_data_ps',
+        completion=None,
+        summary="List running processes (--sort -cpu, -p pids, -u user,\n"
+                "--name regex, --limit N, -o pid,name,cpu,mem,rss,cmd,...)"))
+    registry.register(Command(
+        'top', '_cmd_top', aliases=('htop',), category=monitoring, data='_data_top',
+        usage='top', completion=None,
+        summary="Show system information and top processes (-d secs: live)"))
+    registry.register(Command(
+        'watch', '_cmd_watch', category=monitoring, usage='watch [-n secs] <cmd>',
+        completion='command', summary="Re-run a command, refreshing its output in place"))
+    registry.register(Command(
+        'kill', '_cmd_kill', aliases=('taskkill',), category=monitoring, usage='kill <pid>',
+        completion=None, summary="Terminate process by PID"))
+    
+    registry.add_note('Structured Output', '<cmd> --json',
+                      "Print typed JSON instead of text (ls, ps, top, du, history,\n"
+                      "set, alias, jobs, pwd); tables are encoded column by column")
+    
+    jobs = 'Job Control'
+    registry.add_note(jobs, '<cmd> &', "Run a command in the background")
+    for command in [
+        Command('jobs', '_cmd_jobs', category=jobs, data='_data_jobs', completion=None,
+                summary="List background jobs (-l to show PIDs)"),
+        Command('fg', '_cmd_fg', category=jobs, usage='fg [%n]', completion=None,
+                summary="Bring a job to the foreground and show its output"),
+        Command('wait', '_cmd_wait', category=jobs, usage='wait [%n]', completion=None,
+                summary="Wait for background jobs to finish"),
+    ]:
+        registry.register(command)
+    registry.add_note(jobs, 'kill %n', "Terminate a background job")
+    
+    features = 'Terminal Features'
+    for command in [
+        Command('history', '_cmd_history', category=features, data='_data_history',
+                completion=None, summary="Show command history"),
+        Command('clear', '_cmd_clear', aliases=('cls',), category=features, completion=None,
+                summary="Clear screen"),
+        Command('alias', '_cmd_alias', category=features, data='_data_alias', completion=None,
+                summary="Create command aliases"),
+        Command('set', '_cmd_set_env', aliases=('export',), category=features,
+                data='_data_set', completion=None, summary="Set environment variables"),
+        Command('unset', '_cmd_unset', category=features, usage='unset <name>',
+                completion=None, summary="Remove environment variables"),
+        Command('help', '_cmd_help', category=features, completion='command',
+                summary="Show this help message (help <cmd> for one command)"),
+        Command('exit', '_cmd_exit', aliases=('quit',), category=features, completion=None,
+                summary="Exit the terminal"),
+    ]:
+        registry.register(command)
+    
+    # Mode switches are acted on by the CLI or web front end
+    registry.register(Command(
+        'ai', lambda terminal, args: ("terminal_command:ai", 0, ""), category='AI Features',
+        completion=None, summary="Enter AI natural language mode"))
+    registry.register(Command(
+        'normal', lambda terminal, args: ("terminal_command:normal", 0, ""),
+        category='AI Features', completion=None,
+        summary="Exit AI mode (return to normal terminal)"))
+    
+    for usage, summary in [
+        ('echo "Hello World" > test.txt', "Create file with content"),
+        ('ls -la', "List all files with details"),
+        ('mkdir -p dir1/dir2', "Create nested directories"),
+        ('rm -r folder', "Remove folder recursively"),
+        ('cp *.txt backup/', "Copy all txt files to backup"),
+        ('ps', "Show running processes"),
+        ('top', "Show system stats"),
+    ]:
+        registry.add_note('Examples', usage.ljust(30), summary)
+
+_register_builtins(PythonTerminal.commands)
@@ -3,6 +3,11 @@
 Quick test script to verify terminal functionality
 """
 
+import os
+import sys
+import threading
+import time
+
 from terminal_core import PythonTerminal
 from ai_interpreter import AICommandInterpreter
 
@@ -64,5 +69,662 @@ def test_terminal():
     terminal.execute_command("rm -r test_docs")
     print("\nTest completed!")
 
+def test_execute_command_stream():
+    terminal = PythonTerminal()
+    script = "import sys; print('out'); sys.stdout.flush(); print('err', file=sys.stderr)"
+    chunks = list(terminal.execute_command_stream(f'"{sys.executable}" -c "{script}"'))
+    
+    assert ''.join(data for channel, data in chunks if channel == 'stdout') == 'out\n'
+    assert ''.join(data for channel, data in chunks if channel == 'stderr') == 'err\n'
+    assert chunks[-1] == ('exit', 0)
+    
+    # Built-ins come through the same interface
+    assert list(terminal.execute_command_stream('pwd')) == [
+        ('stdout', terminal.current_directory), ('exit', 0)
+    ]
+
+def test_execute_stream_endpoint():
+    from web_interface import app
+    
+    response = app.test_client().post('/execute_stream', json={
+        'command': 'pwd', 'session_id': 'test_stream'
+    })
+    body = response.get_data(as_text=True)
+    
+    assert response.mimetype == 'text/event-stream'
+    assert 'event: stdout' in body
+    assert body.rstrip().split('\n\n')[-1].startswith('event: done')
+
+def test_background_jobs():
+    terminal = PythonTerminal()
+    
+    output, return_code, _ = terminal.execute_command(f'"{sys.executable}" -c "print(42)" &')
+    assert return_code == 0 and output.startswith('[1]')
+    
+    output, return_code, _ = terminal.execute_command('fg %1')
+    assert (output, return_code) == ('42\n', 0)
+    assert terminal.execute_command('jobs') == ('', 0, '')
+    assert terminal.execute_command('kill %7')[1] == 1
+
+def test_background_job_snapshot(tmp_path):
+    from job_control import MAX_JOB_WORKERS
+    
+    terminal = PythonTerminal()
+    terminal.current_directory = str(tmp_path)
+    (tmp_path / 'b').mkdir()
+    
+    # With every worker busy, the jobs start only after the session has moved on
+    for _ in range(MAX_JOB_WORKERS):
+        terminal.execute_command(f'"{sys.executable}" -c "import time; time.sleep(0.5)" &')
+    terminal.execute_command('set STAMP=before')
+    terminal.execute_command('touch marker &')
+    terminal.execute_command('printenv STAMP &')
+    printenv = terminal.jobs.get()
+    terminal.execute_command('cd b')
+    terminal.execute_command('set STAMP=after')
+    assert printenv.wait(10) and printenv.output().strip() == 'before'
+    assert (tmp_path / 'marker').exists() and not (tmp_path / 'b' / 'marker').exists()
+    
+    # A killed built-in stops walking and frees its worker
+    terminal.execute_command('find / -name no-such-file-anywhere &')
+    job = terminal.jobs.get()
+    deadline = time.time() + 10
+    while job.status != 'Running' and time.time() < deadline:
+        time.sleep(0.01)
+    assert terminal.execute_command(f'kill %{job.job_id}')[1] == 0
+    assert job.wait(5) and job.return_code == -15 and job.status == 'Killed'
+    assert not job.future.running()
+
+def test_pipelines(tmp_path):
+    terminal = PythonTerminal()
+    terminal.current_directory = str(tmp_path)
+    (tmp_path / 'log.txt').write_text(''.join(f"line {i}\n" for i in range(1, 1001)))
+    
+    assert terminal.execute_command('cat log.txt | grep -n "line 99" | head -n 2') == (
+        '99:line 99\n990:line 990\n', 0, ''
+    )
+    assert terminal.execute_command('cat log.txt | tail -n 1 | wc -w')[0].split() == ['2']
+    assert terminal.execute_command('echo "a|b" | cat') == ('a|b\n', 0, '')
+    assert terminal.execute_command('cat missing.txt | head')[1] == 1
+    
+    # Shell syntax the pipeline engine lacks sends the whole line to the shell
+    assert terminal.execute_command('cat log.txt | grep "line 7$" > out.txt')[1] == 0
+    assert (tmp_path / 'out.txt').read_text() == 'line 7\n'
+    assert terminal.execute_command('cat log.txt | head -n 1 && echo yes') == (
+        'line 1\nyes\n', 0, ''
+    )
+    assert terminal.execute_command(
+        'printf "x\\n" | sort | head -n 1 >> out.txt; cat out.txt'
+    )[0] == 'line 7\nx\n'
+
+def test_pipeline_timeout(tmp_path):
+    terminal = PythonTerminal()
+    terminal.current_directory = str(tmp_path)
+    terminal.COMMAND_TIMEOUT = 1
+    (tmp_path / 'live.log').write_text('old\n')
+    
+    start = time.time()
+    output, return_code, error = terminal.execute_command('sleep 4 | cat')
+    assert time.time() - start < 3
+    assert (return_code, error) == (1, 'Command timed out after 1 seconds\n')
+    
+    # Endless producers are stopped on the streaming path too, whether they
+    # are processes or built-ins
+    for command in ('yes | cat', 'tail -f live.log | grep no-match'):
+        start = time.time()
+        chunks = list(terminal.execute_command_stream(command, timeout=1))
+        assert time.time() - start < 3, command
+        assert chunks[-2:] == [('stderr', 'Command timed out after 1 seconds\n'), ('exit', 1)]
+
+def test_ls_sorting_and_paging(tmp_path):
+    terminal = PythonTerminal()
+    terminal.current_directory = str(tmp_path)
+    for name, size in [('small', 1), ('large', 300), ('medium', 20)]:
+        (tmp_path / name).write_text('x' * size)
+    (tmp_path / '.hidden').write_text('')
+    (tmp_path / 'nested').mkdir()
+    (tmp_path / 'nested' / 'inner').write_text('')
+    
+    assert terminal.execute_command('ls') == ('large  medium  nested  small', 0, '')
+    assert terminal.execute_command('ls -a --limit 2')[0] == '.hidden  large'
+    by_size = [name for name in terminal.execute_command('ls -S -1')[0].split('\n')
+               if name != 'nested']
+    assert by_size == ['large', 'medium', 'small']
+    assert terminal.execute_command('ls -r --limit 1 --page 2')[0] == 'nested'
+    assert terminal.execute_command('ls -la')[0].splitlines()[0].startswith('-rw')
+    assert 'inner' in terminal.execute_command('ls -R')[0]
+    assert terminal.execute_command('ls | wc -l')[0].split() == ['4']
+
+def test_cat_head_tail(tmp_path):
+    terminal = PythonTerminal()
+    terminal.current_directory = str(tmp_path)
+    (tmp_path / 'app.log').write_text(''.join(f"event {i}\n" for i in range(10000)))
+    (tmp_path / 'blob.bin').write_bytes(b'\x00\x01binary')
+    
+    assert terminal.execute_command('head -n 2 app.log')[0] == 'event 0\nevent 1\n'
+    assert terminal.execute_command('tail -n 2 app.log')[0] == 'event 9998\nevent 9999\n'
+    assert terminal.execute_command('cat --bytes=6-7 app.log')[0] == '0\n'
+    assert terminal.execute_command('cat blob.bin')[1] == 1
+    assert terminal.execute_command('cat --bytes=0-1 blob.bin')[0].startswith('00000000  00 01')
+    assert len(terminal.execute_command('cat app.log')[0].splitlines()) == 10000
+    
+    # GNU options and counts the built-ins lack run the system tools
+    assert terminal.execute_command('tail -n +9999 app.log')[0] == 'event 9998\nevent 9999\n'
+    assert terminal.execute_command('head -q -n 1 app.log app.log')[0] == 'event 0\nevent 0\n'
+    assert terminal.execute_command('head -n 3 app.log | head -n -2')[0] == 'event 0\n'
+    
+    # A missing operand is reported without losing the files that exist
+    (tmp_path / 'a.txt').write_text('alpha\n')
+    output, return_code, error = terminal.execute_command('cat a.txt missing.txt a.txt')
+    assert output == 'alpha\nalpha\n' and return_code == 1
+    assert error == 'cat: missing.txt: No such file or directory'
+    output, return_code, error = terminal.execute_command('cat missing.txt a.txt | wc -l')
+    assert output.strip() == '1' and return_code == 1 and 'missing.txt' in error
+
+def test_tail_follow(tmp_path):
+    terminal = PythonTerminal()
+    terminal.current_directory = str(tmp_path)
+    log = tmp_path / 'live.log'
+    log.write_text('old\n')
+    
+    stream = terminal.execute_command_stream('tail -n 1 -f live.log')
+    assert next(stream) == ('stdout', 'old\n')
+    with open(log, 'a') as f:
+        f.write('new\n')
+    assert next(stream) == ('stdout', 'new\n')
+    stream.close()
+    
+    assert terminal.execute_command('tail -f live.log')[1] == 1
+    assert terminal.execute_command('tail -F live.log')[1] == 1
+
+def test_parallel_copy(tmp_path):
+    terminal = PythonTerminal()
+    terminal.current_directory = str(tmp_path)
+    (tmp_path / 'src' / 'nested').mkdir(parents=True)
+    for i in range(50):
+        (tmp_path / 'src' / 'nested' / f"file{i}.txt").write_text(str(i))
+    (tmp_path / 'a.txt').write_text('a')
+    (tmp_path / 'b.txt').write_text('b')
+    (tmp_path / 'backup').mkdir()
+    
+    output, return_code, _ = terminal.execute_command('cp -r src copy')
+    assert return_code == 0 and output.startswith('Copied 50 files')
+    assert (tmp_path / 'copy' / 'nested' / 'file49.txt').read_text() == '49'
+    
+    assert terminal.execute_command('cp *.txt backup/')[1] == 0
+    assert sorted(p.name for p in (tmp_path / 'backup').iterdir()) == ['a.txt', 'b.txt']
+    assert terminal.execute_command('cp a.txt b.txt missing')[1] == 1
+    
+    # Copying a file onto itself must fail without truncating it
+    for command in ('cp a.txt a.txt', 'cp a.txt .'):
+        output, return_code, error = terminal.execute_command(command)
+        assert return_code == 1 and 'are the same file' in error
+        assert (tmp_path / 'a.txt').read_text() == 'a'
+
+def test_parallel_remove(tmp_path):
+    import time
+    
+    terminal = PythonTerminal()
+    terminal.current_directory = str(tmp_path)
+    for tree in ['build', 'cache']:
+        for i in range(5):
+            (tmp_path / tree / f"dir{i}" / 'deep').mkdir(parents=True)
+            (tmp_path / tree / f"dir{i}" / 'deep' / 'artifact.o').write_text('x')
+    
+    output, return_code, _ = terminal.execute_command('rm -r build')
+    assert return_code == 0 and 'build (5 files, 11 directories' in output
+    assert not (tmp_path / 'build').exists()
+    
+    assert terminal.execute_command('rm -r --async cache')[1] == 0
+    assert not (tmp_path / 'cache').exists()
+    deadline = time.monotonic() + 5
+    while list(tmp_path.iterdir()) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert list(tmp_path.iterdir()) == []
+
+def test_grep_and_find(tmp_path, monkeypatch):
+    import search
+    
+    terminal = PythonTerminal()
+    terminal.current_directory = str(tmp_path)
+    (tmp_path / 'src' / 'pkg').mkdir(parents=True)
+    for i in range(10):
+        (tmp_path / 'src' / 'pkg' / f"mod{i}.py").write_text(f"import os\nVALUE = {i}\n")
+    (tmp_path / 'src' / 'blob.bin').write_bytes(b'VALUE\0')
+    
+    # Force the process-pool path even for a small tree
+    monkeypatch.setattr(search, 'PARALLEL_MIN_FILES', 2)
+    output, return_code, _ = terminal.execute_command('grep -rn VALUE src')
+    lines = output.splitlines()
+    assert return_code == 0 and lines[0] == 'Binary file src/blob.bin matches'
+    assert lines[1:3] == ['src/pkg/mod0.py:2:VALUE = 0', 'src/pkg/mod1.py:2:VALUE = 1']
+    assert len(lines) == 11
+    
+    assert terminal.execute_command('grep -c -i value src/pkg/mod3.py')[0] == '1'
+    assert terminal.execute_command('grep -rl "= 7" src')[0] == 'src/pkg/mod7.py'
+    # grep(1) statuses: 1 when nothing matched, 2 on errors
+    assert terminal.execute_command('grep VALUE missing.txt')[1] == 2
+    assert terminal.execute_command('grep -r nowhere src') == ('', 1, '')
+    assert terminal.execute_command('grep -c nowhere src/pkg/mod3.py') == ('0', 1, '')
+    assert terminal.execute_command('cat src/pkg/mod3.py | grep nowhere')[1] == 1
+    
+    # Files reporting a size of 0 are read rather than taken to be empty
+    if os.path.exists('/proc/self/status'):
+        assert terminal.execute_command('grep -c ^Name: /proc/self/status')[0] == '1'
+    if hasattr(os, 'mkfifo'):
+        os.mkfifo(tmp_path / 'fifo')
+        writer = threading.Thread(target=(tmp_path / 'fifo').write_text, args=('a\nVALUE\n',))
+        writer.start()
+        assert terminal.execute_command('grep -n VALUE fifo') == ('2:VALUE', 0, '')
+        writer.join()
+    
+    # An empty match after the trailing newline is not a third line
+    assert terminal.execute_command("grep -c '' src/pkg/mod3.py")[0] == '2'
+    assert terminal.execute_command("grep -n 'x*' src/pkg/mod3.py")[0] == '1:import os\n2:VALUE = 3'
+    
+    # Options the built-ins lack run the system tools, alone or in a pipeline
+    assert terminal.execute_command('grep -o VAL src/pkg/mod3.py') == ('VAL\n', 0, '')
+    assert terminal.execute_command('grep -A1 import src/pkg/mod3.py')[0] == (
+        'import os\nVALUE = 3\n'
+    )
+    assert terminal.execute_command('cat src/pkg/mod3.py | grep -o VAL')[0] == 'VAL\n'
+    assert terminal.execute_command(
+        'find src -name mod3.py -size -2k -exec cat {} \\;')[0] == 'import os\nVALUE = 3\n'
+    assert terminal.execute_command('grep VALUE src/pkg/mod3.py > out.txt')[1] == 0
+    assert (tmp_path / 'out.txt').read_text() == 'VALUE = 3\n'
+    
+    output, return_code, _ = terminal.execute_command("find src -name 'mod1*' -type f")
+    assert return_code == 0 and output == 'src/pkg/mod1.py'
+    assert terminal.execute_command('find -maxdepth 1 -type d')[0] == '.\n./src'
+    assert terminal.execute_command('find src -type d | wc -l')[0].strip() == '2'
+
+def test_directory_index(tmp_path):
+    import fs_index
+    
+    for name in ['a', 'b', 'c']:
+        (tmp_path / name).mkdir()
+        (tmp_path / name / 'file.txt').write_text(name)
+    old = time.time() - 60
+    for name in ['a', 'b', 'c']:
+        os.utime(tmp_path / name, (old, old))
+    
+    index = fs_index.DirectoryIndex()
+    assert [entry.name for entry in index.listdir(str(tmp_path / 'a'))] == ['file.txt']
+    index.listdir(str(tmp_path / 'a'))
+    assert (index.hits, index.misses) == (1, 1)
+    
+    # A changed directory mtime forces a rescan
+    (tmp_path / 'a' / 'new.txt').write_text('new')
+    assert sorted(entry.name for entry in index.listdir(str(tmp_path / 'a'))) == ['file.txt', 'new.txt']
+    assert index.misses == 2
+    
+    # The least recently used listing is evicted once the budget is exceeded
+    small = fs_index.DirectoryIndex(memory_budget=fs_index.ENTRY_OVERHEAD * 3)
+    for name in ['b', 'c']:
+        small.listdir(str(tmp_path / name))
+    assert small._snapshots.keys() == [str(tmp_path / 'c')]
+    
+    terminal = PythonTerminal()
+    terminal.current_directory = str(tmp_path)
+    assert terminal.complete_path('a/f') == ['a/file.txt']
+    assert terminal.complete_path('') == ['a/', 'b/', 'c/']
+    assert terminal.fs_index is PythonTerminal().fs_index
+
+def test_du(tmp_path, monkeypatch):
+    import fs_index
+    
+    terminal = PythonTerminal()
+    terminal.current_directory = str(tmp_path)
+    for name, size in [('logs', 8192), ('logs/old', 16384), ('src', 4096)]:
+        (tmp_path / name).mkdir()
+        (tmp_path / name / 'data.bin').write_bytes(b'x' * size)
+    old = time.time() - 60
+    for name in ['.', 'logs', 'logs/old', 'src']:
+        os.utime(tmp_path / name, (old, old))
+    
+    output, return_code, _ = terminal.execute_command('du')
+    rows = [line.split('\t') for line in output.splitlines()]
+    assert return_code == 0
+    assert [path for _, path in rows] == ['./logs/old', './logs', './src', '.']
+    sizes = {path: int(size) for size, path in rows}
+    assert sizes['./logs'] >= sizes['./logs/old'] + 8 and sizes['.'] >= sizes['./logs'] + 4
+    
+    usage = terminal.fs_index.disk_usage(str(tmp_path))
+    assert (usage.scanned, usage.reused) == (0, 4)
+    
+    # Only the changed directory is rescanned
+    (tmp_path / 'src' / 'more.bin').write_bytes(b'x' * 8192)
+    usage = terminal.fs_index.disk_usage(str(tmp_path))
+    assert (usage.scanned, usage.reused) == (1, 3)
+    
+    # A file growing in place leaves its directory's mtime alone, so records expire
+    os.utime(tmp_path / 'src', (old, old))
+    assert int(terminal.execute_command('du -s src')[0].split()[0]) < 1024
+    with open(tmp_path / 'src' / 'data.bin', 'ab') as f:
+        f.write(b'x' * 1024 * 1024)
+    monkeypatch.setattr(fs_index, 'USAGE_TTL', 0)
+    assert int(terminal.execute_command('du -s src')[0].split()[0]) >= 1024
+    
+    assert terminal.execute_command('du -s -h src')[0].endswith('\tsrc')
+    assert terminal.execute_command('du --top 1 logs')[0].split('\t')[1] == 'logs'
+    assert terminal.execute_command('du --max-depth=1 logs')[0].count('\n') == 1
+    
+    # Options the built-in lacks run the system du
+    output, return_code, _ = terminal.execute_command('du -a src')
+    assert return_code == 0 and 'src/data.bin' in output
+
+def test_system_sampler():
+    terminal = PythonTerminal()
+    output, return_code, _ = terminal.execute_command('top')
+    assert return_code == 0 and 'CPU Usage' in output
+    
+    # Later reads are served from the background sampler's snapshot
+    started = time.monotonic()
+    output, return_code, _ = terminal.execute_command('ps')
+    assert time.monotonic() - started < 0.5
+    assert return_code == 0 and f"{os.getpid():8d} " in output
+
+def test_ps_selection():
+    terminal = PythonTerminal()
+    
+    output, return_code, _ = terminal.execute_command(f'ps -p {os.getpid()} -o pid,threads,cmd')
+    header, row = output.split('\n')
+    assert return_code == 0 and header.split() == ['PID', 'THR', 'COMMAND']
+    assert row.split()[0] == str(os.getpid()) and 'python' in row.lower()
+    
+    output, return_code, _ = terminal.execute_command('ps --sort -mem --limit 2 -o mem,pid')
+    memory = [float(line.split()[0]) for line in output.split('\n')[1:]]
+    assert return_code == 0 and len(memory) == 2 and memory[0] >= memory[1]
+    
+    assert terminal.execute_command('ps --name "^no such process$"')[1] == 1
+    assert terminal.execute_command('ps -o pid,bogus')[1] == 1
+
+def test_structured_output(tmp_path):
+    import json
+    from web_interface import app
+    
+    terminal = PythonTerminal()
+    terminal.current_directory = str(tmp_path)
+    (tmp_path / 'notes.txt').write_text('hello')
+    (tmp_path / 'docs').mkdir()
+    
+    output, return_code, _ = terminal.execute_command('ls --json')
+    listing = json.loads(output)
+    assert return_code == 0 and listing['format'] == 'columnar' and listing['length'] == 2
+    assert listing['columns']['name'] == ['docs', 'notes.txt']
+    assert listing['columns']['type'] == ['directory', 'file']
+    assert listing['columns']['size'][1] == 5
+    
+    data, return_code, _ = terminal.execute_command_data(f'ps -p {os.getpid()} -o pid,name')
+    assert return_code == 0 and data['columns']['pid'] == [os.getpid()]
+    assert terminal.execute_command_data('history')[0]['records'][1] == {
+        'index': 2, 'command': f'ps -p {os.getpid()} -o pid,name'
+    }
+    assert terminal.execute_command_data('echo hi')[0] == {'format': 'text', 'text': 'hi'}
+    assert json.loads(terminal.execute_command('ls --json | head -n 1')[0])['length'] == 2
+    
+    response = app.test_client().post('/execute', json={
+        'command': 'pwd', 'session_id': 'test_structured', 'format': 'json'
+    }).get_json()
+    assert response['data']['format'] == 'object' and 'path' in response['data']['value']
+
+def test_live_views(tmp_path):
+    terminal = PythonTerminal()
+    terminal.current_directory = str(tmp_path)
+    (tmp_path / 'a.txt').write_text('a')
+    
+    stream = terminal.execute_command_stream('watch -n 0.1 ls')
+    channel, first = next(stream)
+    assert channel == 'frame' and first == {
+        'lines': 3, 'changed': [[0, 'Every 0.1s: ls'], [1, ''], [2, 'a.txt']]
+    }
+    
+    # Only the row that changed is sent in the next frame
+    (tmp_path / 'b.txt').write_text('b')
+    channel, second = next(item for item in stream if item[0] == 'frame')
+    assert second == {'lines': 3, 'changed': [[2, 'a.txt  b.txt']]}
+    stream.close()
+    
+    assert terminal.execute_command('watch --count 1 pwd')[0].endswith(str(tmp_path))
+    assert terminal.execute_command('top -d 1')[1] == 1
+    output, return_code, _ = terminal.execute_command('top -d 0.1 -n 2')
+    assert return_code == 0 and output.startswith('CPU Usage')
+
+def test_ring_buffer():
+    from system_sampler import RingBuffer, sparkline
+    
+    history = RingBuffer(3)
+    for value in [10, 20, 30, 40]:
+        history.append(value)
+    assert history.values() == [20.0, 30.0, 40.0] and history.values(1) == [40.0]
+    assert sparkline([0, 100]) == '▁█'
+
+def test_command_registry(monkeypatch):
+    import importlib.metadata
+    from command_registry import CommandRegistry, Command
+    
+    loaded = []
+    
+    def hello(terminal, args):
+        """Greet someone"""
+        return f"hello {' '.join(args)}", 0, ""
+    
+    class FakeEntryPoint:
+        name, value = 'hello', 'hello_pack:hello'
+        
+        def load(self):
+            loaded.append(self.name)
+            return hello
+    
+    def entry_points(**kwargs):
+        class Found(list):
+            def select(self, group):
+                return self if group == 'python_terminal.commands' else []
+        return Found([FakeEntryPoint()])
+    
+    monkeypatch.setattr(importlib.metadata, 'entry_points', entry_points)
+    monkeypatch.setattr(PythonTerminal, 'commands', CommandRegistry())
+    PythonTerminal.commands.register(Command('ls', '_cmd_ls', category='Files', summary='List'))
+    terminal = PythonTerminal()
+    
+    # Plugins are listed for completion but only imported when first run
+    assert terminal.commands.names() == ['hello', 'ls'] and loaded == []
+    assert terminal.execute_command('hello world') == ("hello world", 0, "")
+    assert terminal.execute_command('hello again')[0] == "hello again" and loaded == ['hello']
+    assert 'hello         - Greet someone' in terminal.commands.help_text()
+
+def test_startup_imports():
+    import subprocess
+    
+    # Import-time budget for the terminal core, in microseconds; about 60ms
+    # is typical, the slack absorbs slow CI machines
+    budget = 250000
+    
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c',
+         'import web_interface, main; web_interface.PythonTerminal()'],
+        cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    imported = {}
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, name = line[len('import time:'):].split('|')
+            if cumulative.strip().isdigit():
+                imported[name.strip()] = int(cumulative)
+    
+    # Heavy dependencies are loaded on first use, not at startup
+    for heavy in ('psutil', 'prompt_toolkit', 'multiprocessing', 'numpy'):
+        assert heavy not in imported, f"{heavy} imported at startup"
+    assert imported['terminal_core'] < budget
+    
+    assert PythonTerminal().system_info is PythonTerminal().system_info
+
+def test_concurrent_sessions(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+    from web_interface import app
+    
+    cwd = os.getcwd()
+    for name in ('one', 'two', 'three', 'four'):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / f'{name}.txt').write_text(name)
+    
+    def session(name):
+        client = app.test_client()
+        client.post('/execute', json={'command': f'cd {tmp_path / name}', 'session_id': name})
+        listings = []
+        for _ in range(5):
+            response = client.post('/execute', json={'command': 'ls', 'session_id': name})
+            listings.append(response.get_json()['output'])
+        return listings
+    
+    # Each session sees only its own directory, and the process cwd is untouched
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = dict(zip(('one', 'two', 'three', 'four'),
+                           pool.map(session, ('one', 'two', 'three', 'four'))))
+    for name, listings in results.items():
+        assert listings == [f'{name}.txt'] * 5
+    assert os.getcwd() == cwd
+    
+    terminal = PythonTerminal()
+    assert terminal.execute_command('cd ~')[0] == os.path.expanduser('~')
+
+def test_environment_overlay(monkeypatch):
+    monkeypatch.setenv('TERMINAL_TEST_BASE', 'base')
+    monkeypatch.setattr('environment._base', None)
+    first, second = PythonTerminal(), PythonTerminal()
+    
+    # Idle sessions share one base mapping instead of copying it
+    assert first.environment_vars.materialize() is second.environment_vars.materialize()
+    
+    first.execute_command('set TERMINAL_TEST_VAR=first')
+    first.execute_command('unset TERMINAL_TEST_BASE')
+    assert first.execute_command('printenv TERMINAL_TEST_VAR')[0].strip() == 'first'
+    assert first.execute_command('printenv TERMINAL_TEST_BASE')[1] == 1
+    assert second.execute_command('printenv TERMINAL_TEST_BASE')[0].strip() == 'base'
+    assert 'TERMINAL_TEST_VAR' not in os.environ
+    assert second.execute_command('set TERMINAL_TEST_VAR')[1] == 1
+    
+    flat = first.environment_vars.materialize()
+    assert flat is first.environment_vars.materialize() and 'TERMINAL_TEST_BASE' not in flat
+
+def test_interpreter_index():
+    from bench_interpreter import PHRASES, linear_interpret
+    
+    ai = AICommandInterpreter(cache_size=0, fallback=False)
+    for phrase in PHRASES:
+        assert ai.interpret(phrase) == linear_interpret(phrase), phrase
+    # Phrases without a known leading word try no pattern at all
+    assert ai._candidates('git status') == []
+    assert ai.interpret('Where am I') == ['pwd']
+    # Patterns match whole words only
+    assert ai.interpret('cargo up and go home') == ['cd ~']
+    assert ai.interpret('go upstairs') == ['go upstairs']
+
+def test_interpreter_cache():
+    from concurrent.futures import ThreadPoolExecutor
+    from ai_interpreter import get_interpreter
+    
+    ai = AICommandInterpreter(cache_size=2)
+    assert ai.interpret('list all files') == ['ls']
+    assert ai.interpret('  List ALL files ') == ['ls']
+    ai.interpret('where am i')
+    ai.interpret('go up')  # Evicts 'list all files'
+    ai.interpret('list all files')
+    assert ai.cache_info() == {'hits': 1, 'misses': 4, 'size': 2, 'max_size': 2}
+    
+    # Callers get their own list, not the cached one
+    ai.interpret('go up').append('pwd')
+    assert ai.interpret('go up') == ['cd ..']
+    
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(ai.interpret, ['where am i', 'go home'] * 200))
+    assert results == [['pwd'], ['cd ~']] * 200
+    info = ai.cache_info()
+    assert info['hits'] + info['misses'] == 407
+    
+    assert get_interpreter() is get_interpreter()
+
+def test_fuzzy_suggestions():
+    from fuzzy_match import BKTree, levenshtein
+    
+    assert levenshtein('kitten', 'sitting') == 3 and levenshtein('', 'ls') == 2
+    tree = BKTree(['list', 'files', 'mkdir', 'ls', 'rmdir'])
+    assert tree.search('mkdri', 2) == [(2, 'mkdir')]
+    assert tree.suggest('lsit') == ['list', 'ls'] and tree.suggest('sl') == ['ls']
+    
+    ai = AICommandInterpreter()
+    assert ai.suggest_commands('lsit fils')[0] == 'ls'
+    assert ai.suggest_commands('mkdri docs') == ['mkdir']
+    
+    terminal = PythonTerminal()
+    terminal.execute_command('alias gs="git status"')
+    assert 'gs' in terminal.command_index().suggest('gz')
+    output, return_code, error = terminal.execute_command('mkdri new_folder')
+    assert return_code == 127 and error.endswith('Did you mean: mkdir?')
+    # The failed name itself is never learned from history
+    assert 'mkdri' not in terminal.command_index()
+
+def test_intent_model(tmp_path):
+    import time
+    from intent_model import IntentModel, read_corpus, get_model
+    
+    model = IntentModel.train(read_corpus())
+    model.save(str(tmp_path / 'model.npz'))
+    start = time.perf_counter()
+    loaded = IntentModel.load(str(tmp_path / 'model.npz'))
+    assert time.perf_counter() - start < 0.5
+    
+    # One call classifies the whole batch, filling in file and folder names
+    phrases = [
+        'what files do i have here',
+        'take me to projects',
+        'print the file "my notes.txt"',
+        'erase old.txt',
+        'make a copy of report.pdf in backup',
+        'git status',
+    ]
+    assert loaded.interpret(phrases) == [['ls'], ['cd projects'], ["cat 'my notes.txt'"],
+                                         None, None, None]
+    # Deletes, copies and moves are only guessed on request, for suggestions
+    assert loaded.interpret(phrases, destructive=True)[3:5] == \
+        [['rm old.txt'], ['cp report.pdf backup']]
+    
+    # Filler and unknown verbs are never taken for names or guessed at
+    for phrase in ('kill the build folder', 'trash old stuff', 'please remove backups folder',
+                   'make me a sandwich', 'i need a new folder'):
+        assert loaded.interpret([phrase], destructive=True) == [None], phrase
+    assert loaded.extract_slots('please remove backups folder') == \
+        (['backups'], 'please remove folder')
+    assert get_model() is get_model()
+    
+    ai = AICommandInterpreter(cache_size=0)
+    assert ai.interpret('which processes are running') == ['ps']
+    assert ai.interpret('how busy is the computer') == ['top']
+    assert ai.interpret('erase old.txt') == ['erase old.txt']
+    assert ai.suggest_commands('erase old.txt')[0] == 'rm old.txt'
+    # Shell command lines are passed through untouched
+    for command in ('git status', 'npm install --save-dev typescript', 'ls | wc -l'):
+        assert ai.interpret(command) == [command]
+    assert AICommandInterpreter(fallback=False).interpret('how busy is the computer') == \
+        ['how busy is the computer']
+
+def test_interpreter_eval():
+    from eval_interpreter import read_cases, evaluate, gate
+    
+    cases = read_cases()
+    phrases = [phrase for phrase, _, _ in cases]
+    ai = AICommandInterpreter(cache_size=128)
+    batch = ai.interpret_many(phrases)
+    assert batch == [AICommandInterpreter(cache_size=0).interpret(phrase) for phrase in phrases]
+    # Batches fill and reuse the same cache as single phrases
+    assert ai.interpret_many(['Go  Home', 'go home']) == [['cd ~'], ['cd ~']]
+    assert ai.interpret('go home') == ['cd ~'] and ai.cache_info()['hits'] == 3
+    assert ai.interpret_many([]) == []
+    
+    report = evaluate(cases, rounds=1)
+    assert gate(report) == [], report['misses']
+    assert report['p50_us'] <= report['p99_us'] and report['throughput'] > 0
+
 if __name__ == "__main__":
     test_terminal()
\ No newline at end of file
@@ -1,15 +1,42 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
 import json
 import os
+import threading
 from terminal_core import PythonTerminal
-from ai_interpreter import AICommandInterpreter
+from ai_interpreter import get_interpreter
 
 app = Flask(__name__)
 terminal = PythonTerminal()
-ai_interpreter = AICommandInterpreter()
+# One interpreter, and one cache of interpreted phrases, for all sessions
+ai_interpreter = get_interpreter()
 
 # Store session data (in production, use proper session management)
 sessions = {}
+sessions_lock = threading.Lock()
+
+# Upper bound for a streamed command, so a silent process cannot hold a worker forever
+STREAM_COMMAND_TIMEOUT = float(os.environ.get('STREAM_COMMAND_TIMEOUT', 300))
+
+# Requests run on parallel threads. Commands of one session run one at a
+# time, like a shell's foreground; a request that cannot get its session
+# within this many seconds is refused as busy
+SESSION_BUSY_TIMEOUT = float(os.environ.get('SESSION_BUSY_TIMEOUT', 10))
+
+SESSION_BUSY_ERROR = 'Session is busy running another command'
+
+def get_session(session_id: str) -> dict:
+    """Return the session for an id, creating it on first use"""
+    with sessions_lock:
+        if session_id not in sessions:
+            sessions[session_id] = {
+                'terminal': PythonTerminal(),
+                'lock': threading.Lock()
+            }
+        return sessions[session_id]
+
+def sse_event(event: str, payload: dict) -> str:
+    """Format a Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
 
 @app.route('/')
 def index():
@@ -22,77 +49,136 @@ def execute_command():
         command = data.get('command', '').strip()
         session_id = data.get('session_id', 'default')
         ai_mode = data.get('ai_mode', False)
+        structured = data.get('format', 'text') == 'json'
         
         if not command:
             return jsonify({'error': 'No command provided'}), 400
         
-        # Initialize session if not exists
-        if session_id not in sessions:
-            sessions[session_id] = {
-                'terminal': PythonTerminal(),
-                'ai_interpreter': AICommandInterpreter()
-            }
-        
-        session_terminal = sessions[session_id]['terminal']
-        session_ai = sessions[session_id]['ai_interpreter']
+        session = get_session(session_id)
+        session_terminal = session['terminal']
         
-        if ai_mode:
-            # Process AI command
-            commands = session_ai.interpret(command)
-            results = []
-            
-            for cmd in commands:
+        if not session['lock'].acquire(timeout=SESSION_BUSY_TIMEOUT):
+            return jsonify({'error': SESSION_BUSY_ERROR}), 409
+        try:
+            def run(cmd: str) -> dict:
+                """Run one command, as typed data when the client asked for format=json"""
+                if structured:
+                    result, return_code, error = session_terminal.execute_command_data(cmd)
+                    return {'data': result, 'error': error, 'return_code': return_code}
                 output, return_code, error = session_terminal.execute_command(cmd)
-                results.append({
-                    'command': cmd,
-                    'output': output,
-                    'error': error,
-                    'return_code': return_code
-                })
+                return {'output': output, 'error': error, 'return_code': return_code}
+            
+            if ai_mode:
+                # Process AI command
+                commands = ai_interpreter.interpret(command)
+                results = []
+            
+                for cmd in commands:
+                    result = run(cmd)
+                    results.append({'command': cmd, **result})
                 
-                # Stop on error
-                if return_code != 0 and return_code != -1:
-                    break
+                    # Stop on error
+                    if result['return_code'] != 0 and result['return_code'] != -1:
+                        break
             
-            return jsonify({
-                'success': True,
-                'ai_mode': True,
+                return jsonify({
+                    'success': True,
+                    'ai_mode': True,
+                    'original_command': command,
+                    'interpreted_commands': commands,
+                    'results': results,
+                    'current_directory': session_terminal.current_directory,
+                    'prompt': session_terminal.get_prompt()
+                })
+            else:
+                # Process normal command
+                return jsonify({
+                    'success': True,
+                    'ai_mode': False,
+                    'command': command,
+                    **run(command),
+                    'current_directory': session_terminal.current_directory,
+                    'prompt': session_terminal.get_prompt()
+                })
+        finally:
+            session['lock'].release()
+            
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/execute_stream', methods=['POST'])
+def execute_command_stream():
+    """Execute a command, streaming its output to the client as Server-Sent Events"""
+    data = request.get_json() or {}
+    command = data.get('command', '').strip()
+    session_id = data.get('session_id', 'default')
+    ai_mode = data.get('ai_mode', False)
+    
+    if not command:
+        return jsonify({'error': 'No command provided'}), 400
+    
+    session = get_session(session_id)
+    session_terminal = session['terminal']
+    commands = ai_interpreter.interpret(command) if ai_mode else [command]
+    
+    def generate():
+        if not session['lock'].acquire(timeout=SESSION_BUSY_TIMEOUT):
+            yield sse_event('stderr', {'data': SESSION_BUSY_ERROR})
+            yield sse_event('exit', {'command': command, 'return_code': 1})
+            return
+        try:
+            yield from run_commands()
+        finally:
+            session['lock'].release()
+    
+    def run_commands():
+        if ai_mode:
+            yield sse_event('interpreted', {
                 'original_command': command,
-                'interpreted_commands': commands,
-                'results': results,
-                'current_directory': session_terminal.current_directory,
-                'prompt': session_terminal.get_prompt()
+                'interpreted_commands': commands
             })
-        else:
-            # Process normal command
-            output, return_code, error = session_terminal.execute_command(command)
+        
+        for cmd in commands:
+            yield sse_event('command', {'command': cmd})
             
-            return jsonify({
-                'success': True,
-                'ai_mode': False,
-                'command': command,
-                'output': output,
-                'error': error,
-                'return_code': return_code,
-                'current_directory': session_terminal.current_directory,
-                'prompt': session_terminal.get_prompt()
-            })
+            return_code = 0
+            try:
+                for channel, chunk in session_terminal.execute_command_stream(
+                        cmd, timeout=STREAM_COMMAND_TIMEOUT):
+                    if channel == 'exit':
+                        return_code = chunk
+                    elif not chunk:
+                        # Idle follow stream: a comment frame detects closed connections
+                        yield ": keep-alive\n\n"
+                    else:
+                        yield sse_event(channel, {'data': chunk})
+            except Exception as e:
+                yield sse_event('stderr', {'data': str(e)})
+                return_code = 1
             
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+            yield sse_event('exit', {'command': cmd, 'return_code': return_code})
+            
+            # Stop on error
+            if return_code != 0 and return_code != -1:
+                break
+        
+        yield sse_event('done', {
+            'current_directory': session_terminal.current_directory,
+            'prompt': session_terminal.get_prompt(),
+            'notifications': session_terminal.collect_job_notifications()
+        })
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 @app.route('/system_info')
 def system_info():
     try:
         session_id = request.args.get('session_id', 'default')
-        
-        if session_id not in sessions:
-            sessions[session_id] = {
-                'terminal': PythonTerminal(),
-                'ai_interpreter': AICommandInterpreter()
-            }
-        
-        session_terminal = sessions[session_id]['terminal']
+        session_terminal = get_session(session_id)['terminal']
         
         return jsonify({
             'current_directory': session_terminal.current_directory,
@@ -120,7 +206,7 @@ def run_web_interface():
     port = int(os.environ.get('PORT', 5000))
     print("Starting Python Terminal Web Interface...")
     print(f"Access the terminal at: http://localhost:{port}")
-    app.run(debug=False, host='0.0.0.0', port=port)
+    app.run(debug=False, host='0.0.0.0', port=port, threaded=True)
 
 if __name__ == '__main__':
     run_web_interface()
\ No newline at end of file